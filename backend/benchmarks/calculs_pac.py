@@ -0,0 +1,148 @@
+"""Per-item cost of PAC sizing: scalar loop vs NumPy columns vs the batch route.
+
+The scalar loop replays the app's per-house formulas in plain Python; the
+engine is ``calculs_pac.size_batch``; the route timing covers a full
+``POST /api/calculs_pac/batch`` (request validation and JSON included), with
+authentication stubbed out so no database is needed.
+
+    python -m benchmarks.calculs_pac --sizes 1000 10000 20000
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+import httpx
+
+import calculs_pac
+from benchmarks.common import report
+
+ISOLATIONS = list(calculs_pac.COEFF_ISOLATION_MURS)
+FENETRES = list(calculs_pac.COEFF_FENETRES)
+EMISSIONS = ["Radiateurs", "Plancher_chauffant", "Ventilo_convecteurs"]
+EXPOSITIONS = list(calculs_pac.COEFF_EXPOSITION)
+
+
+def synthetic_items(count: int, seed: int = 42) -> List[dict]:
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            items.append({
+                "type_pac": "Air_Eau",
+                "surface_totale": round(rng.uniform(40, 300), 1),
+                "temperature_base": 20,
+                "temperature_exterieure_min": rng.choice([-2, -4, -5, -7, -9, -11]),
+                "isolation_murs": rng.choice(ISOLATIONS),
+                "type_fenetres": rng.choice(FENETRES),
+                "type_emission": rng.choice(EMISSIONS),
+            })
+        else:
+            items.append({
+                "type_pac": "Air_Air",
+                "volume_total": round(rng.uniform(20, 700), 1),
+                "niveau_isolation_global": rng.randint(1, 5),
+                "exposition_principale": rng.choice(EXPOSITIONS),
+            })
+    return items
+
+
+def js_round(value: float) -> int:
+    return int(value + 0.5) if value >= 0 else -int(-value + 0.5)
+
+
+def size_scalar(item: dict) -> Dict[str, float]:
+    if item["type_pac"] == "Air_Eau":
+        delta_t = item.get("temperature_base", 20) - item.get("temperature_exterieure_min", -7)
+        coeff = calculs_pac.COEFF_ISOLATION_MURS.get(item.get("isolation_murs"), 1.0)
+        coeff_fen = calculs_pac.COEFF_FENETRES.get(item.get("type_fenetres"), 1.0)
+        puissance = js_round(item.get("surface_totale", 0) * 60 * coeff * coeff_fen * (delta_t / 27))
+        cop = 4.5 if item.get("type_emission") == "Plancher_chauffant" else 3.8
+        froid = chaud = 0
+        consommation = js_round(puissance * 2000 / cop)
+    else:
+        coeff = calculs_pac.COEFF_NIVEAU_ISOLATION[item.get("niveau_isolation_global", 3) - 1]
+        coeff *= calculs_pac.COEFF_EXPOSITION.get(item.get("exposition_principale"), 1.0)
+        froid = js_round(item.get("volume_total", 0) * 40 * coeff)
+        chaud = js_round(item.get("volume_total", 0) * 35 * coeff)
+        puissance = max(froid, chaud)
+        cop = 4.2
+        consommation = js_round((froid * 500 + chaud * 1500) / 4.2)
+    return {
+        "puissance_necessaire": puissance,
+        "puissance_froid": froid,
+        "puissance_chaud": chaud,
+        "cop_scop_moyen": cop,
+        "consommation_annuelle_estimee": consommation,
+        "cout_installation_estime": puissance * 8,
+    }
+
+
+def columns_of(items: List[dict]) -> Dict[str, list]:
+    from server import CalculPACInput
+
+    defaults = CalculPACInput(type_pac="Air_Eau").dict()
+    return {field: [item.get(field, defaults[field]) for item in items] for field in defaults}
+
+
+def best_of(rounds: int, func) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def time_route(items: List[dict], rounds: int) -> float:
+    import server
+
+    admin = server.User(username="bench", role="admin", hashed_password="")
+    server.app.dependency_overrides[server.get_current_user] = lambda: admin
+    transport = httpx.ASGITransport(app=server.app)
+    best = float("inf")
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                response = await client.post("/api/calculs_pac/batch", json={"items": items})
+                best = min(best, time.perf_counter() - start)
+                response.raise_for_status()
+    finally:
+        server.app.dependency_overrides.clear()
+    return best
+
+
+def run(sizes: List[int], rounds: int) -> dict:
+    results = {}
+    for size in sizes:
+        items = synthetic_items(size)
+        columns = columns_of(items)
+        expected = [size_scalar(item) for item in items]
+        same = calculs_pac.result_rows(calculs_pac.size_batch(columns)) == expected
+
+        scalar = best_of(rounds, lambda: [size_scalar(item) for item in items])
+        engine = best_of(rounds, lambda: calculs_pac.size_batch(columns))
+        engine_rows = best_of(rounds, lambda: calculs_pac.result_rows(calculs_pac.size_batch(columns)))
+        route = asyncio.run(time_route(items, rounds))
+        results[str(size)] = {
+            "scalar_us_per_item": scalar / size * 1e6,
+            "numpy_us_per_item": engine / size * 1e6,
+            "numpy_with_rows_us_per_item": engine_rows / size * 1e6,
+            "route_us_per_item": route / size * 1e6,
+            "same_results": same,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 20_000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    report(run(args.sizes, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""WebSocket chat load test: many sockets in one room on a single worker.
+
+Opens ``--sockets`` authenticated connections to ``/api/chat/ws`` on a running
+server, joins them all to one fresh channel, then has ``--senders`` of them
+post ``--messages`` messages in total at ``--rate`` messages per second. Every
+socket timestamps what it receives, so the report gives the connect time and
+the publish-to-delivery latency of the fan-out, plus the broker counters.
+
+Start one worker first (``uvicorn server:app --port 8001 --workers 1``), then:
+
+    python -m benchmarks.chat_ws --url http://localhost:8001 --sockets 500
+
+Each socket is a file descriptor on both sides: raise ``ulimit -n`` if needed.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from benchmarks.common import percentiles, report
+
+
+class Receiver:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.received = 0
+        self.closed_code = None
+
+
+async def open_socket(ws_url: str, token: str, channel: str, connect_samples: List[float]):
+    start = time.perf_counter()
+    socket = await websockets.connect(
+        f"{ws_url}/api/chat/ws?token={token}&channels={channel}",
+        max_queue=None,
+        open_timeout=30,
+    )
+    while json.loads(await socket.recv()).get("event") != "joined":
+        pass
+    connect_samples.append(time.perf_counter() - start)
+    return socket
+
+
+async def receive(socket, receiver: Receiver, done: asyncio.Event, expected: int) -> None:
+    try:
+        async for raw in socket:
+            event = json.loads(raw)
+            if event.get("event") != "message":
+                continue
+            sent_at = json.loads(event["message"]["message"])["sent_at"]
+            receiver.latencies.append(time.time() - sent_at)
+            receiver.received += 1
+            if receiver.received >= expected:
+                done.set()
+    except websockets.ConnectionClosed as exc:
+        receiver.closed_code = exc.code
+    finally:
+        done.set()
+
+
+async def run(url: str, username: str, password: str, sockets: int, senders: int,
+              messages: int, rate: float, timeout: float) -> Dict:
+    ws_url = url.replace("http", "ws", 1)
+    async with httpx.AsyncClient(base_url=url, timeout=30) as http:
+        response = await http.post("/api/auth/login", json={"username": username, "password": password})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        channel = f"bench-{uuid.uuid4().hex[:8]}"
+        connect_samples: List[float] = []
+        # Bound concurrent handshakes so the listen backlog does not overflow
+        gate = asyncio.Semaphore(100)
+
+        async def connect():
+            async with gate:
+                return await open_socket(ws_url, token, channel, connect_samples)
+
+        started = time.perf_counter()
+        opened = await asyncio.gather(*(connect() for _ in range(sockets)))
+        connect_seconds = time.perf_counter() - started
+
+        receivers = [Receiver() for _ in opened]
+        done_events = [asyncio.Event() for _ in opened]
+        tasks = [
+            asyncio.create_task(receive(socket, receiver, done, messages))
+            for socket, receiver, done in zip(opened, receivers, done_events)
+        ]
+
+        publishers = opened[:max(1, senders)]
+        interval = 1.0 / rate if rate > 0 else 0.0
+        publish_started = time.perf_counter()
+        for index in range(messages):
+            text = json.dumps({"sent_at": time.time(), "n": index})
+            frame = {"action": "message", "channel": channel, "message": text}
+            await publishers[index % len(publishers)].send(json.dumps(frame))
+            if interval:
+                await asyncio.sleep(interval)
+        publish_seconds = time.perf_counter() - publish_started
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*(done.wait() for done in done_events)), timeout)
+        except asyncio.TimeoutError:
+            pass
+        drain_seconds = time.perf_counter() - publish_started
+
+        for socket in opened:
+            await socket.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        diagnostics = await http.get("/api/diagnostics/round-trips", headers=headers)
+        chat_stats = diagnostics.json().get("chat") if diagnostics.status_code == 200 else None
+
+    latencies = [sample for receiver in receivers for sample in receiver.latencies]
+    expected = sockets * messages
+    return {
+        "sockets": sockets,
+        "messages": messages,
+        "connect_seconds": connect_seconds,
+        "connect": percentiles(connect_samples),
+        "publish_seconds": publish_seconds,
+        "drain_seconds": drain_seconds,
+        "deliveries_expected": expected,
+        "deliveries_received": len(latencies),
+        "deliveries_per_second": len(latencies) / drain_seconds if drain_seconds else None,
+        "fanout_latency": percentiles(latencies),
+        "sockets_closed_by_server": sum(1 for r in receivers if r.closed_code is not None),
+        "server": chat_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--sockets", type=int, default=500)
+    parser.add_argument("--senders", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50.0, help="messages per second, 0 for no pacing")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    report(asyncio.run(run(
+        args.url, args.username, args.password, args.sockets, args.senders,
+        args.messages, args.rate, args.timeout,
+    )))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Helpers shared by the benchmark scripts.
+
+The benchmarks drive the FastAPI ``app`` in-process through an httpx ASGI
+transport, against the database configured by ``MONGO_URL``/``DB_NAME``, or
+against an in-memory stand-in after ``use_memory_mongo()``.
+Run them from the ``backend`` directory, e.g. ``python -m benchmarks.login_storm``.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import httpx
+
+# The benchmarks measure the routes, not admission control: a login storm from
+# one address would only measure its token bucket
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+
+def use_memory_mongo(db_name: str = "h2eaux_bench") -> None:
+    """Back ``server`` with mongomock_motor instead of a mongod.
+
+    Must run before ``server`` is imported: it replaces the Motor client class
+    the module instantiates. mongomock implements queries, updates and
+    aggregations in Python without indexes, so its timings only compare with
+    other in-memory runs, never with a real server.
+    """
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("The in-memory database needs mongomock-motor: pip install mongomock-motor")
+    import motor.motor_asyncio
+
+    if "server" in sys.modules:
+        raise RuntimeError("use_memory_mongo() must be called before server is imported")
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    os.environ.setdefault("MONGO_URL", "mongodb://memory")
+    os.environ["DB_NAME"] = db_name
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarise latency samples (seconds) as milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def timed(coro_factory, samples: List[float]):
+    start = time.perf_counter()
+    response = await coro_factory()
+    samples.append(time.perf_counter() - start)
+    return response
+
+
+@asynccontextmanager
+async def app_client():
+    """Start the app (startup/shutdown events included) and yield an httpx client."""
+    import server
+
+    await server.startup_event()
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+    finally:
+        await server.shutdown_db_client()
+
+
+async def login(client: httpx.AsyncClient, username: str = "admin", password: str = "admin123") -> Dict[str, str]:
+    response = await client.post("/api/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def report(results: dict) -> None:
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,58 @@
+"""p99 of /api/health and /api/clients while a burst of logins is in flight.
+
+    python -m benchmarks.login_storm --logins 50 --probes 200
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import app_client, login, percentiles, report, timed
+
+
+async def probe(client, path, headers, count, samples):
+    for _ in range(count):
+        await timed(lambda: client.get(path, headers=headers), samples)
+        await asyncio.sleep(0)
+
+
+async def run(logins: int, probes: int) -> dict:
+    async with app_client() as client:
+        headers = await login(client)
+        results = {}
+
+        for phase, storm in (("idle", 0), ("login_storm", logins)):
+            health, clients, login_samples = [], [], []
+            statuses = {}
+
+            async def one_login():
+                response = await timed(
+                    lambda: client.post("/api/auth/login", json={"username": "employe1", "password": "employe123"}),
+                    login_samples,
+                )
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            tasks = [asyncio.create_task(one_login()) for _ in range(storm)]
+            await asyncio.gather(
+                probe(client, "/api/health", {}, probes, health),
+                probe(client, "/api/clients?paginate=true", headers, probes, clients),
+            )
+            await asyncio.gather(*tasks)
+
+            results[phase] = {
+                "/api/health": percentiles(health),
+                "/api/clients": percentiles(clients),
+                "/api/auth/login": percentiles(login_samples),
+                "login_statuses": statuses,
+            }
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--probes", type=int, default=200)
+    args = parser.parse_args()
+    report(asyncio.run(run(args.logins, args.probes)))
+
+
+if __name__ == "__main__":
+    main()
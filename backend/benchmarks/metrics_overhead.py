@@ -0,0 +1,126 @@
+"""Cost of the metrics middleware per request.
+
+Serves the same trivial route, behind an authenticated dependency timed with
+``auth_timer`` like ``get_current_user``, from two apps that differ only by
+``MetricsMiddleware``, and times full in-process requests through both in
+alternating rounds. The cheapest possible route is the worst case for the
+middleware's relative overhead, and end-to-end timings through httpx are
+noisy at this scale, so it also times the middleware alone around a stub ASGI
+app, ``Histogram.observe``, and ``MetricsRegistry.render`` once the series
+exist.
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from benchmarks.common import percentiles, report
+from metrics import Histogram, MetricsMiddleware, MetricsRegistry, auth_timer
+
+
+async def fake_user():
+    with auth_timer():
+        return {"id": "bench"}
+
+
+def build_app(registry: MetricsRegistry = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str, user: dict = Depends(fake_user)):
+        return {"id": item_id, "owner": user["id"]}
+
+    if registry is not None:
+        app.add_middleware(MetricsMiddleware, registry=registry)
+    return app
+
+
+async def time_requests(client: httpx.AsyncClient, count: int, samples: List[float]) -> None:
+    for index in range(count):
+        start = time.perf_counter()
+        await client.get(f"/items/{index % 100}")
+        samples.append(time.perf_counter() - start)
+
+
+class StubRoute:
+    path = "/items/{item_id}"
+
+
+async def stub_app(scope, receive, send):
+    scope["route"] = StubRoute
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def discard(message):
+    pass
+
+
+async def time_asgi(app, calls: int) -> float:
+    """Mean microseconds per call of ``app`` on a minimal GET."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        await app({"type": "http", "method": "GET", "path": "/items/1"}, None, discard)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def run(requests: int, rounds: int) -> dict:
+    registry = MetricsRegistry()
+    plain, measured = [], []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=build_app()), base_url="http://bench") as bare, \
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=build_app(registry)), base_url="http://bench") as wrapped:
+        # Warm both paths up, then alternate so drift hits both equally
+        await time_requests(bare, 200, [])
+        await time_requests(wrapped, 200, [])
+        per_round = max(1, requests // rounds)
+        for _ in range(rounds):
+            await time_requests(bare, per_round, plain)
+            await time_requests(wrapped, per_round, measured)
+
+    calls = 100_000
+    middleware = MetricsMiddleware(stub_app, MetricsRegistry())
+    await time_asgi(middleware, 1000)
+    stub_us = await time_asgi(stub_app, calls)
+    middleware_us = await time_asgi(middleware, calls) - stub_us
+
+    histogram = Histogram()
+    observations = 1_000_000
+    start = time.perf_counter()
+    for index in range(observations):
+        histogram.observe((index % 1000) / 10_000)
+    observe_ns = (time.perf_counter() - start) / observations * 1e9
+
+    start = time.perf_counter()
+    exposition = registry.render()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    without, with_metrics = percentiles(plain), percentiles(measured)
+    return {
+        "requests_per_app": len(plain),
+        "without_metrics": without,
+        "with_metrics": with_metrics,
+        "overhead_p50_us": (with_metrics["p50_ms"] - without["p50_ms"]) * 1000,
+        "overhead_mean_us": (with_metrics["mean_ms"] - without["mean_ms"]) * 1000,
+        "overhead_mean_percent": (with_metrics["mean_ms"] / without["mean_ms"] - 1) * 100,
+        "middleware_alone_us": middleware_us,
+        "histogram_observe_ns": observe_ns,
+        "render_ms": render_ms,
+        "render_bytes": len(exposition),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    report(asyncio.run(run(args.requests, args.rounds)))
+
+
+if __name__ == "__main__":
+    main()
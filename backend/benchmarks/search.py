@@ -0,0 +1,65 @@
+"""Client search index build time and query latency on a synthetic directory.
+
+    python -m benchmarks.search --clients 100000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import percentiles, report
+from search import ClientSearchIndex
+
+NOMS = ["Lefèvre", "Dubois", "Martin", "Bernard", "Thomas", "Petit", "Robert", "Richard", "Durand",
+        "Moreau", "Laurent", "Simon", "Michel", "Garçon", "Rousseau", "Blanc", "Guérin", "Muller",
+        "Henry", "Roussel", "Nicolas", "Perrin", "Morin", "Mathieu", "Clément", "Gauthier", "Dumont"]
+PRENOMS = ["Jean-Pierre", "Sophie", "Hélène", "François", "Zoé", "Loïc", "Amélie", "Jérôme", "Céline",
+           "Noël", "Agnès", "Benoît", "Élodie", "Maël", "Gaëlle", "Théo", "Chloé", "Léa", "Hugo"]
+VILLES = [("Brest", "29200"), ("Quimper", "29000"), ("Paris", "75001"), ("Rennes", "35000"),
+          ("Saint-Brieuc", "22000"), ("Lorient", "56100"), ("Vannes", "56000"), ("Nantes", "44000")]
+QUERIES = ["lefevre", "Lefèvre", "lefevr", "lefvre", "dub", "martin sophie", "quimper",
+           "29200", "06 12", "helene brest", "jean pierre", "gauthier", "rousel", "m"]
+
+
+def synthetic_clients(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(count):
+        ville, code_postal = rng.choice(VILLES)
+        nom = rng.choice(NOMS) + ("" if i % 3 else str(i % 997))
+        yield {
+            "id": f"client-{i}",
+            "nom": nom,
+            "prenom": rng.choice(PRENOMS),
+            "ville": ville,
+            "code_postal": code_postal,
+            "telephone": "06 " + " ".join(f"{rng.randrange(100):02d}" for _ in range(4)),
+            "email": f"{nom.lower()}.{i}@example.fr",
+        }
+
+
+def run(clients: int, rounds: int) -> dict:
+    index = ClientSearchIndex()
+    start = time.perf_counter()
+    index.rebuild(synthetic_clients(clients))
+    build_seconds = time.perf_counter() - start
+
+    results = {"clients": clients, "build_s": build_seconds, "queries": {}}
+    for query in QUERIES:
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            hits = index.search(query, limit=20)
+            samples.append(time.perf_counter() - start)
+        results["queries"][query] = {**percentiles(samples), "hits": len(hits)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    report(run(args.clients, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
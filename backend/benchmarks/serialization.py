@@ -0,0 +1,91 @@
+"""Validated vs fast (orjson, no re-validation) client list responses.
+
+Serves the same in-memory documents through two FastAPI routes, one with
+``response_model=List[Client]`` and ``Client(**doc)`` as the API used to, one
+returning an ``ORJSONResponse`` of the raw documents, and times full requests.
+
+    python -m benchmarks.serialization --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from benchmarks.common import percentiles, report
+from server import Client
+
+
+def synthetic_documents(count: int) -> List[dict]:
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "nom": f"Nom{i}",
+            "prenom": "Hélène",
+            "telephone": "06 12 34 56 78",
+            "email": f"client{i}@example.fr",
+            "adresse": f"{i} rue de la Paix",
+            "ville": "Quimper",
+            "code_postal": "29000",
+            "type_chauffage": "Pompe à chaleur",
+            "notes": "Rendez-vous le matin de préférence.",
+            "version": 1,
+            "created_at": start + timedelta(seconds=i, milliseconds=i % 1000),
+            "updated_at": start + timedelta(seconds=i, milliseconds=i % 1000),
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(documents: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=List[Client])
+    async def validated():
+        return [Client(**doc) for doc in documents]
+
+    @app.get("/fast")
+    async def fast():
+        return ORJSONResponse(documents)
+
+    return app
+
+
+async def run(sizes: List[int], rounds: int) -> dict:
+    results = {}
+    for size in sizes:
+        app = build_app(synthetic_documents(size))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            entry = {}
+            bodies = {}
+            for path in ("/validated", "/fast"):
+                samples = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    samples.append(time.perf_counter() - start)
+                bodies[path] = response.json()
+                entry[path] = {**percentiles(samples), "bytes": len(response.content)}
+            entry["same_payload"] = bodies["/validated"] == bodies["/fast"]
+            entry["speedup_p50"] = entry["/validated"]["p50_ms"] / entry["/fast"]["p50_ms"]
+        results[str(size)] = entry
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    report(asyncio.run(run(args.sizes, args.rounds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Throughput and latency of the hot endpoints, compared with a stored baseline.
+
+Starts the app in-process against an in-memory Mongo stand-in (``--mongo
+memory``, the default, needs mongomock-motor) or a mongod (``--mongo
+mongodb://...``). It seeds users and clients, then runs two workloads of
+concurrent asyncio workers:
+
+- ``login_storm``: logins of random seeded users.
+- ``mixed``: the client screens' traffic. It lists, reads, searches,
+  creates and updates clients, and reads the dashboard, in ``MIX``
+  proportions.
+
+Each workload reports its throughput and, per endpoint, the request count,
+the statuses and the latency percentiles as JSON. ``--compare`` reruns
+against a baseline saved with ``--save``. A p95 slower by more than
+``--tolerance`` and by ``--min-delta-ms`` at least (sub-millisecond p95s
+move by more than 25% from one run to the next), or a throughput lower by
+more than ``--tolerance``, is reported as a regression and the exit status
+is 1.
+
+Against a mongod the suite drops and reseeds ``--db`` first, so point it at
+a database of its own. In-memory timings only compare with in-memory
+baselines such as ``benchmarks/baselines/memory.json``, recorded on the same
+machine.
+
+    python -m benchmarks.suite --compare benchmarks/baselines/memory.json
+    python -m benchmarks.suite --mongo mongodb://localhost:27017 --clients 20000 --save /tmp/mongod.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from benchmarks.common import percentiles, report, use_memory_mongo
+from benchmarks.search import synthetic_clients
+
+SEED_PASSWORD = "bench123"
+CHAUFFAGES = ["PAC air/eau", "PAC air/air", "Gaz", "Fioul", "Électrique", ""]
+
+# Share of each operation in the mixed workload
+MIX = {
+    "list": 30,
+    "read": 30,
+    "search": 15,
+    "update": 10,
+    "create": 5,
+    "dashboard": 10,
+}
+
+# Endpoint label of each operation, by route template
+ENDPOINTS = {
+    "list": "GET /api/clients",
+    "read": "GET /api/clients/{client_id}",
+    "search": "GET /api/clients/search",
+    "update": "PUT /api/clients/{client_id}",
+    "create": "POST /api/clients",
+    "dashboard": "GET /api/stats/dashboard",
+    "login": "POST /api/auth/login",
+}
+
+SEARCHES = ["lefevre", "dub", "martin sophie", "quimper", "29200", "helene brest", "rousel"]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    async def request(self, endpoint: str, send):
+        start = time.perf_counter()
+        response = await send()
+        self.samples[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+    def summary(self, seconds: float) -> dict:
+        total = sum(len(samples) for samples in self.samples.values())
+        return {
+            "requests": total,
+            "seconds": seconds,
+            "throughput_rps": total / seconds if seconds else 0.0,
+            "endpoints": {
+                endpoint: {
+                    **percentiles(samples),
+                    "throughput_rps": len(samples) / seconds if seconds else 0.0,
+                    "statuses": {str(code): count for code, count in sorted(self.statuses[endpoint].items())},
+                }
+                for endpoint, samples in sorted(self.samples.items())
+            },
+        }
+
+
+async def seed(server, users: int, clients: int) -> List[str]:
+    """Insert the seeded users and clients directly, and return the client ids."""
+    await server.db.client.drop_database(server.db.name)
+    await server.ensure_indexes(server.db)
+
+    # One bcrypt hash for every user: seeding should not take minutes
+    hashed = await server.hash_password_async(SEED_PASSWORD)
+    await server.db.users.insert_many([
+        server.User(username=f"bench{index}", hashed_password=hashed).dict() for index in range(users)
+    ])
+
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    documents = []
+    for index, fields in enumerate(synthetic_clients(clients)):
+        created_at = now - timedelta(minutes=index)
+        documents.append(server.Client(
+            **{key: value for key, value in fields.items() if key != "id"},
+            type_chauffage=rng.choice(CHAUFFAGES),
+            created_at=created_at,
+            updated_at=created_at,
+        ).dict())
+    for start in range(0, len(documents), 1000):
+        await server.db.clients.insert_many(documents[start:start + 1000])
+    return [document["id"] for document in documents]
+
+
+async def login_storm(client, recorder: Recorder, users: int, logins: int, concurrency: int) -> None:
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            username = f"bench{random.randrange(users)}"
+            await recorder.request(ENDPOINTS["login"], lambda: client.post(
+                "/api/auth/login", json={"username": username, "password": SEED_PASSWORD},
+            ))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def mixed(client, recorder: Recorder, tokens: List[dict], client_ids: List[str],
+                requests: int, concurrency: int) -> None:
+    operations, weights = zip(*MIX.items())
+    remaining = iter(range(requests))
+
+    async def worker(headers: dict):
+        rng = random.Random()
+        for _ in remaining:
+            operation = rng.choices(operations, weights)[0]
+            endpoint = ENDPOINTS[operation]
+            if operation == "list":
+                send = lambda: client.get("/api/clients", params={"paginate": "true"}, headers=headers)
+            elif operation == "read":
+                client_id = rng.choice(client_ids)
+                send = lambda: client.get(f"/api/clients/{client_id}", headers=headers)
+            elif operation == "search":
+                query = rng.choice(SEARCHES)
+                send = lambda: client.get("/api/clients/search", params={"q": query}, headers=headers)
+            elif operation == "update":
+                client_id = rng.choice(client_ids)
+                notes = f"Relevé du {datetime.utcnow():%d/%m %H:%M:%S}"
+                send = lambda: client.put(f"/api/clients/{client_id}", json={"notes": notes}, headers=headers)
+            elif operation == "create":
+                send = lambda: client.post("/api/clients", json={
+                    "nom": "Bench", "prenom": f"Client {rng.randrange(10**6)}", "ville": "Brest",
+                }, headers=headers)
+            else:
+                send = lambda: client.get("/api/stats/dashboard", headers=headers)
+            response = await recorder.request(endpoint, send)
+            if operation == "create" and response.status_code == 200:
+                client_ids.append(response.json()["id"])
+
+    await asyncio.gather(*(worker(tokens[index % len(tokens)]) for index in range(concurrency)))
+
+
+async def run(args) -> dict:
+    import httpx
+    import server
+
+    client_ids = await seed(server, args.users, args.clients)
+    await server.startup_event()
+    results = {
+        "environment": {
+            "mongo": "memory" if args.mongo == "memory" else "mongod",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "parameters": {
+            "users": args.users,
+            "clients": args.clients,
+            "concurrency": args.concurrency,
+            "logins": args.logins,
+            "requests": args.requests,
+        },
+        "workloads": {},
+    }
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            recorder = Recorder()
+            start = time.perf_counter()
+            await login_storm(client, recorder, args.users, args.logins, args.concurrency)
+            results["workloads"]["login_storm"] = recorder.summary(time.perf_counter() - start)
+
+            tokens = []
+            for index in range(min(args.users, args.concurrency)):
+                response = await client.post("/api/auth/login", json={
+                    "username": f"bench{index}", "password": SEED_PASSWORD,
+                })
+                response.raise_for_status()
+                tokens.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+            recorder = Recorder()
+            start = time.perf_counter()
+            await mixed(client, recorder, tokens, client_ids, args.requests, args.concurrency)
+            results["workloads"]["mixed"] = recorder.summary(time.perf_counter() - start)
+    finally:
+        await server.shutdown_db_client()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> dict:
+    """Regressions of ``results`` against ``baseline``, per workload and endpoint."""
+    regressions, rows = [], []
+    for workload, current in results["workloads"].items():
+        reference = baseline.get("workloads", {}).get(workload)
+        if reference is None:
+            continue
+        checks = [(workload, "throughput_rps", current["throughput_rps"], reference["throughput_rps"])]
+        for endpoint, stats in current["endpoints"].items():
+            previous = reference["endpoints"].get(endpoint)
+            if previous and stats.get("count") and previous.get("count"):
+                checks.append((f"{workload} {endpoint}", "p95_ms", stats["p95_ms"], previous["p95_ms"]))
+        for name, metric, value, before in checks:
+            if not before:
+                continue
+            change = value / before - 1
+            # Throughput regresses downwards, latency upwards
+            if metric == "throughput_rps":
+                worse = change < -tolerance
+            else:
+                worse = change > tolerance and value - before > min_delta_ms
+            row = {"name": name, "metric": metric, "baseline": before, "current": value,
+                   "change_percent": change * 100, "regression": worse}
+            rows.append(row)
+            if worse:
+                regressions.append(row)
+    return {
+        "tolerance_percent": tolerance * 100,
+        "min_delta_ms": min_delta_ms,
+        "checks": rows,
+        "regressions": len(regressions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo", default="memory", help='"memory" or a MongoDB URL')
+    parser.add_argument("--db", default="h2eaux_bench", help="database to drop and seed")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--save", help="write the results to this file, as a baseline")
+    parser.add_argument("--compare", help="baseline file to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="smallest p95 slowdown reported")
+    args = parser.parse_args()
+
+    if args.mongo == "memory":
+        use_memory_mongo(args.db)
+    else:
+        os.environ["MONGO_URL"] = args.mongo
+        os.environ["DB_NAME"] = args.db
+    # Background refreshes would land at random points of the measurement
+    os.environ.setdefault("SEARCH_INDEX_REFRESH_SECONDS", "0")
+    os.environ.setdefault("DASHBOARD_STATS_REBUILD_SECONDS", "0")
+
+    results = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as baseline:
+            results["comparison"] = compare(results, json.load(baseline), args.tolerance, args.min_delta_ms)
+    report(results)
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump({key: value for key, value in results.items() if key != "comparison"}, output, indent=2)
+            output.write("\n")
+    if results.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Heat pump (PAC) sizing, server side.
+
+The formulas are the ones of the mobile app (``PACCalculsScreen``): air/water
+sizing from the heated surface, the temperature gap and the wall and window
+insulation; air/air sizing from the volume, the insulation level and the main
+exposure. Every function works on whole columns (one entry per house or room),
+so a batch of thousands of items costs a few NumPy operations rather than a
+Python loop per item.
+
+Bump ``COEFFICIENTS_VERSION`` whenever a coefficient or constant below changes,
+so results computed with the old tables can be told apart.
+"""
+from typing import Dict, Mapping, Sequence
+
+import numpy as np
+
+COEFFICIENTS_VERSION = 1
+
+# Air/eau: W per m² at the reference temperature gap, scaled by insulation
+AIR_EAU_W_PAR_M2 = 60
+AIR_EAU_DELTA_T_REFERENCE = 27
+COEFF_ISOLATION_MURS = {
+    "ITE": 0.6,
+    "Bien_isoles": 0.8,
+    "Isoles": 1.0,
+    "Pas_isoles": 1.4,
+}
+COEFF_FENETRES = {
+    "Triple": 0.8,
+    "Double": 1.0,
+    "Simple": 1.3,
+}
+COP_EMISSION = {"Plancher_chauffant": 4.5}
+COP_AIR_EAU_DEFAUT = 3.8
+AIR_EAU_HEURES_CHAUFFE = 2000
+
+# Air/air: W per m³, the insulation level (1 = poor .. 5 = excellent) and the exposure
+AIR_AIR_W_PAR_M3_FROID = 40
+AIR_AIR_W_PAR_M3_CHAUD = 35
+COEFF_NIVEAU_ISOLATION = (1.6, 1.3, 1.0, 0.8, 0.6)
+COEFF_EXPOSITION = {
+    "Sud": 1.2,
+    "Sud_Est": 1.1,
+    "Sud_Ouest": 1.1,
+    "Est": 1.0,
+    "Ouest": 1.0,
+    "Nord": 0.9,
+}
+COP_AIR_AIR = 4.2
+AIR_AIR_HEURES_FROID = 500
+AIR_AIR_HEURES_CHAUD = 1500
+
+# Rows of no known type keep the app's fallback: nothing sized, COP 3.5
+COP_TYPE_INCONNU = 3.5
+
+COUT_INSTALLATION_PAR_W = 8
+
+RESULT_FIELDS = (
+    "puissance_necessaire",
+    "puissance_froid",
+    "puissance_chaud",
+    "cop_scop_moyen",
+    "consommation_annuelle_estimee",
+    "cout_installation_estime",
+)
+
+
+def js_round(values: np.ndarray) -> np.ndarray:
+    """Math.round: halves go up (np.round would send 2.5 to 2)."""
+    return np.floor(np.asarray(values, dtype=float) + 0.5).astype(np.int64)
+
+
+def lookup(values: Sequence, table: Mapping[str, float], default: float = 1.0) -> np.ndarray:
+    """Map a column of labels to coefficients; unknown or missing labels get ``default``."""
+    # One dict probe per label straight into a float buffer: no object arrays, no sorting
+    return np.fromiter((table.get(label, default) for label in values), dtype=float, count=len(values))
+
+
+def size_air_eau(
+    surface_totale: np.ndarray,
+    temperature_base: np.ndarray,
+    temperature_exterieure_min: np.ndarray,
+    isolation_murs: Sequence,
+    type_fenetres: Sequence,
+    type_emission: Sequence,
+) -> Dict[str, np.ndarray]:
+    delta_t = np.asarray(temperature_base, dtype=float) - np.asarray(temperature_exterieure_min, dtype=float)
+    puissance = js_round(
+        np.asarray(surface_totale, dtype=float)
+        * AIR_EAU_W_PAR_M2
+        * lookup(isolation_murs, COEFF_ISOLATION_MURS)
+        * lookup(type_fenetres, COEFF_FENETRES)
+        * (delta_t / AIR_EAU_DELTA_T_REFERENCE)
+    )
+    cop = lookup(type_emission, COP_EMISSION, default=COP_AIR_EAU_DEFAUT)
+    return {
+        "puissance": puissance,
+        "cop": cop,
+        "consommation": js_round(puissance * AIR_EAU_HEURES_CHAUFFE / cop),
+    }
+
+
+def size_air_air(
+    volume: np.ndarray,
+    niveau_isolation_global: np.ndarray,
+    exposition_principale: Sequence,
+) -> Dict[str, np.ndarray]:
+    """Size one house (total volume) or one room (its own volume) per entry."""
+    niveau = np.asarray(niveau_isolation_global, dtype=np.int64)
+    coeff = np.take(COEFF_NIVEAU_ISOLATION, niveau - 1) * lookup(exposition_principale, COEFF_EXPOSITION)
+    volume = np.asarray(volume, dtype=float)
+    froid = js_round(volume * AIR_AIR_W_PAR_M3_FROID * coeff)
+    chaud = js_round(volume * AIR_AIR_W_PAR_M3_CHAUD * coeff)
+    return {
+        "puissance_froid": froid,
+        "puissance_chaud": chaud,
+        "puissance": np.maximum(froid, chaud),
+        "consommation": js_round(
+            (froid * AIR_AIR_HEURES_FROID + chaud * AIR_AIR_HEURES_CHAUD) / COP_AIR_AIR
+        ),
+    }
+
+
+def size_batch(columns: Mapping[str, Sequence]) -> Dict[str, np.ndarray]:
+    """Size a mixed batch given as columns and return one column per result field.
+
+    ``columns`` holds ``type_pac`` plus every input of both formulas, for every
+    row. Both formulas run over the whole batch (the arithmetic is cheap next
+    to reading the columns) and each row keeps the result of its own type; for
+    air/eau rows the froid/chaud columns are 0.
+    """
+    count = len(columns["type_pac"])
+
+    def numbers(field: str, dtype=float) -> np.ndarray:
+        return np.fromiter(columns[field], dtype=dtype, count=count)
+
+    air_eau = lookup(columns["type_pac"], {"Air_Eau": 1.0}, default=0.0).astype(bool)
+    air_air = lookup(columns["type_pac"], {"Air_Air": 1.0}, default=0.0).astype(bool)
+    eau = size_air_eau(
+        numbers("surface_totale"),
+        numbers("temperature_base"),
+        numbers("temperature_exterieure_min"),
+        columns["isolation_murs"],
+        columns["type_fenetres"],
+        columns["type_emission"],
+    )
+    air = size_air_air(
+        numbers("volume_total"),
+        numbers("niveau_isolation_global", np.int64),
+        columns["exposition_principale"],
+    )
+
+    def pick(air_eau_values, air_air_values, fallback) -> np.ndarray:
+        return np.where(air_eau, air_eau_values, np.where(air_air, air_air_values, fallback))
+
+    puissance = pick(eau["puissance"], air["puissance"], 0)
+    return {
+        "puissance_necessaire": puissance,
+        "puissance_froid": pick(0, air["puissance_froid"], 0),
+        "puissance_chaud": pick(0, air["puissance_chaud"], 0),
+        "cop_scop_moyen": pick(eau["cop"], COP_AIR_AIR, COP_TYPE_INCONNU),
+        "consommation_annuelle_estimee": pick(eau["consommation"], air["consommation"], 0),
+        "cout_installation_estime": puissance * COUT_INSTALLATION_PAR_W,
+    }
+
+
+def result_rows(results: Mapping[str, np.ndarray]) -> list:
+    """Turn result columns back into one dict per item, with plain Python numbers."""
+    columns = [results[field].tolist() for field in RESULT_FIELDS]
+    return [dict(zip(RESULT_FIELDS, row)) for row in zip(*columns)]
+
+
+def batch_job(params: dict) -> dict:
+    """Background job entry point: size ``params["items"]``, validated input dicts."""
+    items = params["items"]
+    columns = {field: [item[field] for item in items] for field in (items[0] if items else ())}
+    results = result_rows(size_batch(columns)) if items else []
+    return {"coefficients_version": COEFFICIENTS_VERSION, "results": results}
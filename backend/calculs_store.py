@@ -0,0 +1,113 @@
+"""Memoized store of PAC calculations.
+
+A calculation is identified by a SHA-256 of its canonical inputs: only the
+fields its formula reads, with numbers normalised, serialised with sorted
+keys. Results are stored per (input hash, coefficient table version) in the
+``calculs_pac`` collection and kept in an in-process LRU in front of it, so a
+technician re-running the same sizing is served from memory, then from Mongo,
+and only computed once. The coefficient table version is part of every key,
+so a new version never serves a result computed with the old tables: the
+first request for the same inputs computes it again. Stored calculations are
+saved work and are never deleted; ``get(..., any_version=True)`` still reads
+one back, in the latest version it was computed with.
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from calculs_pac import COEFFICIENTS_VERSION, result_rows, size_batch
+from cache import TTLCache
+
+# Inputs each formula reads; anything else is left out of the hash
+HASHED_FIELDS = {
+    "Air_Eau": (
+        "surface_totale", "temperature_base", "temperature_exterieure_min",
+        "isolation_murs", "type_fenetres", "type_emission",
+    ),
+    "Air_Air": ("volume_total", "niveau_isolation_global", "exposition_principale"),
+}
+
+CALCUL_PROJECTION = {"_id": 0}
+
+
+def canonical_inputs(inputs: dict) -> dict:
+    type_pac = inputs["type_pac"]
+    canonical = {"type_pac": type_pac}
+    for field in HASHED_FIELDS.get(type_pac, ()):
+        value = inputs.get(field)
+        # 120, 120.0 and 120.00000000001 from a float slider are the same house
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = round(float(value), 6)
+        canonical[field] = value
+    return canonical
+
+
+def input_hash(canonical: dict) -> str:
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compute(inputs: dict) -> dict:
+    columns = {field: [value] for field, value in inputs.items()}
+    return result_rows(size_batch(columns))[0]
+
+
+class CalculPACStore:
+    def __init__(self, collection, cache: TTLCache, version: int = COEFFICIENTS_VERSION):
+        self.collection = collection
+        self.cache = cache
+        self.version = version
+
+    async def get(self, calcul_hash: str, any_version: bool = False) -> Tuple[Optional[dict], str]:
+        """Return (stored calculation or None, "memory" | "database" | "miss").
+
+        With ``any_version``, a calculation only stored for older coefficient
+        tables is returned as it was computed rather than as a miss.
+        """
+        key = (calcul_hash, self.version)
+        calcul = self.cache.get(key)
+        if calcul is not None:
+            return calcul, "memory"
+        calcul = await self.collection.find_one(
+            {"input_hash": calcul_hash, "coefficients_version": self.version},
+            CALCUL_PROJECTION,
+        )
+        if calcul is not None:
+            self.cache.set(key, calcul)
+            return calcul, "database"
+        if any_version:
+            # Not cached: the LRU only holds results of the current tables
+            older = await self.collection.find(
+                {"input_hash": calcul_hash}, CALCUL_PROJECTION
+            ).sort("coefficients_version", -1).limit(1).to_list(1)
+            if older:
+                return older[0], "database"
+        return None, "miss"
+
+    async def get_or_compute(self, inputs: dict) -> Tuple[dict, str]:
+        """Return (calculation, source) for ``inputs``, computing and storing it on a miss."""
+        canonical = canonical_inputs(inputs)
+        calcul_hash = input_hash(canonical)
+        calcul, source = await self.get(calcul_hash)
+        if calcul is not None:
+            return calcul, source
+
+        calcul = {
+            "input_hash": calcul_hash,
+            "coefficients_version": self.version,
+            "inputs": canonical,
+            "results": compute(inputs),
+            "created_at": datetime.utcnow(),
+        }
+        # Concurrent misses on the same inputs compute the same thing: first write wins
+        await self.collection.update_one(
+            {"input_hash": calcul_hash, "coefficients_version": self.version},
+            {"$setOnInsert": calcul},
+            upsert=True,
+        )
+        self.cache.set((calcul_hash, self.version), calcul)
+        return calcul, "computed"
+
+    def stats(self) -> dict:
+        return {"coefficients_version": self.version, "cache": self.cache.stats()}
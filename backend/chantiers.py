@@ -0,0 +1,139 @@
+"""Data access for the chantiers collection.
+
+A chantier is one deep document: rooms with their fixtures, manual
+measurements, technical photos (base64), technical sheets and custom tabs.
+Reads only load what they are asked for: the list projects a summary, with
+the size of each section kept in ``counts`` so it never has to load them,
+and the detail loads only the sections named in ``include``.
+
+Writes target one item: an element pushed, patched or pulled in place with
+positional operators, so editing one measurement neither sends nor rewrites
+the photos next to it. Every write bumps ``version`` and ``updated_at``.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+from pymongo import ReturnDocument
+
+# Top-level arrays, loaded only on demand
+SECTIONS = (
+    "pieces",
+    "mesures_manuelles",
+    "photos_techniques",
+    "fiches_techniques",
+    "onglets_personnalises",
+)
+
+# Arrays nested in the items of a section
+CHILD_SECTIONS = {
+    "pieces": "elements",
+    "onglets_personnalises": "champs",
+}
+
+SUMMARY_FIELDS = (
+    "id", "client_id", "client_name", "adresse", "type", "sous_type", "status",
+    "date_debut", "date_fin", "counts", "version", "created_at", "updated_at",
+)
+SUMMARY_PROJECTION = {"_id": 0, **{field: 1 for field in SUMMARY_FIELDS}}
+
+
+def detail_projection(include: Iterable[str]) -> dict:
+    # Exclusion only: fields added to the model later are returned by default
+    return {"_id": 0, **{section: 0 for section in SECTIONS if section not in include}}
+
+
+def _touch() -> dict:
+    return {"$set": {"updated_at": datetime.utcnow()}, "$inc": {"version": 1}}
+
+
+class ChantierRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def create(self, chantier: dict) -> dict:
+        chantier = {**chantier, "counts": {section: len(chantier.get(section) or []) for section in SECTIONS}}
+        # insert_one adds _id to the dict it is given
+        await self.collection.insert_one(dict(chantier))
+        return chantier
+
+    async def get(self, chantier_id: str, include: Iterable[str] = ()) -> Optional[dict]:
+        return await self.collection.find_one({"id": chantier_id}, detail_projection(set(include)))
+
+    async def update(self, chantier_id: str, fields: dict) -> Optional[dict]:
+        """Set top-level fields and return the updated summary."""
+        update = _touch()
+        update["$set"].update(fields)
+        return await self.collection.find_one_and_update(
+            {"id": chantier_id}, update,
+            projection=SUMMARY_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def delete(self, chantier_id: str) -> bool:
+        result = await self.collection.delete_one({"id": chantier_id})
+        return result.deleted_count == 1
+
+    # Section items
+
+    async def add_item(self, chantier_id: str, section: str, item: dict, parent_id: Optional[str] = None) -> bool:
+        """Append ``item`` to a section, or to the child array of item ``parent_id``."""
+        update = _touch()
+        query = {"id": chantier_id}
+        if parent_id is None:
+            update["$push"] = {section: item}
+            update["$inc"][f"counts.{section}"] = 1
+        else:
+            query[f"{section}.id"] = parent_id
+            update["$push"] = {f"{section}.$.{CHILD_SECTIONS[section]}": item}
+        result = await self.collection.update_one(query, update)
+        return result.matched_count == 1
+
+    async def update_item(
+        self,
+        chantier_id: str,
+        section: str,
+        item_id: str,
+        fields: dict,
+        parent_id: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Set ``fields`` on one item in place and return the item, or None if missing."""
+        update = _touch()
+        options = {}
+        if parent_id is None:
+            query = {"id": chantier_id, f"{section}.id": item_id}
+            prefix = f"{section}.$"
+            projection = {"_id": 0, section: {"$elemMatch": {"id": item_id}}}
+        else:
+            child = CHILD_SECTIONS[section]
+            query = {"id": chantier_id, section: {"$elemMatch": {"id": parent_id, f"{child}.id": item_id}}}
+            prefix = f"{section}.$[parent].{child}.$[item]"
+            options["array_filters"] = [{"parent.id": parent_id}, {"item.id": item_id}]
+            projection = {"_id": 0, section: {"$elemMatch": {"id": parent_id}}}
+        update["$set"].update({f"{prefix}.{field}": value for field, value in fields.items()})
+
+        chantier = await self.collection.find_one_and_update(
+            query, update,
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+            **options,
+        )
+        if chantier is None:
+            return None
+        item = chantier[section][0]
+        if parent_id is not None:
+            item = next(child for child in item[CHILD_SECTIONS[section]] if child["id"] == item_id)
+        return item
+
+    async def remove_item(self, chantier_id: str, section: str, item_id: str, parent_id: Optional[str] = None) -> bool:
+        update = _touch()
+        if parent_id is None:
+            query = {"id": chantier_id, f"{section}.id": item_id}
+            update["$pull"] = {section: {"id": item_id}}
+            update["$inc"][f"counts.{section}"] = -1
+        else:
+            child = CHILD_SECTIONS[section]
+            query = {"id": chantier_id, section: {"$elemMatch": {"id": parent_id, f"{child}.id": item_id}}}
+            update["$pull"] = {f"{section}.$.{child}": {"id": item_id}}
+        # The filter requires the item, so counts only move when something is pulled
+        result = await self.collection.update_one(query, update)
+        return result.matched_count == 1
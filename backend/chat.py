@@ -0,0 +1,218 @@
+"""Chat rooms: in-process fan-out to WebSockets and batched persistence.
+
+``ChatBroker`` keeps, per channel, the subscribers connected to this worker.
+Every subscriber owns a bounded queue drained by its own sender task, so
+publishing never waits on a socket, and each event is encoded to JSON once
+whatever the number of recipients. When a subscriber's queue is full it
+either misses that event (``drop``) or is disconnected (``disconnect``): a
+slow phone can neither grow the worker's memory nor delay the others.
+
+``MessageWriter`` takes persistence off the hot path: messages are queued and
+written with unordered ``insert_many`` batches, when a batch is full or every
+``flush_interval`` seconds. A batch leaves the backlog only once written, so
+neither a failed write nor a shutdown in the middle of one loses it. The
+backlog is bounded too; once it is full new messages are refused rather than
+buffered.
+
+Fan-out is per process: with several workers, a message reaches the sockets
+held by the worker it was sent to.
+"""
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+import orjson
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_POLICIES = ("drop", "disconnect")
+
+_DUPLICATE_KEY = 11000
+
+
+def encode_event(event: dict) -> str:
+    # Same encoder as the REST responses, so timestamps look alike on both
+    return orjson.dumps(event).decode("utf-8")
+
+
+class Subscriber:
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.channels: Set[str] = set()
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.evicted = False
+
+    async def next_event(self) -> Optional[str]:
+        """Next encoded event to send, or None once the broker evicted this subscriber."""
+        return await self.queue.get()
+
+
+class ChatBroker:
+    def __init__(self, queue_size: int = 256, slow_consumer: str = "disconnect"):
+        if slow_consumer not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"slow_consumer must be one of {SLOW_CONSUMER_POLICIES}")
+        self.queue_size = queue_size
+        self.slow_consumer = slow_consumer
+        self._rooms: Dict[str, Set[Subscriber]] = {}
+        self._subscribers: Set[Subscriber] = set()
+        self.counters: Counter = Counter()
+
+    def subscribe(self, user_id: str) -> Subscriber:
+        subscriber = Subscriber(user_id, self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        for channel in list(subscriber.channels):
+            self.leave(subscriber, channel)
+        self._subscribers.discard(subscriber)
+
+    def join(self, subscriber: Subscriber, channel: str) -> None:
+        self._rooms.setdefault(channel, set()).add(subscriber)
+        subscriber.channels.add(channel)
+
+    def leave(self, subscriber: Subscriber, channel: str) -> None:
+        room = self._rooms.get(channel)
+        if room is not None:
+            room.discard(subscriber)
+            if not room:
+                del self._rooms[channel]
+        subscriber.channels.discard(channel)
+
+    def publish(self, channel: str, event: dict) -> int:
+        """Queue ``event`` for every subscriber of ``channel``; return how many got it."""
+        self.counters["published"] += 1
+        payload = encode_event(event)
+        delivered = 0
+        # Copy: evicting a subscriber changes the room while we walk it
+        for subscriber in list(self._rooms.get(channel, ())):
+            delivered += self.deliver(subscriber, payload)
+        return delivered
+
+    def deliver(self, subscriber: Subscriber, payload: str) -> bool:
+        if subscriber.evicted:
+            return False
+        try:
+            subscriber.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            if self.slow_consumer == "drop":
+                subscriber.dropped += 1
+                self.counters["dropped"] += 1
+            else:
+                self._evict(subscriber)
+            return False
+        self.counters["delivered"] += 1
+        return True
+
+    def _evict(self, subscriber: Subscriber) -> None:
+        self.counters["evicted"] += 1
+        subscriber.evicted = True
+        self.unsubscribe(subscriber)
+        # Free the backlog now and wake the sender with the end-of-stream marker
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "channels": len(self._rooms),
+            "slow_consumer": self.slow_consumer,
+            **self.counters,
+        }
+
+
+class MessageWriter:
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 200,
+        flush_interval: float = 0.25,
+        max_pending: int = 10000,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[dict] = []
+        self._wakeup = asyncio.Event()
+        # One flush at a time: each one writes the head of the backlog
+        self._flushing = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.counters: Counter = Counter()
+
+    def add(self, message: dict) -> bool:
+        """Queue a message for writing; False when the backlog is full."""
+        if len(self._pending) >= self.max_pending:
+            self.counters["refused"] += 1
+            return False
+        self._pending.append(message)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # The batch is still pending: log and retry on the next tick
+                self.counters["errors"] += 1
+                logger.exception("Chat message writer failed, will retry")
+
+    async def flush(self) -> None:
+        async with self._flushing:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        while self._pending:
+            # Left in the backlog until written: a cancelled insert is retried by
+            # the final flush of stop(). insert_many stamped each message's _id,
+            # so a retry hits duplicates rather than writing messages twice
+            batch = self._pending[:self.batch_size]
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+            except BulkWriteError as exc:
+                # Duplicates are messages a retried batch already wrote
+                failures = [
+                    error for error in exc.details.get("writeErrors", [])
+                    if error.get("code") != _DUPLICATE_KEY
+                ]
+                self.counters["written"] += exc.details.get("nInserted", 0)
+                if failures:
+                    self.counters["failed"] += len(failures)
+                    logger.error("Dropped %d chat messages: %s", len(failures), failures[0].get("errmsg"))
+            except PyMongoError:
+                # Keep the batch for the next tick; the backlog bound stops it growing forever
+                self.counters["retries"] += 1
+                logger.exception("Chat message batch write failed, will retry")
+                return
+            else:
+                self.counters["written"] += len(batch)
+            del self._pending[:len(batch)]
+            self.counters["batches"] += 1
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), **self.counters}
@@ -0,0 +1,119 @@
+"""Command line entry point of the API.
+
+``serve`` runs the bootstrap (indexes, default users, backfills) once in a
+child process, then starts the uvicorn workers with ``BOOTSTRAP_ON_STARTUP``
+off, so N workers never race on the same setup. This process never imports
+``server`` itself: with one worker, uvicorn imports ``server:app`` here, and
+it must get a Mongo client and a password executor nobody has closed. Each
+worker still builds its own search index and warms up before it accepts
+connections: uvicorn only listens once the startup handlers have returned.
+
+Workers are separate processes, one per core by default. Everything kept in
+memory (search index, caches, rate limits, metrics, profiling) is per
+worker.
+
+    python cli.py serve --workers 4 --port 8001
+    python cli.py bootstrap
+"""
+import asyncio
+import importlib.util
+import os
+import subprocess
+import sys
+from typing import Optional
+
+import typer
+import uvicorn
+
+cli = typer.Typer(help="H2EAUX Gestion API", add_completion=False)
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def run_bootstrap() -> None:
+    # Imported here: importing server reads the environment and builds the client
+    import server
+    from indexes import IndexBuildError
+
+    async def bootstrap():
+        try:
+            await server.bootstrap()
+        finally:
+            server.client.close()
+            server.password_executor.shutdown(wait=False)
+
+    try:
+        asyncio.run(bootstrap())
+    except IndexBuildError as exc:
+        # Data to fix by hand (duplicates), not a crash: say what, without a traceback
+        typer.echo(f"Bootstrap failed: {exc}", err=True)
+        raise typer.Exit(1)
+
+
+def run_bootstrap_process() -> None:
+    """``run_bootstrap`` in a child process, which takes its client and executor with it."""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "bootstrap"])
+    if completed.returncode != 0:
+        typer.echo("Bootstrap failed", err=True)
+        raise typer.Exit(completed.returncode)
+
+
+@cli.command()
+def bootstrap():
+    """Create the indexes and default users and run the backfills, then exit."""
+    run_bootstrap()
+    typer.echo("Bootstrap complete")
+
+
+@cli.command()
+def serve(
+    host: str = typer.Option("0.0.0.0", help="Address to bind."),
+    port: int = typer.Option(8001, help="Port to bind."),
+    workers: int = typer.Option(os.cpu_count() or 1, min=1, help="Worker processes, one per core by default."),
+    skip_bootstrap: bool = typer.Option(False, help="Assume the bootstrap already ran (e.g. in a release step)."),
+    warmup_connections: Optional[int] = typer.Option(
+        None, min=0, help="Pooled connections each worker opens before serving (WARMUP_CONNECTIONS)."
+    ),
+    backlog: int = typer.Option(2048, help="Pending connections the socket queues."),
+    keep_alive: int = typer.Option(75, help="Seconds an idle keep-alive connection stays open."),
+    forwarded_allow_ips: str = typer.Option(
+        "127.0.0.1", help="Proxies trusted for X-Forwarded-For, which sets the address rate limits key on."
+    ),
+    access_log: bool = typer.Option(False, help="Log every request."),
+):
+    """Run the API with WORKERS processes behind one socket."""
+    if not skip_bootstrap:
+        run_bootstrap_process()
+    # Read by the workers when they start; they inherit this environment
+    os.environ["BOOTSTRAP_ON_STARTUP"] = "false"
+    if warmup_connections is not None:
+        os.environ["WARMUP_CONNECTIONS"] = str(warmup_connections)
+
+    # uvloop and httptools come with uvicorn[standard]; the pure Python
+    # implementations are the fallback
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    typer.echo(f"Starting {workers} worker(s) on {host}:{port} (loop: {loop}, http: {http})")
+    uvicorn.run(
+        "server:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=backlog,
+        # Longer than the idle timeout of the load balancer in front, so it
+        # never reuses a connection the worker is closing
+        timeout_keep_alive=keep_alive,
+        proxy_headers=True,
+        forwarded_allow_ips=forwarded_allow_ips,
+        access_log=access_log,
+        # Requests still running on shutdown get this long to finish
+        timeout_graceful_shutdown=30,
+    )
+
+
+if __name__ == "__main__":
+    cli()
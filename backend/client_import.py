@@ -0,0 +1,119 @@
+"""Parsing and column-wise validation of client import files.
+
+Uploads (CSV, XLSX or a JSON array) are loaded into a pandas DataFrame of
+strings. Normalisation and validation run on whole columns at once, so the
+cost per row stays in the microseconds even for 100k-row files.
+"""
+import io
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+IMPORT_FIELDS = [
+    "id", "nom", "prenom", "telephone", "email", "adresse",
+    "ville", "code_postal", "type_chauffage", "notes",
+]
+REQUIRED_FIELDS = ["nom", "prenom"]
+
+_EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def read_upload(content: bytes, filename: str) -> pd.DataFrame:
+    name = (filename or "").lower()
+    # Legacy .xls needs xlrd, which is not a dependency
+    if name.endswith(".xls"):
+        raise ImportFormatError("Legacy .xls files are not supported: save the file as .xlsx or CSV")
+    try:
+        if name.endswith((".xlsx", ".xlsm")):
+            frame = pd.read_excel(io.BytesIO(content), dtype=str)
+        else:
+            frame = pd.read_csv(
+                io.BytesIO(content),
+                dtype=str,
+                keep_default_na=False,
+                sep=None,  # sniff "," vs ";" (French Excel exports use ";")
+                engine="python",
+                encoding="utf-8-sig",
+            )
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as exc:
+        raise ImportFormatError(f"Unreadable file: {exc}") from exc
+    except ImportError as exc:
+        # pandas raises it when the reader a format needs is not installed
+        raise ImportFormatError(f"Unsupported file format: {exc}") from exc
+    return frame
+
+
+def read_records(records: List[dict]) -> pd.DataFrame:
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ImportFormatError("Expected a JSON array of client objects")
+    # object dtype keeps postcodes like 01000 or 29200 from turning into floats
+    frame = pd.DataFrame(records, dtype=object)
+    return frame.apply(lambda column: column.map(lambda v: "" if pd.isna(v) else str(v)))
+
+
+def normalize(frame: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[int, List[str]]]:
+    """Normalise the known columns and return (valid rows, errors by row number).
+
+    Only the columns present in the upload are returned, so an upsert never
+    blanks fields the file did not mention. Rows with an ``id`` are updates
+    and may be partial: the required fields are only required of new clients,
+    and a blank one in an update leaves the stored value alone. Row numbers
+    are 1-based positions in the uploaded data (header excluded).
+    """
+    frame = frame.rename(columns=lambda c: str(c).strip().lower())
+    frame = frame.reindex(columns=[c for c in IMPORT_FIELDS if c in frame.columns])
+    frame = frame.fillna("").astype(str).apply(lambda column: column.str.strip())
+    provided = list(frame.columns)
+    for field in IMPORT_FIELDS:
+        if field not in frame.columns and field != "id":
+            frame[field] = ""
+    frame.index = pd.RangeIndex(1, len(frame) + 1)
+
+    problems: List[Tuple[pd.Series, str]] = []
+
+    creates = frame["id"] == "" if "id" in frame.columns else pd.Series(True, index=frame.index)
+    for field in REQUIRED_FIELDS:
+        problems.append((creates & (frame[field] == ""), f"{field} is required"))
+
+    # Telephone: keep digits, fold +33 into the national format, print as "06 12 34 56 78"
+    digits = frame["telephone"].str.replace(r"\D", "", regex=True)
+    international = digits.str.match(r"^33\d{9}$")
+    digits = digits.where(~international, "0" + digits.str[2:])
+    problems.append((
+        (digits != "") & ~digits.str.match(r"^0\d{9}$"),
+        "telephone must be a 10-digit French number",
+    ))
+    pairs = [digits.str[i:i + 2] for i in range(0, 10, 2)]
+    frame["telephone"] = digits.where(
+        digits == "",
+        pairs[0] + " " + pairs[1] + " " + pairs[2] + " " + pairs[3] + " " + pairs[4],
+    )
+
+    # Postcode: spreadsheets drop the leading zero of 01000-09999
+    postcode = frame["code_postal"].str.replace(r"\s", "", regex=True)
+    postcode = postcode.where(~postcode.str.match(r"^\d{4}$"), "0" + postcode)
+    problems.append((
+        (postcode != "") & ~postcode.str.match(r"^\d{5}$"),
+        "code_postal must have 5 digits",
+    ))
+    frame["code_postal"] = postcode
+
+    email = frame["email"].str.lower()
+    problems.append((
+        (email != "") & ~email.str.match(_EMAIL_PATTERN),
+        "email is not valid",
+    ))
+    frame["email"] = email
+
+    errors: Dict[int, List[str]] = {}
+    invalid = pd.Series(False, index=frame.index)
+    for mask, message in problems:
+        invalid |= mask
+        for row in mask.index[mask]:
+            errors.setdefault(int(row), []).append(message)
+
+    return frame.loc[~invalid, provided], errors
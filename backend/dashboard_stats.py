@@ -0,0 +1,131 @@
+"""Materialized dashboard statistics.
+
+The headline numbers of the dashboard live in one document of the ``stats``
+collection, so reading them is a single ``_id`` fetch however many clients
+there are. The client write routes keep it current with ``$inc`` on the
+buckets a write moves a client in or out of, and ``rebuild`` recomputes it
+from scratch with an aggregation pipeline, periodically, to correct drift:
+increments lost to a crash between the two writes, bulk upserts whose
+previous values are unknown, or an increment racing the rebuild itself.
+
+Bucket values become field names, so ``.``, ``$`` and ``%`` are escaped and
+the empty value (a client with no ``ville``) is stored as ``%``.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Optional
+
+from pymongo import ReturnDocument
+
+DASHBOARD_ID = "dashboard"
+
+# Client field bucketed under clients.by_<field>
+CLIENT_BUCKETS = ("ville", "type_chauffage")
+
+_ESCAPES = (("%", "%25"), (".", "%2E"), ("$", "%24"))
+
+
+def encode_key(value) -> str:
+    value = "" if value is None else str(value)
+    if value == "":
+        return "%"
+    for raw, escaped in _ESCAPES:
+        value = value.replace(raw, escaped)
+    return value
+
+
+def decode_key(key: str) -> str:
+    if key == "%":
+        return ""
+    for raw, escaped in reversed(_ESCAPES):
+        key = key.replace(escaped, raw)
+    return key
+
+
+def _month(created_at) -> str:
+    return created_at.strftime("%Y-%m") if isinstance(created_at, datetime) else "%"
+
+
+def client_buckets(client: dict) -> Counter:
+    """The counters ``client`` contributes to, as dotted paths."""
+    paths = Counter({"clients.total": 1})
+    for field in CLIENT_BUCKETS:
+        paths[f"clients.by_{field}.{encode_key(client.get(field))}"] += 1
+    paths[f"clients.by_month.{_month(client.get('created_at'))}"] += 1
+    return paths
+
+
+class DashboardStats:
+    def __init__(self, collection, clients):
+        self.collection = collection
+        self.clients = clients
+
+    async def _apply(self, delta: Counter) -> None:
+        increments = {path: count for path, count in delta.items() if count}
+        if not increments:
+            return
+        await self.collection.update_one(
+            {"_id": DASHBOARD_ID},
+            {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    async def clients_added(self, clients: Iterable[dict]) -> None:
+        delta = Counter()
+        for client in clients:
+            delta.update(client_buckets(client))
+        await self._apply(delta)
+
+    async def client_removed(self, client: dict) -> None:
+        delta = Counter()
+        delta.subtract(client_buckets(client))
+        await self._apply(delta)
+
+    async def client_changed(self, before: dict, after: dict) -> None:
+        # Most edits touch neither bucket: the delta is empty and nothing is written
+        delta = client_buckets(after)
+        delta.subtract(client_buckets(before))
+        await self._apply(delta)
+
+    async def get(self) -> Optional[dict]:
+        stats = await self.collection.find_one({"_id": DASHBOARD_ID})
+        if stats is None:
+            return None
+        clients = stats.get("clients", {})
+        return {
+            "clients": {
+                "total": clients.get("total", 0),
+                **{
+                    name: {decode_key(key): count for key, count in clients.get(name, {}).items() if count}
+                    for name in [f"by_{field}" for field in CLIENT_BUCKETS] + ["by_month"]
+                },
+            },
+            "updated_at": stats.get("updated_at"),
+            "rebuilt_at": stats.get("rebuilt_at"),
+        }
+
+    async def rebuild(self) -> dict:
+        """Recompute every counter from the clients collection and replace the document."""
+        facets = {
+            f"by_{field}": [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+            for field in CLIENT_BUCKETS
+        }
+        facets["by_month"] = [{"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+            "count": {"$sum": 1},
+        }}]
+        facets["total"] = [{"$count": "count"}]
+        cursor = self.clients.aggregate([{"$facet": facets}])
+        result = (await cursor.to_list(1))[0]
+
+        clients = {"total": result["total"][0]["count"] if result["total"] else 0}
+        for name, groups in result.items():
+            if name != "total":
+                clients[name] = {encode_key(group["_id"]): group["count"] for group in groups}
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": DASHBOARD_ID},
+            {"$set": {"clients": clients, "updated_at": now, "rebuilt_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
@@ -0,0 +1,217 @@
+"""Content-addressed file storage for documents.
+
+Files live under ``root/blobs/<2 hex>/<sha256>``: a file uploaded twice is
+stored once, and the document records in Mongo point at their blob by hash.
+Uploads are resumable: each upload session appends to ``root/uploads/<id>.part``,
+whose size on disk is the authoritative offset to resume from, and the part
+is hashed and moved into place (or dropped, if the blob already exists) once
+complete. Chunks are streamed to disk through a small buffer, never held
+whole in memory.
+
+``RangeFileResponse`` serves one byte range of a file with 206 Partial
+Content, which Starlette's ``FileResponse`` does not do yet. Both hand the
+file to the server (``pathsend`` / ``zerocopysend`` ASGI extensions) when it
+supports it, and stream 64 KiB reads otherwise.
+"""
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+HASH_BUFFER_SIZE = 1024 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class UploadOverflow(ValueError):
+    pass
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def is_sha256(value: str) -> bool:
+    return bool(_SHA256.match(value or ""))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive (start, end) of a single ``Range: bytes=`` header.
+
+    None means "send the whole file": no header, a syntax we do not serve
+    (several ranges) or a malformed one, all of which a server may ignore.
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+class DocumentStorage:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.uploads = self.root / "uploads"
+
+    def prepare(self) -> None:
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.uploads.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, sha256: str) -> Path:
+        if not is_sha256(sha256):
+            raise ValueError("Invalid SHA-256")
+        return self.blobs / sha256[:2] / sha256
+
+    def part_path(self, upload_id: str) -> Path:
+        # Upload ids are generated server side (uuid4) but still never trusted as paths
+        return self.uploads / f"{Path(upload_id).name}.part"
+
+    def has_blob(self, sha256: str) -> bool:
+        return self.blob_path(sha256).is_file()
+
+    def received(self, upload_id: str) -> int:
+        try:
+            return self.part_path(upload_id).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    async def append(self, upload_id: str, offset: int, limit: int, chunks: AsyncIterator[bytes]) -> int:
+        """Write the streamed ``chunks`` at ``offset`` and return the new size.
+
+        At most ``limit`` bytes are accepted; beyond that the part is cut back
+        to ``offset`` and ``UploadOverflow`` is raised.
+        """
+        path = self.part_path(upload_id)
+        written = 0
+        buffer = bytearray()
+        file = await anyio.open_file(path, "r+b" if path.exists() else "wb")
+        try:
+            await file.seek(offset)
+            await file.truncate()
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > limit:
+                    await file.truncate(offset)
+                    raise UploadOverflow(f"Chunk goes past the declared size by {written - limit} bytes")
+                buffer += chunk
+                if len(buffer) >= WRITE_BUFFER_SIZE:
+                    await file.write(bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await file.write(bytes(buffer))
+        finally:
+            await file.aclose()
+        return offset + written
+
+    def _hash_file(self, path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(HASH_BUFFER_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    async def complete(self, upload_id: str, expected_sha256: Optional[str] = None) -> Tuple[str, bool]:
+        """Hash a finished part and move it into the blob store.
+
+        Returns (sha256, deduplicated): when an identical blob already exists
+        the part is discarded instead. A part that does not match
+        ``expected_sha256`` is discarded and ``ValueError`` raised.
+        """
+        path = self.part_path(upload_id)
+        sha256 = await anyio.to_thread.run_sync(self._hash_file, path)
+        if expected_sha256 and sha256 != expected_sha256:
+            path.unlink()
+            raise ValueError(f"Uploaded content has SHA-256 {sha256}, not {expected_sha256}")
+        target = self.blob_path(sha256)
+        if target.is_file():
+            path.unlink()
+            return sha256, True
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Same filesystem: an atomic rename, readers never see a partial blob
+        os.replace(path, target)
+        return sha256, False
+
+    def create_part(self, upload_id: str) -> None:
+        self.part_path(upload_id).touch()
+
+    def discard_part(self, upload_id: str) -> None:
+        self.part_path(upload_id).unlink(missing_ok=True)
+
+    def remove_blob(self, sha256: str) -> None:
+        self.blob_path(sha256).unlink(missing_ok=True)
+
+    def purge_parts(self, keep: set) -> int:
+        """Delete parts whose upload session is gone (expired or finished)."""
+        removed = 0
+        for path in self.uploads.glob("*.part"):
+            if path.stem not in keep:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+class RangeFileResponse(FileResponse):
+    """206 Partial Content for the inclusive byte range ``start``-``end``."""
+
+    def __init__(self, path, start: int, end: int, size: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.length = end - start + 1
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.start)
+                remaining = self.length
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    })
+                if remaining:
+                    # File shrank under us: end the body rather than hang the client
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,84 @@
+"""Readiness and event-loop health.
+
+``/api/health`` (also at ``/api/health/live``) only says the process answers.
+``/api/health/ready`` also needs MongoDB to answer a ``ping`` within a
+timeout, so a load balancer stops routing to a node that lost its database.
+
+``ReadinessProbe`` shares one ``ping`` between concurrent checks: while
+MongoDB is unreachable a ping holds a Motor worker thread until server
+selection gives up, long after the check has timed out, and one probe per
+request would pile those threads up.
+
+``LoopLagMonitor`` sleeps for a fixed interval in a background task and
+records how late it wakes up. A loop busy with blocking work wakes it late,
+whatever the cause, so the lag shows the latency every request on the worker
+is paying on top of its own.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+
+class ReadinessProbe:
+    def __init__(self, db, timeout: float):
+        self.db = db
+        self.timeout = timeout
+        self._ping: Optional[asyncio.Task] = None
+
+    async def _round_trip(self) -> float:
+        start = time.perf_counter()
+        await self.db.command("ping")
+        return time.perf_counter() - start
+
+    async def check(self) -> dict:
+        """``ok`` and the ping latency, or the reason it failed."""
+        if self._ping is None or self._ping.done():
+            self._ping = asyncio.ensure_future(self._round_trip())
+            # A ping outliving its checks still has its error retrieved
+            self._ping.add_done_callback(lambda ping: ping.cancelled() or ping.exception())
+        try:
+            seconds = await asyncio.wait_for(asyncio.shield(self._ping), self.timeout)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"ping timed out after {self.timeout:g}s"}
+        except Exception as exc:
+            return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        return {"ok": True, "latency_ms": seconds * 1000}
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        self.interval = interval
+        # Lag of the last ``window`` wake-ups, in seconds
+        self.samples = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def stats(self) -> dict:
+        samples = list(self.samples)
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": len(samples),
+            "current_ms": samples[-1] * 1000 if samples else None,
+            "mean_ms": sum(samples) / len(samples) * 1000 if samples else None,
+            "max_ms": max(samples) * 1000 if samples else None,
+        }
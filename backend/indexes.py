@@ -0,0 +1,378 @@
+"""Index declarations for the H2EAUX Gestion collections.
+
+Every index the API relies on is declared in ``INDEXES`` and created or
+reconciled at startup by ``ensure_indexes``; a unique index is not built over
+duplicate values, which are reported instead. ``QUERY_PLAN_CHECKS`` lists the
+queries issued by the routes; ``verify_query_plans`` runs ``explain()`` on each
+of them and refuses to continue if one falls back to a collection scan.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Deleted clients are remembered this long for delta sync, then compacted by TTL
+TOMBSTONE_RETENTION_SECONDS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', '30')) * 24 * 3600
+
+# Unfinished document uploads can be resumed for this long
+DOCUMENT_UPLOAD_RETENTION_SECONDS = int(os.environ.get('DOCUMENT_UPLOAD_RETENTION_HOURS', '24')) * 3600
+
+# Finished jobs (and their results) are kept this long
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_DAYS', '7')) * 24 * 3600
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "clients": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Serves both sort("created_at", -1) and the (created_at, id) keyset pagination
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        # Delta sync walks (updated_at, id) in ascending order
+        IndexModel([("updated_at", ASCENDING), ("id", ASCENDING)], name="updated_at_id"),
+    ],
+    "client_tombstones": [
+        IndexModel([("deleted_at", ASCENDING), ("id", ASCENDING)], name="deleted_at_id"),
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="deleted_at_ttl",
+            expireAfterSeconds=TOMBSTONE_RETENTION_SECONDS,
+        ),
+    ],
+    "calculs_pac": [
+        # One stored result per inputs and coefficient table version
+        IndexModel(
+            [("input_hash", ASCENDING), ("coefficients_version", ASCENDING)],
+            name="input_hash_version",
+            unique=True,
+        ),
+    ],
+    "chat_messages": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Channel history, newest first, keyset on (timestamp, id)
+        IndexModel(
+            [("channel", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="channel_timestamp_id",
+        ),
+    ],
+    "documents": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        # Listing filters, each keeping the newest-first keyset order
+        IndexModel(
+            [("category", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="category_created_at_id",
+        ),
+        IndexModel(
+            [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="client_id_created_at_id",
+        ),
+        IndexModel(
+            [("chantier_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="chantier_id_created_at_id",
+        ),
+        # Deduplication and blob reference counting
+        IndexModel([("sha256", ASCENDING)], name="sha256"),
+    ],
+    "document_uploads": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("created_at", ASCENDING)],
+            name="created_at_ttl",
+            expireAfterSeconds=DOCUMENT_UPLOAD_RETENTION_SECONDS,
+        ),
+    ],
+    "chantiers": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="status_created_at_id",
+        ),
+        IndexModel(
+            [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="client_id_created_at_id",
+        ),
+    ],
+    "rendez_vous": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Per-technician ranges and the overlap check (last start before an end)
+        IndexModel([("assigne_a", ASCENDING), ("start", ASCENDING)], name="assigne_a_start"),
+        # Everyone's calendar
+        IndexModel([("start", ASCENDING)], name="start"),
+    ],
+    "jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Claiming: oldest queued job of the types with a free slot
+        IndexModel(
+            [("status", ASCENDING), ("type", ASCENDING), ("created_at", ASCENDING)],
+            name="status_type_created_at",
+        ),
+        # Recovery of jobs whose runner stopped renewing the lease
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease_expires_at"),
+        # Queued and running jobs have no finished_at and never expire
+        IndexModel([("finished_at", ASCENDING)], name="finished_at_ttl", expireAfterSeconds=JOB_RETENTION_SECONDS),
+    ],
+}
+
+
+class QueryPlanCheck(NamedTuple):
+    route: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+_SAMPLE_DATE = datetime(2025, 1, 1)
+
+QUERY_PLAN_CHECKS: List[QueryPlanCheck] = [
+    QueryPlanCheck("POST /auth/login", "users", {"username": "admin"}),
+    QueryPlanCheck("POST /auth/register", "users", {"username": "admin"}),
+    QueryPlanCheck("get_current_user", "users", {"id": "sample"}),
+    QueryPlanCheck("GET /clients", "clients", {}, [("created_at", DESCENDING)]),
+    QueryPlanCheck(
+        "GET /clients?after=",
+        "clients",
+        {"$or": [
+            {"created_at": {"$lt": _SAMPLE_DATE}},
+            {"created_at": _SAMPLE_DATE, "id": {"$lt": "sample"}},
+        ]},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    QueryPlanCheck(
+        "GET /clients/changes",
+        "clients",
+        {"updated_at": {"$lt": _SAMPLE_DATE}, "$or": [
+            {"updated_at": {"$gt": _SAMPLE_DATE}},
+            {"updated_at": _SAMPLE_DATE, "id": {"$gt": "sample"}},
+        ]},
+        [("updated_at", ASCENDING), ("id", ASCENDING)],
+    ),
+    QueryPlanCheck(
+        "GET /clients/changes",
+        "client_tombstones",
+        {"deleted_at": {"$lt": _SAMPLE_DATE}, "$or": [
+            {"deleted_at": {"$gt": _SAMPLE_DATE}},
+            {"deleted_at": _SAMPLE_DATE, "id": {"$gt": "sample"}},
+        ]},
+        [("deleted_at", ASCENDING), ("id", ASCENDING)],
+    ),
+    QueryPlanCheck("GET /clients/search", "clients", {"id": {"$in": ["sample", "other"]}}),
+    QueryPlanCheck("GET /clients/{client_id}", "clients", {"id": "sample"}),
+    QueryPlanCheck("PUT /clients/{client_id}", "clients", {"id": "sample"}),
+    QueryPlanCheck("DELETE /clients/{client_id}", "clients", {"id": "sample"}),
+    QueryPlanCheck("POST /calculs_pac", "calculs_pac", {"input_hash": "sample", "coefficients_version": 1}),
+    QueryPlanCheck("GET /calculs_pac/{input_hash}", "calculs_pac", {"input_hash": "sample", "coefficients_version": 1}),
+    QueryPlanCheck(
+        "GET /calculs_pac/{input_hash} (older tables)", "calculs_pac",
+        {"input_hash": "sample"}, [("coefficients_version", DESCENDING)],
+    ),
+    QueryPlanCheck("GET /documents", "documents", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    QueryPlanCheck(
+        "GET /documents?category=",
+        "documents",
+        {"category": "Devis"},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    QueryPlanCheck(
+        "GET /documents?client_id=",
+        "documents",
+        {"client_id": "sample"},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    QueryPlanCheck(
+        "GET /documents?chantier_id=",
+        "documents",
+        {"chantier_id": "sample"},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    QueryPlanCheck("GET /documents/{document_id}", "documents", {"id": "sample"}),
+    QueryPlanCheck("DELETE /documents/{document_id}", "documents", {"sha256": "0" * 64}),
+    QueryPlanCheck("PUT /documents/uploads/{upload_id}", "document_uploads", {"id": "sample"}),
+    QueryPlanCheck(
+        "GET /chat/channels/{channel}/messages",
+        "chat_messages",
+        {"channel": "general", "$or": [
+            {"timestamp": {"$lt": _SAMPLE_DATE}},
+            {"timestamp": _SAMPLE_DATE, "id": {"$lt": "sample"}},
+        ]},
+        [("timestamp", DESCENDING), ("id", DESCENDING)],
+    ),
+    QueryPlanCheck("GET /chantiers", "chantiers", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    QueryPlanCheck(
+        "GET /chantiers?status=",
+        "chantiers",
+        {"status": "En_cours"},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    QueryPlanCheck(
+        "GET /chantiers?client_id=",
+        "chantiers",
+        {"client_id": "sample"},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    QueryPlanCheck("GET /chantiers/{chantier_id}", "chantiers", {"id": "sample"}),
+    QueryPlanCheck("PATCH /chantiers/{chantier_id}/{section}/{item_id}", "chantiers", {"id": "sample", "pieces.id": "sample"}),
+    QueryPlanCheck(
+        "GET /rendez_vous?assigne_a=",
+        "rendez_vous",
+        {"start": {"$gte": _SAMPLE_DATE, "$lt": _SAMPLE_DATE}, "assigne_a": "sample"},
+        [("start", ASCENDING), ("id", ASCENDING)],
+    ),
+    QueryPlanCheck(
+        "GET /rendez_vous",
+        "rendez_vous",
+        {"start": {"$gte": _SAMPLE_DATE, "$lt": _SAMPLE_DATE}},
+        [("start", ASCENDING), ("id", ASCENDING)],
+    ),
+    QueryPlanCheck(
+        "POST /rendez_vous overlap check",
+        "rendez_vous",
+        {"assigne_a": "sample", "start": {"$lt": _SAMPLE_DATE}, "status": {"$nin": ["Annule"]}},
+        [("start", DESCENDING)],
+    ),
+    QueryPlanCheck("PUT /rendez_vous/{rdv_id}", "rendez_vous", {"id": "sample"}),
+    QueryPlanCheck(
+        "job runner claim",
+        "jobs",
+        {"status": "queued", "type": {"$in": ["clients_export", "calculs_pac_batch"]}},
+        [("created_at", ASCENDING)],
+    ),
+    QueryPlanCheck("job runner lease recovery", "jobs", {"status": "running", "lease_expires_at": {"$lt": _SAMPLE_DATE}}),
+    QueryPlanCheck("GET /jobs/{job_id}", "jobs", {"id": "sample"}),
+]
+
+
+class QueryPlanError(RuntimeError):
+    pass
+
+
+class IndexBuildError(RuntimeError):
+    pass
+
+
+# Duplicates named in the error; the log line lists them all
+_DUPLICATES_SHOWN = 10
+
+
+def _same_index(info: dict, document: dict) -> bool:
+    return (
+        [tuple(k) for k in info["key"]] == list(document["key"].items())
+        and bool(info.get("unique")) == bool(document.get("unique"))
+        and info.get("expireAfterSeconds") == document.get("expireAfterSeconds")
+    )
+
+
+async def _duplicate_values(collection, keys: List[str]) -> List[dict]:
+    """Values of ``keys`` held by more than one document, most repeated first."""
+    return await collection.aggregate([
+        {"$group": {"_id": {key: f"${key}" for key in keys}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+    ]).to_list(None)
+
+
+async def _check_unique(collection, index: IndexModel) -> None:
+    document = index.document
+    keys = list(document["key"])
+    duplicates = await _duplicate_values(collection, keys)
+    if not duplicates:
+        return
+    values = [
+        ", ".join(f"{key}={duplicate['_id'].get(key)!r}" for key in keys) + f" ({duplicate['count']} documents)"
+        for duplicate in duplicates
+    ]
+    logger.error(
+        "Cannot build unique index %s.%s, duplicated values: %s",
+        collection.name, document["name"], "; ".join(values),
+    )
+    shown = "; ".join(values[:_DUPLICATES_SHOWN])
+    if len(values) > _DUPLICATES_SHOWN:
+        shown += f" and {len(values) - _DUPLICATES_SHOWN} more"
+    raise IndexBuildError(
+        f"Unique index {collection.name}.{document['name']} cannot be built: "
+        f"merge or rename the duplicates first: {shown}"
+    )
+
+
+async def ensure_indexes(db) -> None:
+    """Create missing indexes and rebuild the ones whose definition changed.
+
+    Raises IndexBuildError, naming the offending values, when a unique index
+    would be built over duplicates or the server refuses an index.
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        missing = []
+        for index in indexes:
+            document = index.document
+            name = document["name"]
+            keys = list(document["key"].items())
+
+            current = existing.get(name)
+            changed = current is not None and not _same_index(current, document)
+            # Checked before anything is dropped, so a failure leaves the old index
+            if document.get("unique") and (current is None or changed):
+                await _check_unique(collection, index)
+            if changed:
+                logger.warning("Rebuilding index %s.%s (definition changed)", collection_name, name)
+                await collection.drop_index(name)
+                current = None
+
+            # The same key pattern under another name would make create_indexes fail
+            for other_name, info in existing.items():
+                if other_name not in (name, "_id_") and [tuple(k) for k in info["key"]] == keys:
+                    logger.warning("Dropping index %s.%s superseded by %s", collection_name, other_name, name)
+                    await collection.drop_index(other_name)
+
+            if current is None:
+                missing.append(index)
+
+        if missing:
+            try:
+                await collection.create_indexes(missing)
+            except OperationFailure as exc:
+                # Duplicates written since the check, or an index the server rejects
+                raise IndexBuildError(f"Could not build the indexes of {collection_name}: {exc}") from exc
+            logger.info(
+                "Created indexes on %s: %s",
+                collection_name,
+                ", ".join(index.document["name"] for index in missing),
+            )
+
+
+def _plan_stages(plan: Any):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+async def verify_query_plans(db) -> None:
+    """Explain every route query and raise QueryPlanError on any COLLSCAN."""
+    failures = []
+    for check in QUERY_PLAN_CHECKS:
+        cursor = db[check.collection].find(check.filter)
+        if check.sort:
+            cursor = cursor.sort(check.sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        stages = set(_plan_stages(winning_plan))
+        if "COLLSCAN" in stages:
+            failures.append(f"{check.route} ({check.collection} {check.filter})")
+        else:
+            logger.info("Query plan OK for %s: %s", check.route, ", ".join(sorted(stages)))
+
+    if failures:
+        raise QueryPlanError("Queries falling back to COLLSCAN: " + "; ".join(failures))
@@ -0,0 +1,314 @@
+"""Background jobs backed by a Mongo collection.
+
+A job is a document in ``jobs``: it is queued by the API, claimed atomically
+by one runner (``find_one_and_update`` on ``status``), and runs under a lease
+that the runner renews while the job is alive. A runner that dies stops
+renewing; once the lease has expired any runner puts the job back in the
+queue, up to ``max_attempts`` claims, then marks it failed.
+
+Each job type is registered with a handler and where it runs:
+
+- ``async``: a coroutine on the event loop, for Mongo-bound work;
+- ``thread``: a blocking function in a thread pool, for file or network I/O;
+- ``process``: a picklable module-level function in a process pool, for CPU
+  work. It only receives the params and cannot report progress.
+
+``concurrency`` caps how many jobs of a type one runner executes at once.
+Async and thread handlers receive ``(job, progress)``, the claimed job
+document and a ``progress(fraction, message)`` callable that updates it
+(throttled); process handlers receive ``job["params"]`` only. All return a
+BSON-serialisable result that is stored on the job.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("async", "thread", "process")
+PROGRESS_INTERVAL = 0.5
+
+
+class JobType(NamedTuple):
+    handler: Callable
+    kind: str
+    concurrency: int
+    # Permission (User.permissions key) needed to submit the job
+    permission: Optional[str]
+    # Validates and normalises params at submission; raises ValueError
+    validate: Optional[Callable[[dict], dict]]
+
+
+class UnknownJobType(ValueError):
+    pass
+
+
+class JobRunner:
+    def __init__(
+        self,
+        collection,
+        thread_workers: int = 4,
+        process_workers: int = 2,
+        lease_seconds: float = 60,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+    ):
+        self.collection = collection
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.runner_id = f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.types: Dict[str, JobType] = {}
+        self.running: Dict[str, asyncio.Task] = {}
+        self._running_by_type: Counter = Counter()
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._progress_writes = set()
+        self.counters: Counter = Counter()
+
+    def register(
+        self,
+        job_type: str,
+        handler: Callable,
+        kind: str = "async",
+        concurrency: int = 1,
+        permission: Optional[str] = None,
+        validate: Optional[Callable[[dict], dict]] = None,
+    ) -> None:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of {JOB_KINDS}")
+        self.types[job_type] = JobType(handler, kind, concurrency, permission, validate)
+
+    async def submit(self, job_type: str, params: dict, created_by: str) -> dict:
+        spec = self.types.get(job_type)
+        if spec is None:
+            raise UnknownJobType(f"Unknown job type: {job_type}")
+        if spec.validate is not None:
+            params = spec.validate(params)
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "progress": 0.0,
+            "message": None,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_by": created_by,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.collection.insert_one(dict(job))
+        self.counters["submitted"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.collection.find_one(
+            {"id": job_id}, {"_id": 0, "params": 0, "lease_owner": 0, "lease_expires_at": 0}
+        )
+
+    # Lifecycle
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="job")
+        self._tasks = [
+            asyncio.create_task(self._dispatch_loop()),
+            asyncio.create_task(self._lease_loop()),
+        ]
+
+    async def stop(self, grace_seconds: float = 10) -> None:
+        """Stop claiming, give running jobs ``grace_seconds``, then abandon them.
+
+        Abandoned jobs keep their lease, which expires and re-queues them.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.running:
+            await asyncio.wait(list(self.running.values()), timeout=grace_seconds)
+            for task in self.running.values():
+                task.cancel()
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    # Claiming and running
+
+    async def _dispatch_loop(self) -> None:
+        await self.requeue_expired()
+        while True:
+            try:
+                await self._claim_available()
+            except Exception:
+                logger.exception("Job dispatch failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim_available(self) -> None:
+        while True:
+            free = [name for name, spec in self.types.items() if self._running_by_type[name] < spec.concurrency]
+            if not free:
+                return
+            now = datetime.utcnow()
+            job = await self.collection.find_one_and_update(
+                {"status": "queued", "type": {"$in": free}},
+                {
+                    "$set": {
+                        "status": "running",
+                        "started_at": now,
+                        "lease_owner": self.runner_id,
+                        "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                return
+            self.counters["claimed"] += 1
+            self._running_by_type[job["type"]] += 1
+            task = asyncio.create_task(self._execute(job))
+            self.running[job["id"]] = task
+
+    async def _execute(self, job: dict) -> None:
+        spec = self.types[job["type"]]
+        progress = self._progress_reporter(job["id"])
+        loop = asyncio.get_running_loop()
+        try:
+            if spec.kind == "async":
+                result = await spec.handler(job, progress)
+            elif spec.kind == "thread":
+                def threadsafe_progress(fraction: float, message: Optional[str] = None) -> None:
+                    loop.call_soon_threadsafe(progress, fraction, message)
+                result = await loop.run_in_executor(self._threads, spec.handler, job, threadsafe_progress)
+            else:
+                result = await loop.run_in_executor(self._process_pool(), spec.handler, job["params"])
+        except asyncio.CancelledError:
+            # Shutdown: leave the lease to expire so another runner picks the job up
+            raise
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", job["id"], job["type"])
+            self.counters["failed"] += 1
+            await self._finish(job["id"], {"status": "failed", "error": f"{type(exc).__name__}: {exc}"})
+        else:
+            self.counters["succeeded"] += 1
+            await self._finish(job["id"], {"status": "succeeded", "result": result, "progress": 1.0})
+        finally:
+            self.running.pop(job["id"], None)
+            self._running_by_type[job["type"]] -= 1
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _finish(self, job_id: str, fields: dict) -> None:
+        # Only the lease holder may finish a job: one that lost its lease was re-queued
+        await self.collection.update_one(
+            {"id": job_id, "lease_owner": self.runner_id},
+            {
+                "$set": {**fields, "finished_at": datetime.utcnow()},
+                "$unset": {"lease_owner": "", "lease_expires_at": ""},
+            },
+        )
+
+    def _progress_reporter(self, job_id: str) -> Callable[[float, Optional[str]], None]:
+        last_sent = [0.0]
+
+        def report(fraction: float, message: Optional[str] = None) -> None:
+            now = time.monotonic()
+            if now - last_sent[0] < PROGRESS_INTERVAL and fraction < 1:
+                return
+            last_sent[0] = now
+            fields = {"progress": max(0.0, min(1.0, float(fraction)))}
+            if message is not None:
+                fields["message"] = message
+            write = asyncio.ensure_future(self.collection.update_one(
+                {"id": job_id, "lease_owner": self.runner_id}, {"$set": fields}
+            ))
+            # The loop only keeps weak references to tasks
+            self._progress_writes.add(write)
+            write.add_done_callback(self._progress_writes.discard)
+
+        return report
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # spawn: forking a process that holds Motor's threads and sockets is unsafe
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._processes
+
+    # Leases
+
+    async def _lease_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.renew_leases()
+                await self.requeue_expired()
+            except Exception:
+                logger.exception("Job lease maintenance failed")
+
+    async def renew_leases(self) -> None:
+        if not self.running:
+            return
+        await self.collection.update_many(
+            {"id": {"$in": list(self.running)}, "lease_owner": self.runner_id},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+
+    async def requeue_expired(self) -> int:
+        """Re-queue running jobs whose runner stopped renewing their lease."""
+        now = datetime.utcnow()
+        expired = {"status": "running", "lease_expires_at": {"$lt": now}}
+        requeued = await self.collection.update_many(
+            {**expired, "attempts": {"$lt": self.max_attempts}},
+            {"$set": {"status": "queued"}, "$unset": {"lease_owner": "", "lease_expires_at": ""}},
+        )
+        abandoned = await self.collection.update_many(
+            expired,
+            {
+                "$set": {"status": "failed", "error": "Lease expired too many times", "finished_at": now},
+                "$unset": {"lease_owner": "", "lease_expires_at": ""},
+            },
+        )
+        if requeued.modified_count or abandoned.modified_count:
+            logger.warning(
+                "Jobs with expired leases: %d re-queued, %d failed",
+                requeued.modified_count, abandoned.modified_count,
+            )
+            self.counters["requeued"] += requeued.modified_count
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return requeued.modified_count
+
+    def stats(self) -> dict:
+        return {
+            "runner": self.runner_id,
+            "running": dict(+self._running_by_type),
+            **self.counters,
+        }
@@ -0,0 +1,281 @@
+"""In-process metrics, exposed in the Prometheus text format.
+
+``MetricsMiddleware`` counts requests per (method, route template, status)
+and records their latency in fixed-bucket histograms, split into the time
+spent authenticating (``auth_timer`` around ``get_current_user``) and the
+rest (``handler``: dependencies, the endpoint and serialisation). Routes are
+labelled by template (``/api/clients/{client_id}``), never by raw path, so
+the number of series stays bounded; unmatched paths share one label.
+
+``MongoCommandListener`` and ``MongoPoolListener`` plug into pymongo's
+monitoring hooks to time every command and every wait for a pooled
+connection; the pool listener also keeps the open, checked-out and waiting
+connection gauges read by ``/api/health/stats``. pymongo calls them from
+Motor's worker threads, so they update the registry under a lock; the HTTP
+side runs on the event loop only.
+
+Recording a request costs a few dictionary lookups and three bisections, in
+the order of microseconds: ``benchmarks/metrics_overhead.py`` measures it.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; Prometheus' defaults plus a 1 ms bucket for the fast routes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+
+# Per-request accumulator for the auth time, set by the middleware
+_request_timings: ContextVar[Optional[List[float]]] = ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return ",".join(pairs)
+
+
+def _render_histograms(lines: List[str], name: str, help_text: str, label_names: Tuple[str, ...],
+                       histograms: Dict[Tuple, Histogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in sorted(histograms.items()):
+        labels = _labels(label_names, key)
+        prefix = f"{labels}," if labels else ""
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {histogram.sum}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+def _render_counter(lines: List[str], name: str, help_text: str, label_names: Tuple[str, ...],
+                    values: Dict[Tuple, float], metric_type: str = "counter") -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for key, value in sorted(values.items()):
+        labels = _labels(label_names, key)
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests: Counter = Counter()
+        self.request_latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.mongo_lock = threading.Lock()
+        self.mongo_commands: Dict[Tuple[str, str], Histogram] = {}
+        self.pool_wait = Histogram()
+        self.pool_events: Counter = Counter()
+        self.pool_checked_out = 0
+        self.pool_open = 0
+        # Check-outs started and not yet completed or failed
+        self.pool_waiting = 0
+
+    def _histogram(self, table: dict, key: Tuple) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        return histogram
+
+    def observe_request(self, method: str, route: str, status: int, total: float, auth: float) -> None:
+        self.requests[(method, route, status)] += 1
+        self._histogram(self.request_latency, (method, route, "total")).observe(total)
+        if auth:
+            self._histogram(self.request_latency, (method, route, "auth")).observe(auth)
+        self._histogram(self.request_latency, (method, route, "handler")).observe(total - auth)
+
+    def observe_command(self, command: str, outcome: str, seconds: float) -> None:
+        with self.mongo_lock:
+            self._histogram(self.mongo_commands, (command, outcome)).observe(seconds)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        _render_counter(lines, "http_requests_total", "HTTP requests by route template and status.",
+                        ("method", "route", "status"), self.requests)
+        _render_histograms(lines, "http_request_duration_seconds",
+                           "HTTP request latency; phase is total, auth (get_current_user) or handler (the rest).",
+                           ("method", "route", "phase"), self.request_latency)
+        with self.mongo_lock:
+            _render_histograms(lines, "mongodb_command_duration_seconds",
+                               "MongoDB command round trip as seen by the driver.",
+                               ("command", "outcome"), self.mongo_commands)
+            _render_histograms(lines, "mongodb_pool_wait_seconds",
+                               "Time spent waiting to check a connection out of the pool.",
+                               (), {(): self.pool_wait})
+            _render_counter(lines, "mongodb_pool_events_total",
+                            "Connection pool events (created, closed, checkout_failed:<reason>).",
+                            ("event",), {(event,): count for event, count in self.pool_events.items()})
+            _render_counter(lines, "mongodb_pool_checked_out_connections",
+                            "Connections currently checked out of the pool.",
+                            (), {(): self.pool_checked_out}, metric_type="gauge")
+            _render_counter(lines, "mongodb_pool_open_connections",
+                            "Connections currently open, idle or checked out.",
+                            (), {(): self.pool_open}, metric_type="gauge")
+            _render_counter(lines, "mongodb_pool_wait_queue_length",
+                            "Check-outs currently waiting for a connection.",
+                            (), {(): self.pool_waiting}, metric_type="gauge")
+        _render_counter(lines, "process_start_time_seconds", "Start time of the process since the epoch.",
+                        (), {(): self.started_at}, metric_type="gauge")
+        return "\n".join(lines) + "\n"
+
+    def pool_stats(self) -> dict:
+        with self.mongo_lock:
+            return {
+                "open": self.pool_open,
+                "checked_out": self.pool_checked_out,
+                "idle": self.pool_open - self.pool_checked_out,
+                "wait_queue": self.pool_waiting,
+                "waits": self.pool_wait.count,
+                "mean_wait_ms": self.pool_wait.sum / self.pool_wait.count * 1000 if self.pool_wait.count else 0.0,
+                "events": dict(self.pool_events),
+            }
+
+
+@contextmanager
+def auth_timer():
+    """Add the time spent in the block to the current request's auth time."""
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[0] += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        timings = [0.0]
+        token = _request_timings.set(timings)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            total = time.perf_counter() - start
+            _request_timings.reset(token)
+            # The router stores the matched route in the scope it was given
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.registry.observe_request(scope["method"], path, status, total, timings[0])
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.registry.observe_command(event.command_name, "succeeded", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.registry.observe_command(event.command_name, "failed", event.duration_micros / 1e6)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Pool wait times, from check-out start to check-out, per driver thread."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        # Check-out start and end are reported on the thread doing the check-out
+        self._local = threading.local()
+
+    def _count(self, event: str) -> None:
+        with self.registry.mongo_lock:
+            self.registry.pool_events[event] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self.registry.mongo_lock:
+            self.registry.pool_waiting += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        with self.registry.mongo_lock:
+            self.registry.pool_waiting -= 1
+            self.registry.pool_checked_out += 1
+            if started is not None:
+                self.registry.pool_wait.observe(time.perf_counter() - started)
+        self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self.registry.mongo_lock:
+            self.registry.pool_waiting -= 1
+            self.registry.pool_events[f"checkout_failed:{event.reason}"] += 1
+
+    def connection_checked_in(self, event):
+        with self.registry.mongo_lock:
+            self.registry.pool_checked_out -= 1
+
+    def connection_created(self, event):
+        with self.registry.mongo_lock:
+            self.registry.pool_open += 1
+            self.registry.pool_events["created"] += 1
+
+    def connection_closed(self, event):
+        with self.registry.mongo_lock:
+            self.registry.pool_open -= 1
+            self.registry.pool_events["closed"] += 1
+
+    # Remaining hooks of the interface, not measured
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count("pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
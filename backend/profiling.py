@@ -0,0 +1,154 @@
+"""Opt-in cProfile capture of single requests.
+
+``ProfilingMiddleware`` profiles a request when it carries the
+``X-Profile: 1`` header and ``is_admin`` accepts its bearer token, or when it
+is drawn by ``sample_rate``. The profile is written in pstats format to
+``ProfileStore.root``, named after its time, method, status, duration and
+route template so listing needs no index, and only the ``max_files`` most
+recent are kept. The response of a profiled request carries the profile id
+in ``X-Profile-Id``.
+
+cProfile measures the whole thread, and the event loop interleaves other
+requests with the profiled one: their frames land in the same profile. Only
+one request is profiled at a time per worker, so a busy worker skips the
+rest rather than mixing two profiles. When profiling is disabled the
+middleware is not installed at all.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+
+import anyio
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = b"x-profile"
+_ID = re.compile(r"^[0-9a-f]{8}$")
+_NAME = re.compile(r"^\d{8}T\d{12}-[0-9a-f]{8}-[A-Z]+-\d{3}-\d+ms-[\w.-]*\.prof$")
+
+
+def route_slug(path: str) -> str:
+    # /api/clients/{client_id} -> api.clients.client_id
+    return re.sub(r"[^\w-]+", ".", path).strip(".") or "unmatched"
+
+
+class ProfileStore:
+    def __init__(self, root: Path, max_files: int = 50):
+        self.root = Path(root)
+        self.max_files = max_files
+
+    @staticmethod
+    def new_name(profile_id: str, method: str, status: int, duration: float, route: str) -> str:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return f"{stamp}-{profile_id}-{method}-{status}-{int(duration * 1000)}ms-{route_slug(route)}.prof"
+
+    def path(self, profile_id: str) -> Optional[Path]:
+        """The file of profile ``profile_id``, or None."""
+        if not _ID.match(profile_id) or not self.root.is_dir():
+            return None
+        for entry in os.scandir(self.root):
+            if _NAME.match(entry.name) and entry.name.split("-")[1] == profile_id:
+                return Path(entry.path)
+        return None
+
+    def save(self, profiler: cProfile.Profile, name: str) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.root / name)
+        self.rotate()
+
+    def rotate(self) -> None:
+        # Names start with their timestamp: lexical order is age order
+        names = sorted(entry.name for entry in os.scandir(self.root) if _NAME.match(entry.name))
+        for name in names[:max(0, len(names) - self.max_files)]:
+            (self.root / name).unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        if not self.root.is_dir():
+            return []
+        profiles = []
+        for entry in os.scandir(self.root):
+            if not _NAME.match(entry.name):
+                continue
+            stamp, profile_id, method, status, duration, route = entry.name[:-len(".prof")].split("-", 5)
+            profiles.append({
+                "id": profile_id,
+                "name": entry.name,
+                "created_at": datetime.strptime(stamp, "%Y%m%dT%H%M%S%f"),
+                "method": method,
+                "route": route,
+                "status": int(status),
+                "duration_ms": int(duration[:-2]),
+                "size": entry.stat().st_size,
+            })
+        profiles.sort(key=lambda profile: profile["name"], reverse=True)
+        return profiles
+
+    def summary(self, profile_id: str, limit: int = 50, sort: str = "cumulative") -> Optional[str]:
+        """The top ``limit`` functions of a profile as pstats text."""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        output = io.StringIO()
+        pstats.Stats(str(path), stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        is_admin: Callable[[str], Awaitable[bool]],
+        sample_rate: float = 0.0,
+    ):
+        self.app = app
+        self.store = store
+        self.is_admin = is_admin
+        self.sample_rate = sample_rate
+        self.active = False
+
+    async def _wanted(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) != b"1":
+            return False
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        return scheme.lower() == "bearer" and bool(token) and await self.is_admin(token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.active or not await self._wanted(scope) or self.active:
+            await self.app(scope, receive, send)
+            return
+
+        self.active = True
+        status = 500
+        profile_id = uuid.uuid4().hex[:8]
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            self.active = False
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            name = self.store.new_name(profile_id, scope["method"], status, duration, route)
+            await anyio.to_thread.run_sync(self.store.save, profiler, name)
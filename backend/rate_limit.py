@@ -0,0 +1,168 @@
+"""Admission control: per-client token buckets and a cap on requests in flight.
+
+``AdmissionMiddleware`` charges every HTTP request a cost, taken by
+``AdmissionControl`` from a token bucket of its caller. The caller is the
+user of a valid bearer token, or the client address otherwise (login,
+register, bad tokens). A bucket holds up to ``burst`` tokens and refills at
+``rate`` tokens per second. A request that finds too few tokens gets ``429``
+and a ``Retry-After`` telling when enough will have refilled. Routes cost 1
+unless ``costs`` says otherwise. Rules are written ``"METHOD /path/{param}"``;
+``*`` matches any method, and a cost of 0 exempts the route.
+
+Before that, requests are counted against ``max_in_flight``. Beyond it the
+worker is saturated, and queuing more work only makes every request slower,
+so the request gets ``503`` with ``Retry-After`` rather than a place in the
+queue, and is not charged. Paths under ``exempt_prefixes`` (health probes,
+metrics) skip both checks.
+
+Everything is per worker and in memory. A request costs one dictionary
+lookup, one bucket refill and a scan of the few cost rules. Buckets are kept
+in LRU order and the least recently used ones are dropped beyond
+``max_keys``. A dropped bucket comes back full, so eviction can only be
+lenient.
+"""
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+import orjson
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def parse_costs(spec: str) -> Dict[str, float]:
+    """``"POST /api/auth/login=10, GET /api/clients=2"`` as a rule -> cost dict."""
+    costs = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        rule, _, cost = item.rpartition("=")
+        if not rule.strip():
+            raise ValueError(f"Invalid rate limit cost {item.strip()!r}, expected 'METHOD /path=cost'")
+        costs[" ".join(rule.split())] = float(cost)
+    return costs
+
+
+def _compile(rule: str) -> Tuple[str, Pattern]:
+    method, _, template = rule.partition(" ")
+    pattern = re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(template))
+    return method.upper(), re.compile(f"^{pattern}$")
+
+
+class AdmissionControl:
+    def __init__(
+        self,
+        identify: Callable[[str], Optional[str]],
+        rate: float,
+        burst: float,
+        costs: Optional[Dict[str, float]] = None,
+        max_in_flight: int = 0,
+        max_keys: int = 100_000,
+    ):
+        self.identify = identify
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_keys = max_keys
+        # Costs above the burst could never be paid: they are clamped to it
+        self.costs: List[Tuple[str, Pattern, float]] = [
+            (*_compile(rule), min(cost, burst)) for rule, cost in (costs or {}).items()
+        ]
+        # key -> [tokens, time of the last refill]
+        self.buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.in_flight = 0
+        self.rejected = {"rate_limited": 0, "overloaded": 0}
+
+    def cost(self, method: str, path: str) -> float:
+        for rule_method, pattern, cost in self.costs:
+            if rule_method in ("*", method) and pattern.match(path):
+                return cost
+        return 1.0
+
+    def take(self, key: str, cost: float, now: float) -> float:
+        """Charge ``cost`` to ``key``; 0 if admitted, else seconds until it would be."""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / self.rate
+
+    def key(self, scope: Scope) -> str:
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        if authorization:
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                user_id = self.identify(token)
+                if user_id is not None:
+                    return f"user:{user_id}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "buckets": len(self.buckets),
+            "rejected": dict(self.rejected),
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, control: AdmissionControl, exempt_prefixes: Tuple[str, ...] = ()):
+        self.app = app
+        self.control = control
+        self.exempt_prefixes = exempt_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        control = self.control
+        if control.max_in_flight and control.in_flight >= control.max_in_flight:
+            control.rejected["overloaded"] += 1
+            await _reject(send, 503, "Server busy, please retry", 1)
+            return
+
+        cost = control.cost(scope["method"], scope["path"])
+        if cost:
+            wait = control.take(control.key(scope), cost, time.monotonic())
+            if wait:
+                control.rejected["rate_limited"] += 1
+                await _reject(send, 429, "Too many requests, please slow down", wait)
+                return
+
+        control.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            control.in_flight -= 1
+
+
+async def _reject(send: Send, status: int, detail: str, retry_after: float) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,149 @@
+"""Rendez-vous storage, overlap detection and the month grid.
+
+Each rendez-vous keeps the ``date``/``heure_debut``/``heure_fin`` strings the
+app edits, plus ``start`` and ``end`` datetimes derived from them (wall-clock
+time, no time zone, like the app). Range queries read ``start`` through the
+(assigne_a, start) index; a rendez-vous never crosses midnight, so selecting
+on ``start`` alone is exact for day-aligned ranges.
+
+A technician's active rendez-vous never overlap: every create or move is
+refused when it would. That invariant is what makes the overlap check one
+index seek: the only candidate is the last active rendez-vous starting before
+the new one ends, and there is a conflict exactly when it ends after the new
+one starts. Two writes racing on different workers can both pass that check,
+so writes re-check after the fact and undo themselves on conflict.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+RDV_PROJECTION = {"_id": 0}
+# Cancelled rendez-vous do not hold their slot
+INACTIVE_STATUSES = ("Annule",)
+
+
+class SlotConflict(Exception):
+    def __init__(self, conflict: dict):
+        super().__init__(f"Overlaps rendez-vous {conflict['id']}")
+        self.conflict = conflict
+
+
+def parse_slot(day: str, heure_debut: str, heure_fin: str) -> Tuple[datetime, datetime]:
+    """Return (start, end) for a day and HH:mm times; ValueError if invalid or empty."""
+    start = datetime.strptime(f"{day} {heure_debut}", "%Y-%m-%d %H:%M")
+    end = datetime.strptime(f"{day} {heure_fin}", "%Y-%m-%d %H:%M")
+    if end <= start:
+        raise ValueError("heure_fin must be after heure_debut")
+    return start, end
+
+
+def month_grid_bounds(year: int, month: int) -> Tuple[date, date]:
+    """First and last day of the Monday-first 6-week grid showing ``month``."""
+    first = date(year, month, 1)
+    grid_start = first - timedelta(days=first.weekday())
+    return grid_start, grid_start + timedelta(days=41)
+
+
+def month_range(year: int, month: int) -> Tuple[datetime, datetime]:
+    """Datetime range [start, end) covering the whole month grid."""
+    grid_start, grid_end = month_grid_bounds(year, month)
+    return (
+        datetime.combine(grid_start, datetime.min.time()),
+        datetime.combine(grid_end + timedelta(days=1), datetime.min.time()),
+    )
+
+
+def month_grid(year: int, month: int, rendez_vous: List[dict]) -> List[dict]:
+    """Bucket ``rendez_vous`` (sorted by start) into the 42 days of the month view."""
+    grid_start, _ = month_grid_bounds(year, month)
+    buckets: Dict[str, List[dict]] = {}
+    for rdv in rendez_vous:
+        buckets.setdefault(rdv["date"], []).append(rdv)
+    days = []
+    for offset in range(42):
+        day = grid_start + timedelta(days=offset)
+        key = day.isoformat()
+        days.append({
+            "date": key,
+            "is_current_month": day.month == month,
+            "rendez_vous": buckets.get(key, []),
+        })
+    return days
+
+
+class RendezVousRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_conflict(
+        self,
+        assignee: str,
+        start: datetime,
+        end: datetime,
+        exclude_id: Optional[str] = None,
+    ) -> Optional[dict]:
+        query = {
+            "assigne_a": assignee,
+            "start": {"$lt": end},
+            "status": {"$nin": list(INACTIVE_STATUSES)},
+        }
+        if exclude_id is not None:
+            query["id"] = {"$ne": exclude_id}
+        previous = await self.collection.find_one(query, RDV_PROJECTION, sort=[("start", -1)])
+        if previous is not None and previous["end"] > start:
+            return previous
+        return None
+
+    async def _check(self, rdv: dict) -> None:
+        if rdv["status"] in INACTIVE_STATUSES:
+            return
+        conflict = await self.find_conflict(rdv["assigne_a"], rdv["start"], rdv["end"], exclude_id=rdv["id"])
+        if conflict is not None:
+            raise SlotConflict(conflict)
+
+    async def create(self, rdv: dict) -> dict:
+        await self._check(rdv)
+        # insert_one adds _id to the dict it is given
+        await self.collection.insert_one(dict(rdv))
+        try:
+            await self._check(rdv)
+        except SlotConflict:
+            await self.collection.delete_one({"id": rdv["id"]})
+            raise
+        return rdv
+
+    async def get(self, rdv_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"id": rdv_id}, RDV_PROJECTION)
+
+    async def update(self, current: dict, fields: dict) -> Optional[dict]:
+        """Apply ``fields`` to the rendez-vous ``current``; SlotConflict if it now overlaps."""
+        merged = {**current, **fields}
+        await self._check(merged)
+        updated = await self.collection.find_one_and_update(
+            {"id": current["id"]},
+            {"$set": fields},
+            projection=RDV_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated is None:
+            return None
+        try:
+            await self._check(updated)
+        except SlotConflict:
+            await self.collection.update_one(
+                {"id": current["id"]},
+                {"$set": {field: current.get(field) for field in fields}},
+            )
+            raise
+        return updated
+
+    async def delete(self, rdv_id: str) -> bool:
+        result = await self.collection.delete_one({"id": rdv_id})
+        return result.deleted_count == 1
+
+    async def list_range(self, start: datetime, end: datetime, assignee: Optional[str] = None) -> List[dict]:
+        query = {"start": {"$gte": start, "$lt": end}}
+        if assignee is not None:
+            query["assigne_a"] = assignee
+        return await self.collection.find(query, RDV_PROJECTION).sort([("start", 1), ("id", 1)]).to_list(None)
@@ -0,0 +1,130 @@
+"""Data access for the clients collection.
+
+Every command ``ClientRepository`` sends is counted in ``round_trips``, so a
+route's cost in round trips can be checked from the outside. Per call:
+
+- ``get``: one ``find_one``.
+- ``create``: one ``insert_one``.
+- ``update``: one ``find_one_and_update``. It checks the version, bumps it
+  and returns the stored document after the update. With ``with_previous``
+  it returns the document before instead, and the state after is derived
+  from it and the update.
+- ``delete``: ``find_one_and_delete``, then the tombstone insert (2).
+- A compare-and-set that misses adds one ``find_one`` to tell a missing
+  client (None) from ``VersionConflict``.
+
+Writes bump an integer ``version`` field; passing ``expected_version`` turns
+an update or delete into a compare-and-set. Tombstones feed delta sync. They
+live in a collection of their own, with a TTL, so the clients collection
+only ever holds live clients. Writing the tombstone is therefore a second
+command: only a transaction (more round trips, and a replica set) could make
+the two atomic. A crash in between leaves a deleted client without a
+tombstone, which delta sync then never reports.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+
+# Never ship Mongo's ObjectId back to the API layer
+CLIENT_PROJECTION = {"_id": 0}
+
+
+class VersionConflict(Exception):
+    def __init__(self, client_id: str, current_version: Optional[int]):
+        super().__init__(f"Client {client_id} is at version {current_version}")
+        self.client_id = client_id
+        self.current_version = current_version
+
+
+class ClientRepository:
+    def __init__(self, collection, tombstones):
+        self.collection = collection
+        self.tombstones = tombstones
+        self.round_trips: Counter = Counter()
+
+    async def create(self, client: dict) -> dict:
+        self.round_trips["create"] += 1
+        # insert_one adds _id to the dict it is given
+        await self.collection.insert_one(dict(client))
+        return client
+
+    async def get(self, client_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        self.round_trips["get"] += 1
+        return await self.collection.find_one({"id": client_id}, projection or CLIENT_PROJECTION)
+
+    async def update(
+        self,
+        client_id: str,
+        fields: dict,
+        expected_version: Optional[int] = None,
+        with_previous: bool = False,
+    ):
+        """Apply ``fields`` and return the updated client, or None if it does not exist.
+
+        With ``with_previous``, return (previous, updated) instead.
+        """
+        self.round_trips["update"] += 1
+        now = datetime.utcnow()
+        # BSON dates keep milliseconds: round now so the ETag matches later reads
+        changes = {**fields, "updated_at": now.replace(microsecond=now.microsecond // 1000 * 1000)}
+        document = await self.collection.find_one_and_update(
+            self._filter(client_id, expected_version),
+            {"$set": changes, "$inc": {"version": 1}},
+            projection=CLIENT_PROJECTION,
+            return_document=ReturnDocument.BEFORE if with_previous else ReturnDocument.AFTER,
+        )
+        if document is None:
+            if expected_version is not None:
+                await self._raise_if_conflict(client_id)
+            return None
+        if not with_previous:
+            return document
+        # Only one state comes back: the one after follows from the update
+        return document, {**document, **changes, "version": document.get("version", 0) + 1}
+
+    async def delete(self, client_id: str, expected_version: Optional[int] = None) -> Optional[dict]:
+        """Delete the client and return its last state, or None if it does not exist."""
+        self.round_trips["delete"] += 1
+        client = await self.collection.find_one_and_delete(
+            self._filter(client_id, expected_version),
+            projection=CLIENT_PROJECTION,
+        )
+        if client is None:
+            if expected_version is not None:
+                await self._raise_if_conflict(client_id)
+            return None
+        self.round_trips["tombstone"] += 1
+        await self.tombstones.insert_one({"id": client_id, "deleted_at": datetime.utcnow()})
+        return client
+
+    async def bulk_write(self, operations: List, ordered: bool = False):
+        self.round_trips["bulk_write"] += 1
+        return await self.collection.bulk_write(operations, ordered=ordered)
+
+    async def backfill_versions(self) -> int:
+        """Give documents written before versioning existed their first version."""
+        self.round_trips["backfill_versions"] += 1
+        result = await self.collection.update_many(
+            {"version": {"$exists": False}},
+            {"$set": {"version": 1}},
+        )
+        return result.modified_count
+
+    @staticmethod
+    def _filter(client_id: str, expected_version: Optional[int]) -> dict:
+        query = {"id": client_id}
+        if expected_version is not None:
+            query["version"] = expected_version
+        return query
+
+    async def _raise_if_conflict(self, client_id: str) -> None:
+        # Only reached when a compare-and-set missed: tell 404 and 409 apart
+        self.round_trips["conflict_check"] += 1
+        current = await self.collection.find_one({"id": client_id}, {"_id": 0, "version": 1})
+        if current is not None:
+            raise VersionConflict(client_id, current.get("version"))
+
+    def stats(self) -> dict:
+        return dict(self.round_trips)
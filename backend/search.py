@@ -0,0 +1,270 @@
+"""In-process search index over the client directory.
+
+Text is folded to lowercase ASCII ("Lefèvre" -> "lefevre") and split into
+tokens. Each token maps to the clients containing it, weighted by the field it
+came from. A sorted vocabulary answers prefix queries with a binary search, and
+a trigram index over the vocabulary finds typo-tolerant candidates that are
+confirmed with a bounded edit distance. Nothing here touches Mongo: callers
+keep the index in sync through ``add``/``remove`` and ``rebuild``.
+
+A large index can also be built off the event loop: ``track_changes``, then
+``build`` in a thread, then ``replace`` on the loop, which first replays the
+``add``/``remove`` calls made while the new index was being built.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+FIELD_WEIGHTS = {
+    "nom": 3.0,
+    "prenom": 2.0,
+    "ville": 1.5,
+    "code_postal": 1.5,
+    "telephone": 1.0,
+    "email": 1.0,
+}
+
+# Relative value of an exact, prefix and fuzzy token match
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.7
+FUZZY_SCORE = 0.4
+
+# Bound the work done for very short prefixes ("m") on a large directory
+MAX_PREFIX_EXPANSION = 256
+MIN_FUZZY_LENGTH = 4
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _NON_ALNUM.split(fold(text)) if token]
+
+
+def field_tokens(field: str, value: str) -> List[str]:
+    if field == "telephone":
+        digits = re.sub(r"\D", "", value or "")
+        if not digits:
+            return []
+        # "+33 6 12 .." and "06 12 .." should both be findable by the national number
+        tokens = [digits]
+        if digits.startswith("33") and len(digits) == 11:
+            tokens.append("0" + digits[2:])
+        return tokens
+    return tokenize(value)
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _within_distance(a: str, b: str, max_distance: int) -> bool:
+    """Edit distance check (adjacent transpositions count as one edit) that
+    bails out as soon as the bound is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    # Typos rarely touch both ends: only the differing middle needs the DP
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    a, b = a[start:], b[start:]
+    while a and b and a[-1] == b[-1]:
+        a, b = a[:-1], b[:-1]
+    if not a or not b:
+        return max(len(a), len(b)) <= max_distance
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            )
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > max_distance:
+            return False
+        before, previous = previous, current
+    return previous[-1] <= max_distance
+
+
+class ClientSearchIndex:
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_tokens: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._trigram_tokens: Dict[str, Set[str]] = {}
+        self._bulk_loading = False
+        # add/remove calls since track_changes(), as (client or id, added)
+        self._changes: Optional[List[Tuple[object, bool]]] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def add(self, client: dict) -> None:
+        """Index a client document, replacing any previous version of it."""
+        client_id = client["id"]
+        self.remove(client_id)
+        if self._changes is not None:
+            self._changes.append((client, True))
+
+        tokens: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in field_tokens(field, client.get(field, "")):
+                if weight > tokens.get(token, 0.0):
+                    tokens[token] = weight
+
+        self._doc_tokens[client_id] = tokens
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if self._bulk_loading:
+                    self._vocabulary.append(token)
+                else:
+                    insort(self._vocabulary, token)
+                for trigram in _trigrams(token):
+                    self._trigram_tokens.setdefault(trigram, set()).add(token)
+            postings[client_id] = weight
+
+    def remove(self, client_id: str) -> None:
+        if self._changes is not None:
+            self._changes.append((client_id, False))
+        tokens = self._doc_tokens.pop(client_id, None)
+        if not tokens:
+            return
+        for token in tokens:
+            postings = self._postings[token]
+            postings.pop(client_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+                for trigram in _trigrams(token):
+                    bucket = self._trigram_tokens[trigram]
+                    bucket.discard(token)
+                    if not bucket:
+                        del self._trigram_tokens[trigram]
+
+    @classmethod
+    def build(cls, clients: Iterable[dict]) -> "ClientSearchIndex":
+        """A new index over ``clients``; touches no existing index, so it can run in a thread."""
+        fresh = cls()
+        fresh._bulk_loading = True
+        for client in clients:
+            fresh.add(client)
+        fresh._vocabulary.sort()
+        fresh._bulk_loading = False
+        return fresh
+
+    def rebuild(self, clients: Iterable[dict]) -> None:
+        # Built aside and swapped in, so searches keep working meanwhile
+        self.replace(self.build(clients))
+
+    def track_changes(self) -> None:
+        """Record add/remove calls until ``replace``, for an index being built elsewhere."""
+        self._changes = []
+
+    def stop_tracking(self) -> None:
+        self._changes = None
+
+    def replace(self, fresh: "ClientSearchIndex") -> None:
+        """Take over the contents of ``fresh``, after replaying the changes tracked here."""
+        for change, added in self._changes or ():
+            if added:
+                fresh.add(change)
+            else:
+                fresh.remove(change)
+        self.__dict__.update(fresh.__dict__)
+        self._changes = None
+
+    def _prefix_tokens(self, term: str) -> List[str]:
+        start = bisect_left(self._vocabulary, term)
+        matches = []
+        for token in self._vocabulary[start:start + MAX_PREFIX_EXPANSION]:
+            if not token.startswith(term):
+                break
+            matches.append(token)
+        return matches
+
+    def _fuzzy_tokens(self, term: str, exclude: Set[str]) -> List[str]:
+        # Typos are a text problem; numbers (postcodes, phones) only match by prefix
+        if len(term) < MIN_FUZZY_LENGTH or term.isdigit():
+            return []
+        max_distance = 1 if len(term) <= 7 else 2
+        shared = Counter()
+        for trigram in _trigrams(term):
+            shared.update(self._trigram_tokens.get(trigram, ()))
+        # Count filter: each edit destroys at most three of the padded trigrams,
+        # so only tokens sharing enough of them go through the edit distance.
+        return [
+            token for token, count in shared.items()
+            if abs(len(token) - len(term)) <= max_distance
+            and count >= max(len(token), len(term)) - 3 * max_distance
+            and token not in exclude
+            and _within_distance(term, token, max_distance)
+        ]
+
+    def _term_scores(self, term: str) -> Dict[str, float]:
+        factors: Dict[str, float] = dict.fromkeys(self._prefix_tokens(term), PREFIX_SCORE)
+        for token in self._fuzzy_tokens(term, exclude=set(factors)):
+            factors[token] = FUZZY_SCORE
+        if term in self._postings:
+            factors[term] = EXACT_SCORE
+
+        scores: Dict[str, float] = {}
+        for token, factor in factors.items():
+            postings = self._postings[token]
+            if not scores:
+                scores = {client_id: weight * factor for client_id, weight in postings.items()}
+                continue
+            for client_id, weight in postings.items():
+                score = weight * factor
+                if score > scores.get(client_id, 0.0):
+                    scores[client_id] = score
+        return scores
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` (client_id, score) pairs, best first.
+
+        Every query term must match (exactly, as a prefix or fuzzily) for a
+        client to be returned.
+        """
+        terms = []
+        for term in tokenize(query):
+            if term not in terms:
+                terms.append(term)
+        # A phone number typed with spaces is one token in the index
+        digits = re.sub(r"\D", "", query or "")
+        if len(terms) > 1 and len(digits) >= 4 and all(t.isdigit() for t in terms):
+            terms = [digits]
+        if not terms:
+            return []
+
+        combined: Optional[Dict[str, float]] = None
+        # Most selective terms first keeps the intersection small
+        for term_scores in sorted((self._term_scores(term) for term in terms), key=len):
+            if combined is None:
+                combined = term_scores
+            else:
+                combined = {
+                    client_id: score + term_scores[client_id]
+                    for client_id, score in combined.items()
+                    if client_id in term_scores
+                }
+            if not combined:
+                return []
+
+        return heapq.nlargest(limit, combined.items(), key=itemgetter(1))
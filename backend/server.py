@@ -1,33 +1,264 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError, create_model
+from typing import Any, Dict, List, Literal, Optional, Set, Union
 import uuid
-from datetime import datetime, timedelta
+import csv
+import io
+import json
+import zlib
+import base64
+import hashlib
+import hmac
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
 import bcrypt
 from jose import JWTError, jwt
 
+from cache import TTLCache
+import calculs_pac
+from calculs_pac import COEFFICIENTS_VERSION, result_rows, size_batch
+from calculs_store import CalculPACStore
+from chantiers import CHILD_SECTIONS, SECTIONS as CHANTIER_SECTIONS, SUMMARY_PROJECTION as CHANTIER_SUMMARY_PROJECTION, ChantierRepository
+from chat import ChatBroker, MessageWriter, encode_event
+from dashboard_stats import CLIENT_BUCKETS, DashboardStats
+from health import LoopLagMonitor, ReadinessProbe
+from client_import import REQUIRED_FIELDS as IMPORT_REQUIRED_FIELDS, ImportFormatError, normalize, read_records, read_upload
+from documents import (
+    DocumentStorage, RangeFileResponse, RangeNotSatisfiable, UploadOverflow, is_sha256, parse_range,
+)
+from indexes import TOMBSTONE_RETENTION_SECONDS, ensure_indexes, verify_query_plans
+from jobs import JobRunner, UnknownJobType
+from profiling import ProfileStore, ProfilingMiddleware
+from metrics import MetricsMiddleware, MetricsRegistry, MongoCommandListener, MongoPoolListener, auth_timer
+from rate_limit import AdmissionControl, AdmissionMiddleware, parse_costs
+from rendez_vous import RendezVousRepository, SlotConflict, month_grid, month_range, parse_slot
+from repositories import ClientRepository, VersionConflict
+from search import FIELD_WEIGHTS, ClientSearchIndex
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Metrics: request and MongoDB timings, served at /api/metrics in the Prometheus format
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+# When set, /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+metrics = MetricsRegistry()
+
+# Request profiling (cProfile, pstats files): on request for admins sending
+# "X-Profile: 1", or for a random PROFILE_SAMPLE_RATE share of requests
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILES_DIR = Path(os.environ.get('PROFILES_DIR', str(ROOT_DIR / 'storage' / 'profiles')))
+PROFILES_MAX_FILES = int(os.environ.get('PROFILES_MAX_FILES', '50'))
+profile_store = ProfileStore(PROFILES_DIR, max_files=PROFILES_MAX_FILES)
+
+# MongoDB connection. For the *_MS settings without a driver default, 0 means no limit
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '0'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '0'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '20000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '0'))
+# The pool listener also feeds /api/health/stats, so it is installed even without metrics
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS or None,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS or None,
+    event_listeners=[MongoPoolListener(metrics)] + ([MongoCommandListener(metrics)] if METRICS_ENABLED else []),
+)
 db = client[os.environ['DB_NAME']]
+client_repository = ClientRepository(db.clients, db.client_tombstones)
+chantier_repository = ChantierRepository(db.chantiers)
+dashboard_stats = DashboardStats(db.stats, db.clients)
+rendez_vous_repository = RendezVousRepository(db.rendez_vous)
+
+# Health: /health/ready fails when MongoDB does not answer a ping within the
+# timeout; the event loop lag is sampled every LOOP_LAG_INTERVAL_SECONDS
+HEALTH_PING_TIMEOUT_SECONDS = float(os.environ.get('HEALTH_PING_TIMEOUT_SECONDS', '2'))
+LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('LOOP_LAG_INTERVAL_SECONDS', '0.5'))
+readiness_probe = ReadinessProbe(db, HEALTH_PING_TIMEOUT_SECONDS)
+loop_lag_monitor = LoopLagMonitor(LOOP_LAG_INTERVAL_SECONDS)
+
+# Startup. The bootstrap (indexes, default users, backfills) is shared by all
+# workers; cli.py runs it once and turns it off in the workers it starts.
+# Each worker then opens WARMUP_CONNECTIONS pooled connections (0 skips the
+# warmup) before accepting traffic. Both are read when the worker starts, not
+# at import: with one worker, uvicorn may import this module before cli.py
+# has set them.
+def bootstrap_on_startup() -> bool:
+    return os.environ.get('BOOTSTRAP_ON_STARTUP', 'true').lower() == 'true'
+
+def warmup_connections() -> int:
+    return min(int(os.environ.get('WARMUP_CONNECTIONS', '4')), MONGO_MAX_POOL_SIZE)
 
 # JWT Configuration
 SECRET_KEY = os.environ.get('JWT_SECRET', 'h2eaux-secret-key-2025')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Pagination
+CLIENTS_PAGE_SIZE = int(os.environ.get('CLIENTS_PAGE_SIZE', '50'))
+CLIENTS_PAGE_SIZE_MAX = int(os.environ.get('CLIENTS_PAGE_SIZE_MAX', '500'))
+
+# Delta sync: changes newer than this many seconds are held back so a write
+# still in flight with an older timestamp cannot be skipped by a token.
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', '2'))
+SYNC_PAGE_SIZE_MAX = int(os.environ.get('SYNC_PAGE_SIZE_MAX', '1000'))
+
+# Trusted reads: documents written by this API are projected to the response
+# fields and encoded straight to JSON by orjson, skipping pydantic re-validation.
+FAST_READS = os.environ.get('FAST_READS', 'true').lower() == 'true'
+
+# Client export is streamed from the cursor in batches of this many documents
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+
+# Bulk import writes are sent in unordered batches of this many operations
+BULK_IMPORT_CHUNK_SIZE = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', '1000'))
+
+# Explain every route query at startup and refuse to start on a COLLSCAN
+VERIFY_QUERY_PLANS = os.environ.get('VERIFY_QUERY_PLANS', 'false').lower() == 'true'
+
+# Upper bound on the number of houses or rooms sized by one batch call
+CALCULS_PAC_BATCH_MAX = int(os.environ.get('CALCULS_PAC_BATCH_MAX', '20000'))
+
+# Memoized PAC calculations: in-process LRU in front of the calculs_pac collection
+CALCULS_PAC_CACHE_SIZE = int(os.environ.get('CALCULS_PAC_CACHE_SIZE', '4096'))
+CALCULS_PAC_CACHE_TTL = float(os.environ.get('CALCULS_PAC_CACHE_TTL', '3600'))
+calculs_pac_store = CalculPACStore(
+    db.calculs_pac,
+    TTLCache(maxsize=CALCULS_PAC_CACHE_SIZE, ttl=CALCULS_PAC_CACHE_TTL),
+)
+
+# Chat: events queued per socket beyond this many are dropped, or the socket is
+# disconnected, depending on CHAT_SLOW_CONSUMER ("drop" or "disconnect").
+CHAT_QUEUE_SIZE = int(os.environ.get('CHAT_QUEUE_SIZE', '256'))
+CHAT_SLOW_CONSUMER = os.environ.get('CHAT_SLOW_CONSUMER', 'disconnect')
+CHAT_WRITE_BATCH_SIZE = int(os.environ.get('CHAT_WRITE_BATCH_SIZE', '200'))
+CHAT_WRITE_INTERVAL = float(os.environ.get('CHAT_WRITE_INTERVAL', '0.25'))
+CHAT_WRITE_BACKLOG = int(os.environ.get('CHAT_WRITE_BACKLOG', '10000'))
+CHAT_DEFAULT_CHANNEL = os.environ.get('CHAT_DEFAULT_CHANNEL', 'general')
+CHAT_MESSAGE_MAX_LENGTH = int(os.environ.get('CHAT_MESSAGE_MAX_LENGTH', '4000'))
+CHAT_HISTORY_PAGE_SIZE = int(os.environ.get('CHAT_HISTORY_PAGE_SIZE', '50'))
+CHAT_HISTORY_PAGE_SIZE_MAX = int(os.environ.get('CHAT_HISTORY_PAGE_SIZE_MAX', '200'))
+CHAT_CHANNEL_PATTERN = re.compile(r"^[\w-]{1,64}$")
+CHAT_MESSAGE_TYPES = ("text", "image", "document")
+CHANTIERS_PAGE_SIZE = int(os.environ.get('CHANTIERS_PAGE_SIZE', '50'))
+CHANTIERS_PAGE_SIZE_MAX = int(os.environ.get('CHANTIERS_PAGE_SIZE_MAX', '500'))
+# Short names accepted by ?include= on a chantier
+CHANTIER_INCLUDE_ALIASES = {
+    "mesures": "mesures_manuelles",
+    "photos": "photos_techniques",
+    "fiches": "fiches_techniques",
+    "onglets": "onglets_personnalises",
+}
+
+# Longest span GET /rendez_vous returns in one request
+RENDEZ_VOUS_RANGE_MAX_DAYS = int(os.environ.get('RENDEZ_VOUS_RANGE_MAX_DAYS', '92'))
+
+# Documents: content-addressed blobs on local disk, uploaded in resumable chunks
+DOCUMENTS_DIR = Path(os.environ.get('DOCUMENTS_DIR', str(ROOT_DIR / 'storage' / 'documents')))
+DOCUMENT_MAX_SIZE = int(os.environ.get('DOCUMENT_MAX_SIZE_MB', '200')) * 1024 * 1024
+DOCUMENTS_PAGE_SIZE = int(os.environ.get('DOCUMENTS_PAGE_SIZE', '50'))
+DOCUMENTS_PAGE_SIZE_MAX = int(os.environ.get('DOCUMENTS_PAGE_SIZE_MAX', '500'))
+DOCUMENT_CATEGORIES = ("Devis", "Facture", "Plan", "Catalogue", "Fiche_Technique", "Autre")
+document_storage = DocumentStorage(DOCUMENTS_DIR)
+# One chunk at a time per upload (per worker); a second writer gets 409
+document_upload_locks: Dict[str, asyncio.Lock] = {}
+
+# Background jobs: threads for blocking I/O, processes for CPU-bound work
+JOBS_THREAD_WORKERS = int(os.environ.get('JOBS_THREAD_WORKERS', '4'))
+JOBS_PROCESS_WORKERS = int(os.environ.get('JOBS_PROCESS_WORKERS', str(min(2, os.cpu_count() or 1))))
+JOBS_LEASE_SECONDS = float(os.environ.get('JOBS_LEASE_SECONDS', '60'))
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', '1'))
+JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', '3'))
+JOBS_SHUTDOWN_GRACE = float(os.environ.get('JOBS_SHUTDOWN_GRACE', '10'))
+job_runner = JobRunner(
+    db.jobs,
+    thread_workers=JOBS_THREAD_WORKERS,
+    process_workers=JOBS_PROCESS_WORKERS,
+    lease_seconds=JOBS_LEASE_SECONDS,
+    poll_interval=JOBS_POLL_INTERVAL,
+    max_attempts=JOBS_MAX_ATTEMPTS,
+)
+
+chat_broker = ChatBroker(queue_size=CHAT_QUEUE_SIZE, slow_consumer=CHAT_SLOW_CONSUMER)
+chat_writer = MessageWriter(
+    db.chat_messages,
+    batch_size=CHAT_WRITE_BATCH_SIZE,
+    flush_interval=CHAT_WRITE_INTERVAL,
+    max_pending=CHAT_WRITE_BACKLOG,
+)
+
 security = HTTPBearer()
 
+# bcrypt runs in a dedicated pool so it never blocks the event loop. Requests
+# beyond workers + queue limit are rejected with 503 instead of piling up.
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get('PASSWORD_QUEUE_LIMIT', '32'))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+password_jobs_in_flight = 0
+
+# Client search index, kept in sync by the client write routes. The periodic
+# rebuild picks up writes made through other workers.
+SEARCH_INDEX_REFRESH_SECONDS = float(os.environ.get('SEARCH_INDEX_REFRESH_SECONDS', '300'))
+# Full recount of the dashboard statistics, correcting any drift of the increments (0 disables)
+DASHBOARD_STATS_REBUILD_SECONDS = float(os.environ.get('DASHBOARD_STATS_REBUILD_SECONDS', '3600'))
+SEARCH_PROJECTION = {"_id": 0, "id": 1, **{field: 1 for field in FIELD_WEIGHTS}}
+client_search_index = ClientSearchIndex()
+# One rebuild at a time: each tracks the writes made while it builds
+search_index_lock = asyncio.Lock()
+search_refresh_task: Optional[asyncio.Task] = None
+dashboard_stats_task: Optional[asyncio.Task] = None
+# Follow-up work of a request that outlives it; the loop only keeps weak references
+background_tasks: Set[asyncio.Task] = set()
+
+# Authenticated user cache. Entries are invalidated by the routes that change a
+# user; the TTL bounds how long another worker may serve stale permissions.
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '60'))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# Admission control, per worker: token buckets per user (per address before
+# login) refilled at RATE_LIMIT_RATE tokens/s up to RATE_LIMIT_BURST, and a cap
+# on requests in flight (0 disables). Beyond them: 429 / 503 with Retry-After.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_RATE = float(os.environ.get('RATE_LIMIT_RATE', '50'))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', '500'))
+# Tokens a request costs, "METHOD /api/route/{param}=cost" separated by commas,
+# "*" for any method; other routes cost 1 and a cost of 0 exempts a route
+RATE_LIMIT_COSTS = parse_costs(os.environ.get('RATE_LIMIT_COSTS', ",".join([
+    "POST /api/auth/login=10",
+    "POST /api/auth/register=10",
+    "POST /api/clients/bulk=20",
+    "GET /api/clients/export=20",
+    "POST /api/jobs=10",
+    "GET /api/clients=2",
+])))
+MAX_IN_FLIGHT_REQUESTS = int(os.environ.get('MAX_IN_FLIGHT_REQUESTS', '256'))
+# Probes and scrapes are never limited
+ADMISSION_EXEMPT_PREFIXES = ("/api/health", "/api/metrics")
+
 app = FastAPI(title="H2EAUX Gestion API")
 api_router = APIRouter(prefix="/api")
 
@@ -57,6 +288,10 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class UserUpdate(BaseModel):
+    role: Optional[str] = None
+    permissions: Optional[dict] = None
+
 class UserResponse(BaseModel):
     id: str
     username: str
@@ -80,6 +315,7 @@ class Client(BaseModel):
     code_postal: str = ""
     type_chauffage: str = ""
     notes: str = ""
+    version: int = 1
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -104,6 +340,347 @@ class ClientUpdate(BaseModel):
     code_postal: Optional[str] = None
     type_chauffage: Optional[str] = None
     notes: Optional[str] = None
+    # Version the caller last read; the update is refused with 409 if it moved on
+    version: Optional[int] = None
+
+CLIENT_EXPORT_FIELDS = list(Client.__fields__)
+CLIENT_RESPONSE_PROJECTION = {"_id": 0, **{field: 1 for field in Client.__fields__}}
+
+class BulkImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class BulkImportResult(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[BulkImportError]
+
+class ClientPage(BaseModel):
+    items: List[Client]
+    next: Optional[str] = None
+
+class ClientStats(BaseModel):
+    total: int = 0
+    by_ville: Dict[str, int] = Field(default_factory=dict)
+    by_type_chauffage: Dict[str, int] = Field(default_factory=dict)
+    by_month: Dict[str, int] = Field(default_factory=dict)  # YYYY-MM of created_at
+
+class DashboardStatsResponse(BaseModel):
+    clients: ClientStats
+    updated_at: Optional[datetime] = None
+    rebuilt_at: Optional[datetime] = None
+
+class ClientChanges(BaseModel):
+    upserts: List[Client]
+    deleted: List[str]
+    next: str
+    has_more: bool
+
+class CalculPACInput(BaseModel):
+    type_pac: Literal["Air_Eau", "Air_Air"]
+    surface_totale: float = Field(0, ge=0)
+    volume_total: float = Field(0, ge=0)
+    temperature_base: float = 20
+    temperature_exterieure_min: float = -7
+    # Air/Eau
+    isolation_murs: Optional[str] = None
+    type_fenetres: Optional[str] = None
+    type_emission: Optional[str] = None
+    # Air/Air: volume_total is the house, or a single room to size it alone
+    niveau_isolation_global: int = Field(3, ge=1, le=5)
+    exposition_principale: Optional[str] = None
+
+class CalculPACBatch(BaseModel):
+    items: List[CalculPACInput]
+
+class CalculPACResult(BaseModel):
+    puissance_necessaire: int
+    puissance_froid: int
+    puissance_chaud: int
+    cop_scop_moyen: float
+    consommation_annuelle_estimee: int
+    cout_installation_estime: int
+
+class CalculPACBatchResult(BaseModel):
+    coefficients_version: int
+    results: List[CalculPACResult]
+
+class CalculPACStored(BaseModel):
+    input_hash: str
+    coefficients_version: int
+    inputs: dict
+    results: CalculPACResult
+    created_at: datetime
+
+class Document(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    content_type: str
+    size: int
+    sha256: str
+    category: str = "Autre"
+    client_id: Optional[str] = None
+    chantier_id: Optional[str] = None
+    uploaded_by: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DocumentUploadCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., ge=0)
+    content_type: str = "application/octet-stream"
+    # Optional: lets a file the server already stores skip the upload entirely
+    sha256: Optional[str] = None
+    category: Literal[DOCUMENT_CATEGORIES] = "Autre"
+    client_id: Optional[str] = None
+    chantier_id: Optional[str] = None
+
+class DocumentUpload(BaseModel):
+    id: str
+    size: int
+    offset: int
+    # Set once every byte has been received
+    document: Optional[Document] = None
+
+class DocumentPage(BaseModel):
+    items: List[Document]
+    next: Optional[str] = None
+
+class CarrelageInfo(BaseModel):
+    format: str = ""
+    couleur: str = ""
+    surface_totale: float = 0
+    quantite_estimee: float = 0
+    notes: Optional[str] = None
+
+class FaienceInfo(CarrelageInfo):
+    hauteur: float = 0
+
+class ElementPiece(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: Literal["Douche", "Baignoire", "Lavabo", "WC", "Bidet", "Meuble", "Porte", "Fenetre"]
+    nom: str
+    dimensions: Optional[Dict[str, float]] = None  # longueur, largeur, hauteur
+    position: Dict[str, float] = Field(default_factory=lambda: {"x": 0, "y": 0})
+    notes: Optional[str] = None
+
+class ChantierPiece(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    nom: str
+    type: Literal["SDB", "WC", "Cuisine", "Autre"] = "Autre"
+    dimensions: Dict[str, float] = Field(default_factory=dict)  # longueur, largeur, hauteur, surface
+    elements: List[ElementPiece] = Field(default_factory=list)
+    plan_photo: Optional[str] = None  # base64
+    plan_dimensions_validees: bool = False
+    carrelage_sol: Optional[CarrelageInfo] = None
+    carrelage_mur: Optional[CarrelageInfo] = None
+    faience: Optional[FaienceInfo] = None
+    hsp: Optional[float] = None
+    notes_stylet: Optional[str] = None
+
+class MesureManuelle(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    nom: str
+    valeur: float
+    unite: Literal["mm", "cm", "m"] = "cm"
+    piece_id: str = ""
+    notes: Optional[str] = None
+    photo_associee: Optional[str] = None
+
+class PhotoTechnique(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    nom: str
+    base64_data: str
+    piece_id: Optional[str] = None
+    notes: str = ""
+    date_prise: str = ""
+    type: Literal["Plan", "Detail", "Probleme", "Reference"] = "Detail"
+
+class FicheTechnique(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: Literal["SDB_Creation", "SDB_Renovation", "SDB_Amenagement", "Installation_Chauffage"]
+    donnees: dict = Field(default_factory=dict)
+    completude: float = Field(0, ge=0, le=100)
+
+class ChampPersonnalise(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    nom: str
+    type: Literal["texte", "nombre", "photo", "note_stylet", "liste"] = "texte"
+    valeur: Any = None
+    obligatoire: bool = False
+
+class OngletPersonnalise(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    nom: str
+    icone: str = ""
+    champs: List[ChampPersonnalise] = Field(default_factory=list)
+    ordre: int = 0
+
+ChantierType = Literal["Plomberie", "Chauffage", "Climatisation"]
+ChantierSousType = Literal[
+    "SDB_Creation", "SDB_Renovation", "SDB_Amenagement", "Installation_Chauffage", "Reparation", "Autre"
+]
+ChantierStatus = Literal["En_cours", "Termine", "Planifie", "Devis"]
+
+class ChantierSummary(BaseModel):
+    id: str
+    client_id: Optional[str] = None
+    client_name: str
+    adresse: str = ""
+    type: ChantierType
+    sous_type: ChantierSousType
+    status: ChantierStatus
+    date_debut: str = ""
+    date_fin: Optional[str] = None
+    counts: Dict[str, int] = Field(default_factory=dict)
+    version: int = 1
+    created_at: datetime
+    updated_at: datetime
+
+class Chantier(ChantierSummary):
+    notes_generales: str = ""
+    # None when the section was not requested with ?include=
+    pieces: Optional[List[ChantierPiece]] = None
+    mesures_manuelles: Optional[List[MesureManuelle]] = None
+    photos_techniques: Optional[List[PhotoTechnique]] = None
+    fiches_techniques: Optional[List[FicheTechnique]] = None
+    onglets_personnalises: Optional[List[OngletPersonnalise]] = None
+
+class ChantierCreate(BaseModel):
+    client_id: Optional[str] = None
+    client_name: str
+    adresse: str = ""
+    type: ChantierType
+    sous_type: ChantierSousType = "Autre"
+    status: ChantierStatus = "Devis"
+    date_debut: str = ""
+    date_fin: Optional[str] = None
+    notes_generales: str = ""
+    pieces: List[ChantierPiece] = Field(default_factory=list)
+    mesures_manuelles: List[MesureManuelle] = Field(default_factory=list)
+    photos_techniques: List[PhotoTechnique] = Field(default_factory=list)
+    fiches_techniques: List[FicheTechnique] = Field(default_factory=list)
+    onglets_personnalises: List[OngletPersonnalise] = Field(default_factory=list)
+
+def partial_model(model, name: Optional[str] = None, exclude=("id",)):
+    # Every field optional, for updates and item patches; the id cannot be
+    # changed. The annotations are kept as they are: the None default is never
+    # validated, so an omitted field passes (and exclude_unset drops it), while
+    # an explicit null is only accepted where the model itself allows one.
+    fields = {
+        field: (info.annotation, None) for field, info in model.__fields__.items() if field not in exclude
+    }
+    return create_model(name or f"{model.__name__}Patch", **fields)
+
+# The chantier's own fields; its sections are changed item by item
+ChantierUpdate = partial_model(ChantierCreate, "ChantierUpdate", exclude=(
+    "pieces", "mesures_manuelles", "photos_techniques", "fiches_techniques", "onglets_personnalises",
+))
+
+class ChantierPage(BaseModel):
+    items: List[ChantierSummary]
+    next: Optional[str] = None
+
+CHANTIER_ITEM_MODELS = {
+    "pieces": ChantierPiece,
+    "mesures_manuelles": MesureManuelle,
+    "photos_techniques": PhotoTechnique,
+    "fiches_techniques": FicheTechnique,
+    "onglets_personnalises": OngletPersonnalise,
+    "elements": ElementPiece,
+    "champs": ChampPersonnalise,
+}
+CHANTIER_ITEM_PATCHES = {name: partial_model(model) for name, model in CHANTIER_ITEM_MODELS.items()}
+
+RendezVousType = Literal["Visite_Technique", "Installation", "Reparation", "Devis", "Suivi"]
+RendezVousStatus = Literal["Planifie", "Confirme", "En_cours", "Termine", "Annule"]
+RendezVousPriorite = Literal["Basse", "Normale", "Haute", "Urgente"]
+
+class RendezVous(BaseModel):
+    id: str
+    client_name: str
+    adresse: str = ""
+    type: RendezVousType
+    date: str  # YYYY-MM-DD
+    heure_debut: str  # HH:mm
+    heure_fin: str
+    description: str = ""
+    status: RendezVousStatus
+    priorite: RendezVousPriorite
+    assigne_a: str  # user id
+    chantier_id: Optional[str] = None
+    notes: str = ""
+    start: datetime
+    end: datetime
+    created_by: str
+    created_at: datetime
+    updated_at: datetime
+
+class RendezVousCreate(BaseModel):
+    client_name: str
+    adresse: str = ""
+    type: RendezVousType = "Visite_Technique"
+    date: str
+    heure_debut: str
+    heure_fin: str
+    description: str = ""
+    status: RendezVousStatus = "Planifie"
+    priorite: RendezVousPriorite = "Normale"
+    assigne_a: str
+    chantier_id: Optional[str] = None
+    notes: str = ""
+
+RendezVousUpdate = partial_model(RendezVousCreate, "RendezVousUpdate")
+
+class CalendarDay(BaseModel):
+    date: str
+    is_current_month: bool
+    rendez_vous: List[RendezVous]
+
+class CalendarMonth(BaseModel):
+    year: int
+    month: int
+    days: List[CalendarDay]
+
+class JobCreate(BaseModel):
+    type: str
+    params: dict = Field(default_factory=dict)
+
+class Job(BaseModel):
+    id: str
+    type: str
+    status: str  # queued, running, succeeded or failed
+    progress: float = 0.0
+    message: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_by: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+# Query of GET /api/clients/export and params of the clients_export job
+class ClientsExportParams(BaseModel):
+    format: Literal["ndjson", "csv"] = "ndjson"
+    ville: Optional[str] = None
+    type_chauffage: Optional[str] = None
+    updated_since: Optional[datetime] = None
+    compress: bool = False
+
+class ChatMessage(BaseModel):
+    id: str
+    channel: str
+    sender_id: str
+    sender_name: str
+    message: str
+    type: str = "text"
+    timestamp: datetime
+
+class ChatPage(BaseModel):
+    items: List[ChatMessage]
+    next: Optional[str] = None
 
 # Utility functions
 def hash_password(password: str) -> str:
@@ -114,6 +691,27 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+async def run_password_job(func, *args):
+    global password_jobs_in_flight
+    if password_jobs_in_flight >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    password_jobs_in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        password_jobs_in_flight -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_job(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await run_password_job(verify_password, password, hashed)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -124,9 +722,95 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def encode_token(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('utf-8').rstrip("=")
+
+def decode_token(token: str) -> dict:
+    padded = token + "=" * (-len(token) % 4)
+    data = json.loads(base64.urlsafe_b64decode(padded.encode('utf-8')))
+    if not isinstance(data, dict):
+        raise ValueError("token payload must be an object")
+    return data
+
+def encode_cursor(timestamp: datetime, doc_id: str) -> str:
+    # Opaque keyset token over (timestamp, id); built from stored documents only,
+    # so the timestamp already carries Mongo's millisecond precision.
+    return encode_token({"t": timestamp.isoformat(), "i": doc_id})
+
+def decode_cursor(token: str):
+    try:
+        data = decode_token(token)
+        return datetime.fromisoformat(data["t"]), str(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def keyset_after(field: str, timestamp: datetime, doc_id: str) -> dict:
+    # (field, id) strictly greater than the given position, ascending order
+    return {"$or": [
+        {field: {"$gt": timestamp}},
+        {field: timestamp, "id": {"$gt": doc_id}},
+    ]}
+
+def client_etag(client: dict) -> str:
+    # Mongo keeps milliseconds, so the stamp is truncated the same way it is stored
+    updated_at = client["updated_at"].replace(tzinfo=timezone.utc)
+    return f'"{client["id"]}.{client.get("version", 1)}.{int(updated_at.timestamp() * 1000)}"'
+
+def clients_list_etag(clients: List[dict], *query_parts) -> str:
+    # Made of the ETags of the clients listed: a write that changes the list
+    # changes one of them, or which clients are on it
+    digest = hashlib.sha1(repr(query_parts).encode('utf-8'))
+    for client in clients:
+        digest.update(client_etag(client).encode('utf-8'))
+    return f'"clients.{digest.hexdigest()[:20]}"'
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(
+        (tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates
+    )
+
+def if_match_version(header: Optional[str], client_id: str) -> Optional[int]:
+    # If-Match carries one of our client ETags; its version drives the compare-and-set
+    if header is None or header.strip() == "*":
+        return None
+    for tag in header.split(","):
+        tag = tag.strip().strip('"')
+        parts = tag.rsplit(".", 2)
+        if len(parts) == 3 and parts[0] == client_id and parts[1].isdigit():
+            return int(parts[1])
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="If-Match does not match the current client"
+    )
+
+def token_user_id(token: str) -> Optional[str]:
+    """The user id of a validly signed, unexpired token, without loading the user."""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+admission_control = AdmissionControl(
+    token_user_id,
+    rate=RATE_LIMIT_RATE,
+    burst=RATE_LIMIT_BURST,
+    costs=RATE_LIMIT_COSTS,
+    max_in_flight=MAX_IN_FLIGHT_REQUESTS,
+)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    with auth_timer():
+        return await authenticate_token(credentials.credentials)
+
+async def authenticate_token(token: str) -> User:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
@@ -136,6 +820,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        cached_user = user_cache.get(user_id)
+        if cached_user is not None:
+            return cached_user
+        
         user = await db.users.find_one({"id": user_id})
         if user is None:
             raise HTTPException(
@@ -143,7 +831,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 detail="User not found",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return User(**user)
+        current_user = User(**user)
+        user_cache.set(user_id, current_user)
+        return current_user
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -151,32 +841,143 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def rebuild_search_index():
+    # The build takes seconds on a large directory, so it runs in a thread and
+    # the loop keeps serving (searches use the current index meanwhile). Writes
+    # made during the build are replayed on the new index before the swap.
+    async with search_index_lock:
+        client_search_index.track_changes()
+        try:
+            clients = await db.clients.find({}, SEARCH_PROJECTION).to_list(None)
+            fresh = await asyncio.get_running_loop().run_in_executor(None, ClientSearchIndex.build, clients)
+        except BaseException:
+            client_search_index.stop_tracking()
+            raise
+        client_search_index.replace(fresh)
+    logger.info("Client search index built with %d clients", len(client_search_index))
+
+async def record_stats(update) -> None:
+    # The client write has already succeeded: a lost increment is fixed by the next rebuild
+    try:
+        await update
+    except Exception:
+        logger.exception("Dashboard statistics update failed")
+
+def run_in_background(coro, description: str) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+
+    def done(task: asyncio.Task) -> None:
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("%s failed", description, exc_info=task.exception())
+
+    task.add_done_callback(done)
+    return task
+
+async def rebuild_dashboard_stats_periodically():
+    while True:
+        await asyncio.sleep(DASHBOARD_STATS_REBUILD_SECONDS)
+        try:
+            await dashboard_stats.rebuild()
+        except Exception:
+            logger.exception("Dashboard statistics rebuild failed")
+
+async def refresh_search_index_periodically():
+    while True:
+        await asyncio.sleep(SEARCH_INDEX_REFRESH_SECONDS)
+        try:
+            await rebuild_search_index()
+        except Exception:
+            logger.exception("Client search index refresh failed")
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+async def stream_clients_export(query: dict, export_format: str, compress: bool):
+    # Unsorted on purpose: a sort without a matching index would make Mongo
+    # buffer the whole result set before returning the first batch.
+    cursor = db.clients.find(query, {"_id": 0}).batch_size(EXPORT_BATCH_SIZE)
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    
+    def encode(text: str) -> bytes:
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+    
+    def render(batch: List[dict]) -> str:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for doc in batch:
+                writer.writerow([_export_value(doc.get(field, "")) for field in CLIENT_EXPORT_FIELDS])
+            return buffer.getvalue()
+        return "".join(
+            json.dumps({k: _export_value(v) for k, v in doc.items()}, ensure_ascii=False) + "\n"
+            for doc in batch
+        )
+    
+    if export_format == "csv":
+        header = encode(",".join(CLIENT_EXPORT_FIELDS) + "\r\n")
+        if header:
+            yield header
+    
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            chunk = encode(render(batch))
+            batch = []
+            if chunk:
+                yield chunk
+    if batch:
+        chunk = encode(render(batch))
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
+
+def clients_export_query(
+    ville: Optional[str] = None,
+    type_chauffage: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+) -> dict:
+    query = {}
+    if ville is not None:
+        query["ville"] = ville
+    if type_chauffage is not None:
+        query["type_chauffage"] = type_chauffage
+    if updated_since is not None:
+        query["updated_at"] = {"$gt": updated_since}
+    return query
+
+def export_media_type(export_format: str, compress: bool) -> str:
+    if compress:
+        return "application/gzip"
+    return "text/csv; charset=utf-8" if export_format == "csv" else "application/x-ndjson"
+
+def version_conflict_error(conflict: VersionConflict, precondition: bool = False) -> HTTPException:
+    # A stale If-Match is a failed precondition; a stale body/query version a conflict
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED if precondition else status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Client was modified by someone else, reload it and retry",
+            "current_version": conflict.current_version,
+        }
+    )
+
 # Initialize default admin user
 async def init_default_users():
-    admin_exists = await db.users.find_one({"username": "admin"})
-    if not admin_exists:
-        admin_user = User(
-            username="admin",
-            role="admin",
-            permissions={
-                "clients": True,
-                "documents": True,
-                "chantiers": True,
-                "calculs_pac": True,
-                "catalogues": True,
-                "chat": True,
-                "parametres": True
-            },
-            hashed_password=hash_password("admin123")
-        )
-        await db.users.insert_one(admin_user.dict())
-        
-    # Create a sample employee
-    employee_exists = await db.users.find_one({"username": "employe1"})
-    if not employee_exists:
-        employee_user = User(
-            username="employe1",
-            role="employee",
+    # Upserts with $setOnInsert: workers starting together cannot create a
+    # default user twice, and an existing one is never overwritten
+    for username, role, password, parametres in (
+        ("admin", "admin", "admin123", True),
+        ("employe1", "employee", "employe123", False),
+    ):
+        if await db.users.find_one({"username": username}, {"_id": 1}):
+            continue
+        user = User(
+            username=username,
+            role=role,
             permissions={
                 "clients": True,
                 "documents": True,
@@ -184,17 +985,21 @@ async def init_default_users():
                 "calculs_pac": True,
                 "catalogues": True,
                 "chat": True,
-                "parametres": False
+                "parametres": parametres
             },
-            hashed_password=hash_password("employe123")
+            hashed_password=await hash_password_async(password)
         )
-        await db.users.insert_one(employee_user.dict())
+        try:
+            await db.users.update_one({"username": username}, {"$setOnInsert": user.dict()}, upsert=True)
+        except DuplicateKeyError:
+            # Two upserts raced on the unique username index: the other one inserted it
+            pass
 
 # Auth routes
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_data: UserLogin):
     user = await db.users.find_one({"username": user_data.username})
-    if not user or not verify_password(user_data.password, user["hashed_password"]):
+    if not user or not await verify_password_async(user_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -240,10 +1045,11 @@ async def register(user_data: UserCreate, current_user: User = Depends(get_curre
     new_user = User(
         username=user_data.username,
         role=user_data.role,
-        hashed_password=hash_password(user_data.password)
+        hashed_password=await hash_password_async(user_data.password)
     )
     
     await db.users.insert_one(new_user.dict())
+    user_cache.invalidate(new_user.id)
     
     return UserResponse(
         id=new_user.id,
@@ -253,20 +1059,108 @@ async def register(user_data: UserCreate, current_user: User = Depends(get_curre
         created_at=new_user.created_at.isoformat()
     )
 
+@api_router.put("/users/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: str,
+    user_data: UserUpdate,
+    current_user: User = Depends(get_current_user)
+):
+    # Only admin can change roles and permissions
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can update users"
+        )
+    
+    update_data = {k: v for k, v in user_data.dict().items() if v is not None}
+    if update_data:
+        result = await db.users.update_one({"id": user_id}, {"$set": update_data})
+        if result.matched_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+    user_cache.invalidate(user_id)
+    
+    user = await db.users.find_one({"id": user_id})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    return UserResponse(
+        id=user["id"],
+        username=user["username"],
+        role=user["role"],
+        permissions=user["permissions"],
+        created_at=user["created_at"].isoformat()
+    )
+
 # Client routes
-@api_router.get("/clients", response_model=List[Client])
-async def get_clients(current_user: User = Depends(get_current_user)):
+@api_router.get("/clients", response_model=Union[ClientPage, List[Client]])
+async def get_clients(
+    response: Response,
+    paginate: bool = False,
+    limit: int = Query(CLIENTS_PAGE_SIZE, ge=1, le=CLIENTS_PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
     if not current_user.permissions.get("clients", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access to clients not permitted"
         )
     
-    clients = await db.clients.find().sort("created_at", -1).to_list(1000)
-    return [Client(**client) for client in clients]
+    # Revalidation still reads the page: its ETag is made of the clients on it.
+    # A 304 saves the transfer and serialisation, and no write pays for it.
+    paginated = paginate or after is not None
+    
+    # Legacy unpaginated list, kept for clients that expect a bare array
+    if not paginated:
+        clients = await db.clients.find({}, CLIENT_RESPONSE_PROJECTION).sort("created_at", -1).to_list(1000)
+        etag = clients_list_etag(clients, paginated)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        if FAST_READS:
+            return ORJSONResponse(clients, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return [Client(**client) for client in clients]
+    
+    # Keyset pagination: newest first, ties on created_at broken by id
+    query = {}
+    if after is not None:
+        created_at, client_id = decode_cursor(after)
+        query = {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": client_id}},
+        ]}
+    
+    clients = await db.clients.find(query, CLIENT_RESPONSE_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    # The extra client decides whether there is a next page
+    etag = clients_list_etag(clients, paginated, limit, after)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    next_cursor = None
+    if len(clients) > limit:
+        clients = clients[:limit]
+        next_cursor = encode_cursor(clients[-1]["created_at"], clients[-1]["id"])
+    
+    if FAST_READS:
+        return ORJSONResponse({"items": clients, "next": next_cursor}, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return ClientPage(items=[Client(**client) for client in clients], next=next_cursor)
 
 @api_router.post("/clients", response_model=Client)
-async def create_client(client_data: ClientCreate, current_user: User = Depends(get_current_user)):
+async def create_client(
+    client_data: ClientCreate,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
     if not current_user.permissions.get("clients", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -274,29 +1168,132 @@ async def create_client(client_data: ClientCreate, current_user: User = Depends(
         )
     
     new_client = Client(**client_data.dict())
-    await db.clients.insert_one(new_client.dict())
+    await client_repository.create(new_client.dict())
+    client_search_index.add(new_client.dict())
+    await record_stats(dashboard_stats.clients_added([new_client.dict()]))
+    response.headers["ETag"] = client_etag(new_client.dict())
     return new_client
 
-@api_router.get("/clients/{client_id}", response_model=Client)
-async def get_client(client_id: str, current_user: User = Depends(get_current_user)):
+@api_router.post("/clients/bulk", response_model=BulkImportResult)
+async def bulk_import_clients(request: Request, current_user: User = Depends(get_current_user)):
     if not current_user.permissions.get("clients", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access to clients not permitted"
         )
     
-    client = await db.clients.find_one({"id": client_id})
-    if not client:
+    # Accepts a multipart upload ("file": CSV or XLSX) or a JSON array of clients
+    loop = asyncio.get_running_loop()
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Missing 'file' upload"
+                )
+            content = await upload.read()
+            frame = await loop.run_in_executor(None, read_upload, content, upload.filename)
+        else:
+            try:
+                records = await request.json()
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid JSON body"
+                )
+            frame = await loop.run_in_executor(None, read_records, records)
+    except ImportFormatError as exc:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Client not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
         )
-    return Client(**client)
+    
+    valid, errors = await loop.run_in_executor(None, normalize, frame)
+    
+    # Rows carrying an id are upserted on it, the others are inserted. An id
+    # row without the required fields is a partial update of an existing client.
+    records = valid.to_dict("index")
+    partial_ids = {
+        record["id"] for record in records.values()
+        if record.get("id") and any(not record.get(field) for field in IMPORT_REQUIRED_FIELDS)
+    }
+    existing_ids = set(await db.clients.distinct("id", {"id": {"$in": list(partial_ids)}})) if partial_ids else set()
+    now = datetime.utcnow()
+    defaults = ClientCreate(nom="", prenom="").dict()
+    operations, operation_rows, new_clients = [], [], {}
+    has_upserts = False
+    for row, record in records.items():
+        client_id = record.pop("id", "")
+        if client_id:
+            partial = client_id in partial_ids
+            if partial and client_id not in existing_ids:
+                errors[row] = [
+                    "No client with this id; " + " and ".join(IMPORT_REQUIRED_FIELDS) + " are required to create one"
+                ]
+                continue
+            # A blank required field in an update keeps the stored value
+            record = {k: v for k, v in record.items() if v or k not in IMPORT_REQUIRED_FIELDS}
+            has_upserts = True
+            operations.append(UpdateOne(
+                {"id": client_id},
+                {"$set": {**record, "updated_at": now},
+                 "$inc": {"version": 1},
+                 "$setOnInsert": {
+                     **{k: v for k, v in defaults.items() if k not in record},
+                     "created_at": now,
+                 }},
+                upsert=not partial,
+            ))
+        else:
+            new_client = {
+                "id": str(uuid.uuid4()), **defaults, **record,
+                "version": 1, "created_at": now, "updated_at": now,
+            }
+            new_clients[len(operations)] = new_client
+            operations.append(InsertOne(new_client))
+        operation_rows.append(row)
+    
+    inserted = updated = 0
+    failed_operations = set()
+    for start in range(0, len(operations), BULK_IMPORT_CHUNK_SIZE):
+        chunk = operations[start:start + BULK_IMPORT_CHUNK_SIZE]
+        try:
+            result = await client_repository.bulk_write(chunk, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as exc:
+            details = exc.details
+            for write_error in details.get("writeErrors", []):
+                failed_operations.add(start + write_error["index"])
+                row = operation_rows[start + write_error["index"]]
+                errors.setdefault(row, []).append(write_error.get("errmsg", "write failed"))
+        inserted += details.get("nInserted", 0) + details.get("nUpserted", 0)
+        updated += details.get("nMatched", 0)
+    
+    for new_client in new_clients.values():
+        client_search_index.add(new_client)
+    if has_upserts:
+        run_in_background(rebuild_search_index(), "Client search index rebuild")
+        # Upserted rows may have moved between buckets: recount rather than guess
+        run_in_background(record_stats(dashboard_stats.rebuild()), "Dashboard statistics rebuild")
+    elif new_clients:
+        await record_stats(dashboard_stats.clients_added(
+            client for index, client in new_clients.items() if index not in failed_operations
+        ))
+    
+    return BulkImportResult(
+        received=len(frame),
+        inserted=inserted,
+        updated=updated,
+        failed=len(errors),
+        errors=[BulkImportError(row=row, errors=messages) for row, messages in sorted(errors.items())],
+    )
 
-@api_router.put("/clients/{client_id}", response_model=Client)
-async def update_client(
-    client_id: str, 
-    client_data: ClientUpdate, 
+@api_router.get("/clients/search", response_model=List[Client])
+async def search_clients(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_user)
 ):
     if not current_user.permissions.get("clients", False):
@@ -305,45 +1302,1239 @@ async def update_client(
             detail="Access to clients not permitted"
         )
     
-    client = await db.clients.find_one({"id": client_id})
-    if not client:
+    ranked_ids = [client_id for client_id, _ in client_search_index.search(q, limit)]
+    if not ranked_ids:
+        return []
+    
+    clients = await db.clients.find(
+        {"id": {"$in": ranked_ids}}, CLIENT_RESPONSE_PROJECTION
+    ).to_list(len(ranked_ids))
+    by_id = {client["id"]: client for client in clients}
+    ranked = [by_id[client_id] for client_id in ranked_ids if client_id in by_id]
+    if FAST_READS:
+        return ORJSONResponse(ranked)
+    return [Client(**client) for client in ranked]
+
+@api_router.get("/clients/changes", response_model=ClientChanges)
+async def get_client_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=SYNC_PAGE_SIZE_MAX),
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.permissions.get("clients", False):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Client not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to clients not permitted"
         )
     
-    update_data = {k: v for k, v in client_data.dict().items() if v is not None}
-    update_data["updated_at"] = datetime.utcnow()
+    now = datetime.utcnow()
+    horizon = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    
+    # The token holds the (timestamp, id) reached in both streams, plus the time
+    # up to which the caller has seen every tombstone.
+    if since is None:
+        upserts_after = (datetime(1970, 1, 1), "")
+        deletes_after = (horizon, "")
+        synced_until = horizon
+    else:
+        try:
+            data = decode_token(since)
+            upserts_after = (datetime.fromisoformat(data["u"][0]), str(data["u"][1]))
+            deletes_after = (datetime.fromisoformat(data["d"][0]), str(data["d"][1]))
+            synced_until = datetime.fromisoformat(data["s"])
+        except (ValueError, KeyError, TypeError, IndexError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid sync token"
+            )
+        if synced_until < now - timedelta(seconds=TOMBSTONE_RETENTION_SECONDS):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token older than the tombstone retention window, full resync required"
+            )
+    
+    clients = await db.clients.find(
+        {"updated_at": {"$lt": horizon}, **keyset_after("updated_at", *upserts_after)},
+        {"_id": 0},
+    ).sort([("updated_at", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    tombstones = await db.client_tombstones.find(
+        {"deleted_at": {"$lt": horizon}, **keyset_after("deleted_at", *deletes_after)},
+        {"_id": 0},
+    ).sort([("deleted_at", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
     
-    await db.clients.update_one({"id": client_id}, {"$set": update_data})
+    has_more = len(clients) > limit or len(tombstones) > limit
+    clients, tombstones = clients[:limit], tombstones[:limit]
     
-    updated_client = await db.clients.find_one({"id": client_id})
-    return Client(**updated_client)
+    if clients:
+        upserts_after = (clients[-1]["updated_at"], clients[-1]["id"])
+    if tombstones:
+        deletes_after = (tombstones[-1]["deleted_at"], tombstones[-1]["id"])
+    synced_until = deletes_after[0] if len(tombstones) == limit else horizon
+    
+    # A client re-created after its deletion (bulk upsert) wins over its
+    # tombstone. Its upsert may sit on another page than the tombstone, so the
+    # whole collection is checked, not only this page.
+    if tombstones:
+        recreated = await db.clients.find(
+            {"id": {"$in": [t["id"] for t in tombstones]}}, {"_id": 0, "id": 1, "updated_at": 1}
+        ).to_list(None)
+        live_since = {client["id"]: client["updated_at"] for client in recreated}
+        tombstones = [
+            t for t in tombstones
+            if t["id"] not in live_since or live_since[t["id"]] <= t["deleted_at"]
+        ]
+    
+    next_token = encode_token({
+        "u": [upserts_after[0].isoformat(), upserts_after[1]],
+        "d": [deletes_after[0].isoformat(), deletes_after[1]],
+        "s": synced_until.isoformat(),
+    })
+    
+    return ClientChanges(
+        upserts=[Client(**client) for client in clients],
+        deleted=[t["id"] for t in tombstones],
+        next=next_token,
+        has_more=has_more,
+    )
 
-@api_router.delete("/clients/{client_id}")
-async def delete_client(client_id: str, current_user: User = Depends(get_current_user)):
+@api_router.get("/clients/export")
+async def export_clients(
+    params: ClientsExportParams = Depends(),
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.permissions.get("clients", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to clients not permitted"
+        )
+    
+    query = clients_export_query(params.ville, params.type_chauffage, params.updated_since)
+    filename = f"clients.{params.format}" + (".gz" if params.compress else "")
+    return StreamingResponse(
+        stream_clients_export(query, params.format, params.compress),
+        media_type=export_media_type(params.format, params.compress),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@api_router.get("/clients/{client_id}", response_model=Client)
+async def get_client(
+    client_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
     if not current_user.permissions.get("clients", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access to clients not permitted"
         )
     
-    result = await db.clients.delete_one({"id": client_id})
-    if result.deleted_count == 0:
+    # Revalidation only needs the fields the ETag is made of
+    if if_none_match:
+        stamp = await client_repository.get(
+            client_id, {"_id": 0, "id": 1, "version": 1, "updated_at": 1}
+        )
+        if stamp and etag_matches(if_none_match, client_etag(stamp)):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": client_etag(stamp)},
+            )
+    
+    client = await client_repository.get(client_id, CLIENT_RESPONSE_PROJECTION)
+    if not client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Client not found"
         )
-    return {"message": "Client deleted successfully"}
+    if FAST_READS:
+        return ORJSONResponse(client, headers={"ETag": client_etag(client)})
+    response.headers["ETag"] = client_etag(client)
+    return Client(**client)
 
-# Health check
-@api_router.get("/health")
-async def health_check():
+@api_router.put("/clients/{client_id}", response_model=Client)
+async def update_client(
+    client_id: str, 
+    client_data: ClientUpdate, 
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.permissions.get("clients", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to clients not permitted"
+        )
+    
+    header_version = if_match_version(if_match, client_id)
+    expected_version = header_version if header_version is not None else client_data.version
+    update_data = client_data.dict(exclude_none=True, exclude={"version"})
+    # The state before only matters to the dashboard, when a counted field changes
+    counted = bool(update_data.keys() & set(CLIENT_BUCKETS))
+    try:
+        updated = await client_repository.update(
+            client_id, update_data, expected_version=expected_version, with_previous=counted
+        )
+    except VersionConflict as conflict:
+        raise version_conflict_error(conflict, precondition=header_version is not None)
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Client not found"
+        )
+    
+    if counted:
+        previous_client, updated_client = updated
+        await record_stats(dashboard_stats.client_changed(previous_client, updated_client))
+    else:
+        updated_client = updated
+    client_search_index.add(updated_client)
+    response.headers["ETag"] = client_etag(updated_client)
+    return Client(**updated_client)
+
+@api_router.delete("/clients/{client_id}")
+async def delete_client(
+    client_id: str,
+    version: Optional[int] = None,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.permissions.get("clients", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to clients not permitted"
+        )
+    
+    header_version = if_match_version(if_match, client_id)
+    expected_version = header_version if header_version is not None else version
+    try:
+        deleted_client = await client_repository.delete(client_id, expected_version=expected_version)
+    except VersionConflict as conflict:
+        raise version_conflict_error(conflict, precondition=header_version is not None)
+    if not deleted_client:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Client not found"
+        )
+    client_search_index.remove(client_id)
+    await record_stats(dashboard_stats.client_removed(deleted_client))
+    return {"message": "Client deleted successfully"}
+
+# Dashboard
+@api_router.get("/stats/dashboard", response_model=DashboardStatsResponse)
+async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
+    if not current_user.permissions.get("clients", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to clients not permitted"
+        )
+    
+    stats = await dashboard_stats.get()
+    if stats is None:
+        # First read on an empty database, before startup or a rebuild created it
+        await dashboard_stats.rebuild()
+        stats = await dashboard_stats.get()
+    if FAST_READS:
+        return ORJSONResponse(stats)
+    return DashboardStatsResponse(**stats)
+
+# Chantiers
+def require_chantiers_permission(current_user: User) -> None:
+    if not current_user.permissions.get("chantiers", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to chantiers not permitted"
+        )
+
+def chantier_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Chantier not found"
+    )
+
+def parse_chantier_include(include: Optional[str]) -> set:
+    if not include:
+        return set()
+    sections = set()
+    for name in include.split(","):
+        name = name.strip()
+        if name == "all":
+            sections.update(CHANTIER_SECTIONS)
+            continue
+        section = CHANTIER_INCLUDE_ALIASES.get(name, name)
+        if section not in CHANTIER_SECTIONS:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown section {name!r}. Available: {', '.join(CHANTIER_SECTIONS)}, all"
+            )
+        sections.add(section)
+    return sections
+
+def chantier_item_path(section: str, child: Optional[str] = None) -> str:
+    """Validate a section (and child array) named in the URL; return the item model key."""
+    if section not in CHANTIER_SECTIONS or (child is not None and CHILD_SECTIONS.get(section) != child):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown chantier section"
+        )
+    return child or section
+
+def validate_chantier_item(model_key: str, data: dict, partial: bool = False) -> dict:
+    model = (CHANTIER_ITEM_PATCHES if partial else CHANTIER_ITEM_MODELS)[model_key]
+    try:
+        item = model(**data)
+    except ValidationError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_url=False))
+    return item.dict(exclude_unset=True) if partial else item.dict()
+
+@api_router.get("/chantiers", response_model=ChantierPage)
+async def list_chantiers(
+    status_filter: Optional[ChantierStatus] = Query(None, alias="status"),
+    chantier_type: Optional[ChantierType] = Query(None, alias="type"),
+    client_id: Optional[str] = None,
+    limit: int = Query(CHANTIERS_PAGE_SIZE, ge=1, le=CHANTIERS_PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    
+    query = {
+        field: value
+        for field, value in (("status", status_filter), ("type", chantier_type), ("client_id", client_id))
+        if value is not None
+    }
+    if after is not None:
+        created_at, chantier_id = decode_cursor(after)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": chantier_id}},
+        ]
+    
+    # Summaries only: the sections (photos especially) never leave the database here
+    chantiers = await db.chantiers.find(query, CHANTIER_SUMMARY_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(chantiers) > limit:
+        chantiers = chantiers[:limit]
+        next_cursor = encode_cursor(chantiers[-1]["created_at"], chantiers[-1]["id"])
+    
+    if FAST_READS:
+        return ORJSONResponse({"items": chantiers, "next": next_cursor})
+    return ChantierPage(items=[ChantierSummary(**chantier) for chantier in chantiers], next=next_cursor)
+
+@api_router.post("/chantiers", response_model=Chantier, status_code=status.HTTP_201_CREATED)
+async def create_chantier(chantier_data: ChantierCreate, current_user: User = Depends(get_current_user)):
+    require_chantiers_permission(current_user)
+    now = datetime.utcnow()
+    chantier = await chantier_repository.create({
+        "id": str(uuid.uuid4()),
+        **chantier_data.dict(),
+        "version": 1,
+        "created_at": now,
+        "updated_at": now,
+    })
+    return Chantier(**chantier)
+
+@api_router.get("/chantiers/{chantier_id}", response_model=Chantier, response_model_exclude_none=True)
+async def get_chantier(
+    chantier_id: str,
+    include: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    chantier = await chantier_repository.get(chantier_id, parse_chantier_include(include))
+    if chantier is None:
+        raise chantier_not_found()
+    if FAST_READS:
+        return ORJSONResponse(chantier)
+    return Chantier(**chantier)
+
+@api_router.put("/chantiers/{chantier_id}", response_model=ChantierSummary)
+async def update_chantier(
+    chantier_id: str,
+    chantier_data: ChantierUpdate,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    chantier = await chantier_repository.update(chantier_id, chantier_data.dict(exclude_unset=True))
+    if chantier is None:
+        raise chantier_not_found()
+    return ChantierSummary(**chantier)
+
+@api_router.delete("/chantiers/{chantier_id}")
+async def delete_chantier(chantier_id: str, current_user: User = Depends(get_current_user)):
+    require_chantiers_permission(current_user)
+    if not await chantier_repository.delete(chantier_id):
+        raise chantier_not_found()
+    return {"message": "Chantier deleted successfully"}
+
+@api_router.post("/chantiers/{chantier_id}/{section}", status_code=status.HTTP_201_CREATED)
+async def add_chantier_item(
+    chantier_id: str,
+    section: str,
+    item_data: dict,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    item = validate_chantier_item(chantier_item_path(section), item_data)
+    if not await chantier_repository.add_item(chantier_id, section, item):
+        raise chantier_not_found()
+    return item
+
+@api_router.patch("/chantiers/{chantier_id}/{section}/{item_id}")
+async def update_chantier_item(
+    chantier_id: str,
+    section: str,
+    item_id: str,
+    item_data: dict,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    fields = validate_chantier_item(chantier_item_path(section), item_data, partial=True)
+    item = await chantier_repository.update_item(chantier_id, section, item_id, fields)
+    if item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chantier or item not found"
+        )
+    return item
+
+@api_router.delete("/chantiers/{chantier_id}/{section}/{item_id}")
+async def delete_chantier_item(
+    chantier_id: str,
+    section: str,
+    item_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    chantier_item_path(section)
+    if not await chantier_repository.remove_item(chantier_id, section, item_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chantier or item not found"
+        )
+    return {"message": "Item deleted successfully"}
+
+# Items nested one level down: pieces/{id}/elements and onglets_personnalises/{id}/champs
+@api_router.post("/chantiers/{chantier_id}/{section}/{parent_id}/{child}", status_code=status.HTTP_201_CREATED)
+async def add_chantier_child_item(
+    chantier_id: str,
+    section: str,
+    parent_id: str,
+    child: str,
+    item_data: dict,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    item = validate_chantier_item(chantier_item_path(section, child), item_data)
+    if not await chantier_repository.add_item(chantier_id, section, item, parent_id=parent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chantier or item not found"
+        )
+    return item
+
+@api_router.patch("/chantiers/{chantier_id}/{section}/{parent_id}/{child}/{item_id}")
+async def update_chantier_child_item(
+    chantier_id: str,
+    section: str,
+    parent_id: str,
+    child: str,
+    item_id: str,
+    item_data: dict,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    fields = validate_chantier_item(chantier_item_path(section, child), item_data, partial=True)
+    item = await chantier_repository.update_item(chantier_id, section, item_id, fields, parent_id=parent_id)
+    if item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chantier or item not found"
+        )
+    return item
+
+@api_router.delete("/chantiers/{chantier_id}/{section}/{parent_id}/{child}/{item_id}")
+async def delete_chantier_child_item(
+    chantier_id: str,
+    section: str,
+    parent_id: str,
+    child: str,
+    item_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    chantier_item_path(section, child)
+    if not await chantier_repository.remove_item(chantier_id, section, item_id, parent_id=parent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chantier or item not found"
+        )
+    return {"message": "Item deleted successfully"}
+
+# Rendez-vous
+def rendez_vous_slot(date: str, heure_debut: str, heure_fin: str):
+    try:
+        return parse_slot(date, heure_debut, heure_fin)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+def slot_conflict_error(conflict: SlotConflict) -> HTTPException:
+    other = conflict.conflict
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "The technician already has a rendez-vous at that time",
+            "conflict": {field: other.get(field) for field in ("id", "client_name", "date", "heure_debut", "heure_fin")},
+        }
+    )
+
+@api_router.get("/rendez_vous", response_model=List[RendezVous])
+async def list_rendez_vous(
+    range_from: datetime = Query(..., alias="from"),
+    range_to: datetime = Query(..., alias="to"),
+    assigne_a: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    if range_to <= range_from or range_to - range_from > timedelta(days=RENDEZ_VOUS_RANGE_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"'to' must be after 'from' and at most {RENDEZ_VOUS_RANGE_MAX_DAYS} days later"
+        )
+    rendez_vous = await rendez_vous_repository.list_range(range_from, range_to, assigne_a)
+    if FAST_READS:
+        return ORJSONResponse(rendez_vous)
+    return [RendezVous(**rdv) for rdv in rendez_vous]
+
+@api_router.get("/rendez_vous/month", response_model=CalendarMonth)
+async def get_calendar_month(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    assigne_a: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    # One range read over the 6-week grid, bucketed per day here
+    rendez_vous = await rendez_vous_repository.list_range(*month_range(year, month), assigne_a)
+    calendar_month = {"year": year, "month": month, "days": month_grid(year, month, rendez_vous)}
+    if FAST_READS:
+        return ORJSONResponse(calendar_month)
+    return CalendarMonth(**calendar_month)
+
+@api_router.post("/rendez_vous", response_model=RendezVous, status_code=status.HTTP_201_CREATED)
+async def create_rendez_vous(rdv_data: RendezVousCreate, current_user: User = Depends(get_current_user)):
+    require_chantiers_permission(current_user)
+    start, end = rendez_vous_slot(rdv_data.date, rdv_data.heure_debut, rdv_data.heure_fin)
+    now = datetime.utcnow()
+    rdv = {
+        "id": str(uuid.uuid4()),
+        **rdv_data.dict(),
+        "start": start,
+        "end": end,
+        "created_by": current_user.id,
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        await rendez_vous_repository.create(rdv)
+    except SlotConflict as conflict:
+        raise slot_conflict_error(conflict)
+    return RendezVous(**rdv)
+
+@api_router.put("/rendez_vous/{rdv_id}", response_model=RendezVous)
+async def update_rendez_vous(
+    rdv_id: str,
+    rdv_data: RendezVousUpdate,
+    current_user: User = Depends(get_current_user)
+):
+    require_chantiers_permission(current_user)
+    current = await rendez_vous_repository.get(rdv_id)
+    if current is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rendez-vous not found"
+        )
+    
+    fields = rdv_data.dict(exclude_unset=True)
+    if fields.keys() & {"date", "heure_debut", "heure_fin"}:
+        merged = {**current, **fields}
+        fields["start"], fields["end"] = rendez_vous_slot(merged["date"], merged["heure_debut"], merged["heure_fin"])
+    fields["updated_at"] = datetime.utcnow()
+    try:
+        updated = await rendez_vous_repository.update(current, fields)
+    except SlotConflict as conflict:
+        raise slot_conflict_error(conflict)
+    if updated is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rendez-vous not found"
+        )
+    return RendezVous(**updated)
+
+@api_router.delete("/rendez_vous/{rdv_id}")
+async def delete_rendez_vous(rdv_id: str, current_user: User = Depends(get_current_user)):
+    require_chantiers_permission(current_user)
+    if not await rendez_vous_repository.delete(rdv_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rendez-vous not found"
+        )
+    return {"message": "Rendez-vous deleted successfully"}
+
+# PAC calculations
+@api_router.post("/calculs_pac/batch", response_model=CalculPACBatchResult)
+async def size_calculs_pac_batch(batch: CalculPACBatch, current_user: User = Depends(get_current_user)):
+    if not current_user.permissions.get("calculs_pac", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to PAC calculations not permitted"
+        )
+    
+    if len(batch.items) > CALCULS_PAC_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {CALCULS_PAC_BATCH_MAX} items per batch"
+        )
+    
+    columns = {
+        field: [getattr(item, field) for item in batch.items]
+        for field in CalculPACInput.__fields__
+    }
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(None, lambda: result_rows(size_batch(columns)))
+    payload = {"coefficients_version": COEFFICIENTS_VERSION, "results": results}
+    if FAST_READS:
+        return ORJSONResponse(payload)
+    return payload
+
+@api_router.post("/calculs_pac", response_model=CalculPACStored)
+async def create_calcul_pac(
+    calcul_data: CalculPACInput,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.permissions.get("calculs_pac", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to PAC calculations not permitted"
+        )
+    
+    # Identical inputs are served from memory, then Mongo, and only computed once
+    calcul, source = await calculs_pac_store.get_or_compute(calcul_data.dict())
+    if FAST_READS:
+        return ORJSONResponse(calcul, headers={"X-Cache": source})
+    response.headers["X-Cache"] = source
+    return CalculPACStored(**calcul)
+
+@api_router.get("/calculs_pac/{input_hash}", response_model=CalculPACStored)
+async def get_calcul_pac(
+    input_hash: str,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.permissions.get("calculs_pac", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to PAC calculations not permitted"
+        )
+    
+    # A calculation made with older coefficient tables is still the user's
+    calcul, source = await calculs_pac_store.get(input_hash, any_version=True)
+    if calcul is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calculation not found"
+        )
+    if FAST_READS:
+        return ORJSONResponse(calcul, headers={"X-Cache": source})
+    response.headers["X-Cache"] = source
+    return CalculPACStored(**calcul)
+
+# Chat
+def chat_channel(channel) -> str:
+    if not isinstance(channel, str) or not CHAT_CHANNEL_PATTERN.match(channel):
+        raise ValueError("Invalid channel name")
+    return channel
+
+def chat_error(detail: str) -> str:
+    return encode_event({"event": "error", "detail": detail})
+
+async def send_chat_events(websocket: WebSocket, subscriber) -> None:
+    # Sole writer of the socket: replies and room events all go through the queue
+    while True:
+        payload = await subscriber.next_event()
+        if payload is None:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+        await websocket.send_text(payload)
+
+def handle_chat_frame(frame, subscriber, current_user: User) -> None:
+    if not isinstance(frame, dict):
+        raise ValueError("Frames must be JSON objects")
+    action = frame.get("action")
+    channel = chat_channel(frame.get("channel"))
+    
+    if action == "join":
+        chat_broker.join(subscriber, channel)
+        chat_broker.deliver(subscriber, encode_event({"event": "joined", "channel": channel}))
+    elif action == "leave":
+        chat_broker.leave(subscriber, channel)
+        chat_broker.deliver(subscriber, encode_event({"event": "left", "channel": channel}))
+    elif action == "message":
+        if channel not in subscriber.channels:
+            raise ValueError("Join the channel before posting to it")
+        text = frame.get("message")
+        if not isinstance(text, str) or not text.strip() or len(text) > CHAT_MESSAGE_MAX_LENGTH:
+            raise ValueError(f"message must be 1 to {CHAT_MESSAGE_MAX_LENGTH} characters")
+        message_type = frame.get("type", "text")
+        if message_type not in CHAT_MESSAGE_TYPES:
+            raise ValueError(f"type must be one of {', '.join(CHAT_MESSAGE_TYPES)}")
+        now = datetime.utcnow()
+        message = {
+            "id": str(uuid.uuid4()),
+            "channel": channel,
+            "sender_id": current_user.id,
+            "sender_name": current_user.username,
+            "message": text,
+            "type": message_type,
+            # Mongo keeps milliseconds: history cursors must match what is broadcast
+            "timestamp": now.replace(microsecond=now.microsecond // 1000 * 1000),
+        }
+        if not chat_writer.add(dict(message)):
+            chat_broker.deliver(subscriber, chat_error("Chat is overloaded, message not sent"))
+            return
+        chat_broker.publish(channel, {"event": "message", "message": message})
+    else:
+        raise ValueError("action must be join, leave or message")
+
+@api_router.websocket("/chat/ws")
+async def chat_socket(websocket: WebSocket, token: Optional[str] = None, channels: Optional[str] = None):
+    # Browsers cannot set headers on a WebSocket: the JWT may come as ?token=
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        current_user = await authenticate_token(token or "")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not current_user.permissions.get("chat", False):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    subscriber = chat_broker.subscribe(current_user.id)
+    sender = asyncio.create_task(send_chat_events(websocket, subscriber))
+    try:
+        for channel in (channels or CHAT_DEFAULT_CHANNEL).split(","):
+            try:
+                handle_chat_frame({"action": "join", "channel": channel.strip()}, subscriber, current_user)
+            except ValueError as exc:
+                chat_broker.deliver(subscriber, chat_error(str(exc)))
+        while not subscriber.evicted:
+            try:
+                frame = await websocket.receive_json()
+            except ValueError:
+                chat_broker.deliver(subscriber, chat_error("Frames must be JSON"))
+                continue
+            try:
+                handle_chat_frame(frame, subscriber, current_user)
+            except ValueError as exc:
+                chat_broker.deliver(subscriber, chat_error(str(exc)))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_broker.unsubscribe(subscriber)
+        sender.cancel()
+
+@api_router.get("/chat/channels/{channel}/messages", response_model=ChatPage)
+async def get_chat_history(
+    channel: str,
+    limit: int = Query(CHAT_HISTORY_PAGE_SIZE, ge=1, le=CHAT_HISTORY_PAGE_SIZE_MAX),
+    before: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.permissions.get("chat", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to chat not permitted"
+        )
+    
+    # Newest first; `next` pages further back in time. Messages reach Mongo in
+    # batches, so the last few hundred milliseconds may only exist on the sockets.
+    query = {"channel": channel}
+    if before is not None:
+        timestamp, message_id = decode_cursor(before)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": message_id}},
+        ]
+    
+    messages = await db.chat_messages.find(query, {"_id": 0}).sort(
+        [("timestamp", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1]["timestamp"], messages[-1]["id"])
+    
+    if FAST_READS:
+        return ORJSONResponse({"items": messages, "next": next_cursor})
+    return ChatPage(items=[ChatMessage(**message) for message in messages], next=next_cursor)
+
+# Documents
+def require_documents_permission(current_user: User) -> None:
+    if not current_user.permissions.get("documents", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access to documents not permitted"
+        )
+
+async def get_upload_session(upload_id: str, current_user: User) -> dict:
+    session = await db.document_uploads.find_one({"id": upload_id}, {"_id": 0})
+    # Someone else's upload is reported as missing, not forbidden
+    if session is None or (session["created_by"] != current_user.id and current_user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return session
+
+async def finish_upload(session: dict, sha256: str) -> Document:
+    document = Document(
+        name=session["filename"],
+        content_type=session["content_type"],
+        size=session["size"],
+        sha256=sha256,
+        category=session["category"],
+        client_id=session.get("client_id"),
+        chantier_id=session.get("chantier_id"),
+        uploaded_by=session["created_by"],
+    )
+    await db.documents.insert_one(document.dict())
+    await db.document_uploads.delete_one({"id": session["id"]})
+    return document
+
+@api_router.post("/documents/uploads", response_model=DocumentUpload)
+async def create_document_upload(upload_data: DocumentUploadCreate, current_user: User = Depends(get_current_user)):
+    require_documents_permission(current_user)
+    
+    if upload_data.size > DOCUMENT_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Documents are limited to {DOCUMENT_MAX_SIZE // (1024 * 1024)} MB"
+        )
+    sha256 = (upload_data.sha256 or "").lower() or None
+    if sha256 is not None and not is_sha256(sha256):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sha256 must be 64 hexadecimal characters"
+        )
+    
+    session = {
+        "id": str(uuid.uuid4()),
+        **upload_data.dict(exclude={"sha256"}),
+        "sha256": sha256,
+        "created_by": current_user.id,
+        "created_at": datetime.utcnow(),
+    }
+    
+    # Content already stored: record the document without transferring a byte
+    if sha256 is not None and document_storage.has_blob(sha256):
+        known = await db.documents.find_one({"sha256": sha256}, {"_id": 0, "size": 1})
+        if known is not None and known["size"] == upload_data.size:
+            document = await finish_upload(session, sha256)
+            return DocumentUpload(id=session["id"], size=upload_data.size, offset=upload_data.size, document=document)
+    
+    await db.document_uploads.insert_one(dict(session))
+    document_storage.create_part(session["id"])
+    if upload_data.size == 0:
+        sha256, _ = await document_storage.complete(session["id"])
+        document = await finish_upload(session, sha256)
+        return DocumentUpload(id=session["id"], size=0, offset=0, document=document)
+    return DocumentUpload(id=session["id"], size=upload_data.size, offset=0)
+
+@api_router.get("/documents/uploads/{upload_id}", response_model=DocumentUpload)
+async def get_document_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    require_documents_permission(current_user)
+    session = await get_upload_session(upload_id, current_user)
+    # The part on disk is the source of truth for where to resume
+    return DocumentUpload(id=upload_id, size=session["size"], offset=document_storage.received(upload_id))
+
+@api_router.put("/documents/uploads/{upload_id}", response_model=DocumentUpload)
+async def upload_document_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: User = Depends(get_current_user)
+):
+    require_documents_permission(current_user)
+    session = await get_upload_session(upload_id, current_user)
+    
+    lock = document_upload_locks.setdefault(upload_id, asyncio.Lock())
+    if lock.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another chunk of this upload is being received"
+        )
+    async with lock:
+        try:
+            received = document_storage.received(upload_id)
+            if offset != received:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Upload is at offset {received}, resume from there"
+                )
+            try:
+                received = await document_storage.append(
+                    upload_id, offset, session["size"] - offset, request.stream()
+                )
+            except UploadOverflow as exc:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=str(exc)
+                )
+            
+            if received < session["size"]:
+                return DocumentUpload(id=upload_id, size=session["size"], offset=received)
+            
+            try:
+                sha256, _ = await document_storage.complete(upload_id, session.get("sha256"))
+            except ValueError as exc:
+                await db.document_uploads.delete_one({"id": upload_id})
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=str(exc)
+                )
+            document = await finish_upload(session, sha256)
+            return DocumentUpload(id=upload_id, size=session["size"], offset=received, document=document)
+        finally:
+            document_upload_locks.pop(upload_id, None)
+
+@api_router.delete("/documents/uploads/{upload_id}")
+async def cancel_document_upload(upload_id: str, current_user: User = Depends(get_current_user)):
+    require_documents_permission(current_user)
+    await get_upload_session(upload_id, current_user)
+    await db.document_uploads.delete_one({"id": upload_id})
+    document_storage.discard_part(upload_id)
+    return {"message": "Upload cancelled"}
+
+@api_router.get("/documents", response_model=DocumentPage)
+async def list_documents(
+    category: Optional[str] = None,
+    client_id: Optional[str] = None,
+    chantier_id: Optional[str] = None,
+    limit: int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_PAGE_SIZE_MAX),
+    after: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    require_documents_permission(current_user)
+    
+    query = {
+        field: value
+        for field, value in (("category", category), ("client_id", client_id), ("chantier_id", chantier_id))
+        if value is not None
+    }
+    # Newest first, keyset on (created_at, id) like the client list
+    if after is not None:
+        created_at, document_id = decode_cursor(after)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": document_id}},
+        ]
+    
+    documents = await db.documents.find(query, {"_id": 0}).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1]["created_at"], documents[-1]["id"])
+    
+    if FAST_READS:
+        return ORJSONResponse({"items": documents, "next": next_cursor})
+    return DocumentPage(items=[Document(**document) for document in documents], next=next_cursor)
+
+@api_router.get("/documents/{document_id}", response_model=Document)
+async def get_document(document_id: str, current_user: User = Depends(get_current_user)):
+    require_documents_permission(current_user)
+    document = await db.documents.find_one({"id": document_id}, {"_id": 0})
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    return Document(**document)
+
+@api_router.api_route("/documents/{document_id}/content", methods=["GET", "HEAD"])
+async def download_document(
+    document_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    require_documents_permission(current_user)
+    document = await db.documents.find_one({"id": document_id}, {"_id": 0})
+    if document is None or not document_storage.has_blob(document["sha256"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    # Content-addressed: the hash is a strong validator that never goes stale
+    etag = f'"{document["sha256"]}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    path = document_storage.blob_path(document["sha256"])
+    size = document["size"]
+    # A Range conditioned on another version of the file gets the whole file
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{size}"},
+        )
+    
+    if byte_range is None:
+        return FileResponse(path, headers=headers, media_type=document["content_type"], filename=document["name"])
+    start, end = byte_range
+    return RangeFileResponse(
+        path, start, end, size,
+        headers=headers, media_type=document["content_type"], filename=document["name"],
+    )
+
+@api_router.delete("/documents/{document_id}")
+async def delete_document(document_id: str, current_user: User = Depends(get_current_user)):
+    require_documents_permission(current_user)
+    document = await db.documents.find_one_and_delete({"id": document_id}, {"_id": 0, "sha256": 1})
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    # The blob goes with the last document pointing at it
+    if await db.documents.count_documents({"sha256": document["sha256"]}, limit=1) == 0:
+        document_storage.remove_blob(document["sha256"])
+    return {"message": "Document deleted successfully"}
+
+# Background jobs
+async def export_clients_job(job: dict, progress) -> dict:
+    # The export becomes a document, downloadable with Range support once done
+    params = job["params"]
+    query = clients_export_query(params["ville"], params["type_chauffage"], params["updated_since"])
+    total = await db.clients.count_documents(query)
+    
+    async def chunks():
+        # Each chunk after the CSV header renders about EXPORT_BATCH_SIZE clients
+        rendered = 0
+        async for chunk in stream_clients_export(query, params["format"], params["compress"]):
+            yield chunk
+            rendered += EXPORT_BATCH_SIZE
+            if total:
+                progress(min(rendered / total, 0.99), f"{min(rendered, total)} / {total} clients")
+    
+    part_id = job["id"]
+    document_storage.create_part(part_id)
+    try:
+        size = await document_storage.append(part_id, 0, sys.maxsize, chunks())
+        sha256, _ = await document_storage.complete(part_id)
+    except BaseException:
+        document_storage.discard_part(part_id)
+        raise
+    filename = f"clients_{datetime.utcnow():%Y%m%d_%H%M%S}.{params['format']}" + (".gz" if params["compress"] else "")
+    document = Document(
+        name=filename,
+        content_type=export_media_type(params["format"], params["compress"]),
+        size=size,
+        sha256=sha256,
+        uploaded_by=job["created_by"],
+    )
+    await db.documents.insert_one(document.dict())
+    return {"document_id": document.id, "clients": total, "size": size}
+
+def validate_calculs_pac_job(params: dict) -> dict:
+    batch = CalculPACBatch(**params)
+    if len(batch.items) > CALCULS_PAC_BATCH_MAX:
+        raise ValueError(f"At most {CALCULS_PAC_BATCH_MAX} items per batch")
+    return batch.dict()
+
+job_runner.register(
+    "clients_export", export_clients_job, kind="async", concurrency=1, permission="clients",
+    validate=lambda params: ClientsExportParams(**params).dict(),
+)
+job_runner.register(
+    "calculs_pac_batch", calculs_pac.batch_job, kind="process", concurrency=JOBS_PROCESS_WORKERS,
+    permission="calculs_pac", validate=validate_calculs_pac_job,
+)
+
+@api_router.post("/jobs", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(job_data: JobCreate, current_user: User = Depends(get_current_user)):
+    job_type = job_runner.types.get(job_data.type)
+    if job_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job type. Available: {', '.join(sorted(job_runner.types))}"
+        )
+    if job_type.permission and not current_user.permissions.get(job_type.permission, False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Access to {job_type.permission} not permitted"
+        )
+    
+    try:
+        job = await job_runner.submit(job_data.type, job_data.params, current_user.id)
+    except UnknownJobType as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+    return Job(**job)
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await job_runner.get(job_id)
+    # Other people's jobs are reported as missing, not forbidden
+    if job is None or (job["created_by"] != current_user.id and current_user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return Job(**job)
+
+# Diagnostics
+@api_router.get("/diagnostics/round-trips")
+async def get_round_trips(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can read diagnostics"
+        )
+    return {
+        "clients": client_repository.stats(),
+        "calculs_pac": calculs_pac_store.stats(),
+        "chat": {"broker": chat_broker.stats(), "writer": chat_writer.stats()},
+        "jobs": job_runner.stats(),
+    }
+
+# Profiles
+async def token_is_admin(token: str) -> bool:
+    try:
+        user = await authenticate_token(token)
+    except HTTPException:
+        return False
+    return user.role == "admin"
+
+@api_router.get("/admin/profiles")
+async def list_profiles(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can read profiles"
+        )
+    profiles = await asyncio.get_running_loop().run_in_executor(None, profile_store.list)
+    return {"enabled": PROFILING_ENABLED, "sample_rate": PROFILE_SAMPLE_RATE, "profiles": profiles}
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: Literal["pstats", "text"] = "pstats",
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can read profiles"
+        )
+    
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    if format == "text":
+        # Readable without tooling; the pstats file opens in snakeviz or gprof2dot
+        summary = await asyncio.get_running_loop().run_in_executor(None, profile_store.summary, profile_id, limit, sort)
+        return PlainTextResponse(summary)
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+# Metrics
+@api_router.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    if not METRICS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Metrics are disabled"
+        )
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token"
+        )
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Health check
+# Liveness: the process answers, whatever the state of its dependencies
+@api_router.get("/health")
+@api_router.get("/health/live")
+async def health_check():
     return {"status": "ok", "message": "H2EAUX Gestion API is running"}
 
+@api_router.get("/health/ready")
+async def readiness_check():
+    mongo = await readiness_probe.check()
+    if not mongo["ok"]:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "mongo": mongo},
+        )
+    return {"status": "ready", "mongo": mongo}
+
+@api_router.get("/health/stats")
+async def health_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admin can read diagnostics"
+        )
+    return {
+        "mongo": await readiness_probe.check(),
+        "pool": {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "max_idle_time_ms": MONGO_MAX_IDLE_TIME_MS or None,
+            "wait_queue_timeout_ms": MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+            **metrics.pool_stats(),
+        },
+        "event_loop": loop_lag_monitor.stats(),
+        "admission": {"enabled": RATE_LIMIT_ENABLED, **admission_control.stats()},
+        "user_cache": user_cache.stats(),
+        "password_hashing": {
+            "workers": PASSWORD_WORKERS,
+            "in_flight": password_jobs_in_flight,
+            "limit": PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT,
+        },
+    }
+
 # Include router
 app.include_router(api_router)
 
+# Inside CORS, so rejections still carry the CORS headers
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware, control=admission_control, exempt_prefixes=ADMISSION_EXEMPT_PREFIXES
+    )
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -351,6 +2542,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware, store=profile_store, is_admin=token_is_admin, sample_rate=PROFILE_SAMPLE_RATE
+    )
+# Added last, so outermost: the timings include the other middleware
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
 
 # Configure logging
 logging.basicConfig(
@@ -359,12 +2557,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def bootstrap():
+    """Setup shared by all the workers: run it once per deployment, not per worker."""
+    await ensure_indexes(db)
+    if VERIFY_QUERY_PLANS:
+        await verify_query_plans(db)
+    await init_default_users()
+    document_storage.prepare()
+    open_uploads = await db.document_uploads.distinct("id")
+    # Exports in progress on other workers write their part under the job id
+    running_exports = await db.jobs.distinct("id", {"type": "clients_export", "status": "running"})
+    document_storage.purge_parts(set(open_uploads) | set(running_exports))
+    await client_repository.backfill_versions()
+    if await dashboard_stats.get() is None:
+        await dashboard_stats.rebuild()
+
+async def warmup(connections: int):
+    """Open pooled connections and fill the per-worker caches before serving."""
+    start = time.perf_counter()
+    # Concurrent pings each check out a connection, so the pool opens that many
+    await asyncio.gather(*(db.command("ping") for _ in range(connections)))
+    users = await db.users.find({}).to_list(USER_CACHE_SIZE)
+    for user in users:
+        user_cache.set(user["id"], User(**user))
+    await dashboard_stats.get()
+    logger.info(
+        "Worker warmed up in %.0f ms: %d connections, %d users cached",
+        (time.perf_counter() - start) * 1000, connections, len(users),
+    )
+
 @app.on_event("startup")
 async def startup_event():
-    await init_default_users()
+    global search_refresh_task, dashboard_stats_task
+    if bootstrap_on_startup():
+        await bootstrap()
+    document_storage.prepare()
+    await rebuild_search_index()
+    connections = warmup_connections()
+    if connections > 0:
+        await warmup(connections)
+    chat_writer.start()
+    job_runner.start()
+    loop_lag_monitor.start()
+    if SEARCH_INDEX_REFRESH_SECONDS > 0:
+        search_refresh_task = asyncio.create_task(refresh_search_index_periodically())
+    if DASHBOARD_STATS_REBUILD_SECONDS > 0:
+        dashboard_stats_task = asyncio.create_task(rebuild_dashboard_stats_periodically())
     logger.info("H2EAUX Gestion API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if search_refresh_task is not None:
+        search_refresh_task.cancel()
+    if dashboard_stats_task is not None:
+        dashboard_stats_task.cancel()
+    for task in list(background_tasks):
+        task.cancel()
+    await loop_lag_monitor.stop()
+    await chat_writer.stop()
+    await job_runner.stop(JOBS_SHUTDOWN_GRACE)
     client.close()
+    password_executor.shutdown(wait=False)
     logger.info("H2EAUX Gestion API shut down")
\ No newline at end of file
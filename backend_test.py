@@ -4,10 +4,15 @@ H2EAUX Gestion Backend API Test Suite
 Tests authentication, client management, database integration, and security
 """
 
+import csv
+import gzip
+import hashlib
+import io
 import requests
 import json
 import sys
 import os
+import time
 from datetime import datetime
 
 # Get backend URL from frontend .env file
@@ -86,6 +91,14 @@ def test_health_endpoint():
             f"Got message: {data.get('message')}"
         )
         
+        response = requests.get(f"{BASE_URL}/health/ready", timeout=10)
+        data = response.json()
+        results.assert_test(
+            response.status_code == 200 and data.get("mongo", {}).get("ok") is True,
+            "Readiness endpoint reaches MongoDB",
+            f"Got status {response.status_code}: {data}"
+        )
+        
     except Exception as e:
         results.assert_test(False, "Health endpoint accessible", str(e))
 
@@ -430,6 +443,1024 @@ def test_client_management(admin_token):
         except Exception as e:
             results.assert_test(False, "Delete client request", str(e))
 
+def test_client_search(admin_token):
+    """Test accent-insensitive, typo-tolerant client search"""
+    print(f"\n{'='*60}")
+    print("TESTING CLIENT SEARCH")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Client search tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client_id = None
+    
+    try:
+        client_data = {
+            "nom": "Lefèvre",
+            "prenom": "Hélène",
+            "telephone": "06 12 34 56 78",
+            "ville": "Quimper",
+            "code_postal": "29000"
+        }
+        response = requests.post(f"{BASE_URL}/clients", json=client_data, headers=headers, timeout=10)
+        if response.status_code == 200:
+            client_id = response.json()["id"]
+        
+        for query, label in [
+            ("lefevre", "Accent-insensitive search"),
+            ("lefvre", "Typo-tolerant search"),
+            ("hel quimp", "Multi-term prefix search"),
+            ("06 12 34", "Phone prefix search"),
+        ]:
+            response = requests.get(f"{BASE_URL}/clients/search", params={"q": query}, headers=headers, timeout=10)
+            found = response.status_code == 200 and any(c.get("id") == client_id for c in response.json())
+            results.assert_test(
+                found,
+                f"{label} finds client ('{query}')",
+                f"Got status {response.status_code}: {response.text[:200]}"
+            )
+        
+    except Exception as e:
+        results.assert_test(False, "Client search test", str(e))
+    
+    if client_id:
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_bulk_import(admin_token):
+    """Test bulk client import, including partial updates of existing clients"""
+    print(f"\n{'='*60}")
+    print("TESTING BULK CLIENT IMPORT")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Bulk import tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    created_ids = []
+    
+    try:
+        rows = [
+            {"nom": "Import", "prenom": "Un", "telephone": "+33 6 12 34 56 78", "code_postal": "1000"},
+            {"nom": "Import", "prenom": "Deux", "ville": "Brest"},
+            {"nom": "", "prenom": "Sans nom"},
+        ]
+        response = requests.post(f"{BASE_URL}/clients/bulk", json=rows, headers=headers, timeout=30)
+        data = response.json()
+        results.assert_test(
+            response.status_code == 200 and data.get("inserted") == 2 and data.get("failed") == 1
+            and data["errors"][0]["row"] == 3,
+            "Bulk import inserts valid rows and reports invalid ones",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.post(f"{BASE_URL}/clients", json={"nom": "Partiel", "prenom": "Client"}, headers=headers, timeout=10)
+        client_id = response.json()["id"]
+        created_ids.append(client_id)
+        response = requests.post(
+            f"{BASE_URL}/clients/bulk",
+            json=[{"id": client_id, "telephone": "0611111111"}, {"id": "id-inconnu", "telephone": "0622222222"}],
+            headers=headers, timeout=30
+        )
+        data = response.json()
+        results.assert_test(
+            response.status_code == 200 and data.get("updated") == 1 and data.get("failed") == 1
+            and data["errors"][0]["row"] == 2,
+            "Bulk import applies partial updates by id and rejects unknown ids without nom/prenom",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        client = requests.get(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10).json()
+        results.assert_test(
+            client.get("telephone") == "06 11 11 11 11" and client.get("nom") == "Partiel" and client.get("prenom") == "Client",
+            "Partial update changes only the given fields",
+            f"Got {client}"
+        )
+        
+        response = requests.post(
+            f"{BASE_URL}/clients/bulk",
+            files={"file": ("clients.xls", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 504, "application/vnd.ms-excel")},
+            headers=headers, timeout=30
+        )
+        results.assert_test(
+            response.status_code == 400 and ".xlsx" in response.json().get("detail", ""),
+            "Bulk import rejects legacy .xls uploads with 400",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        for query in ("import un", "import deux"):
+            found = requests.get(f"{BASE_URL}/clients/search", params={"q": query}, headers=headers, timeout=10).json()
+            created_ids.extend(c["id"] for c in found if c.get("nom") == "Import")
+    except Exception as e:
+        results.assert_test(False, "Bulk import test", str(e))
+    
+    for client_id in set(created_ids):
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_optimistic_concurrency(admin_token):
+    """Test version-checked updates and deletes"""
+    print(f"\n{'='*60}")
+    print("TESTING OPTIMISTIC CONCURRENCY")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Optimistic concurrency tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client_id = None
+    
+    try:
+        response = requests.post(f"{BASE_URL}/clients", json={"nom": "Version", "prenom": "Test"}, headers=headers, timeout=10)
+        created_client = response.json()
+        client_id = created_client.get("id")
+        version = created_client.get("version")
+        
+        response = requests.put(f"{BASE_URL}/clients/{client_id}", json={"notes": "Technicien A", "version": version}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.json().get("version") == version + 1,
+            "Update with current version succeeds and bumps version",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.put(f"{BASE_URL}/clients/{client_id}", json={"notes": "Technicien B", "version": version}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 409,
+            "Update with stale version returns 409",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.delete(f"{BASE_URL}/clients/{client_id}", params={"version": version}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 409,
+            "Delete with stale version returns 409",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+    except Exception as e:
+        results.assert_test(False, "Optimistic concurrency test", str(e))
+    
+    if client_id:
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_delta_sync(admin_token):
+    """Test the client change feed: upserts, tombstones and paging"""
+    print(f"\n{'='*60}")
+    print("TESTING DELTA SYNC")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Delta sync tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client_ids = []
+    
+    try:
+        # Full sync first, to get a token past every existing change
+        token = None
+        while True:
+            params = {"since": token} if token else {}
+            response = requests.get(f"{BASE_URL}/clients/changes", params=params, headers=headers, timeout=30)
+            if response.status_code != 200:
+                break
+            page = response.json()
+            token = page["next"]
+            if not page["has_more"]:
+                break
+        results.assert_test(
+            response.status_code == 200 and token is not None,
+            "Full sync returns a token",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        for prenom in ("Sync A", "Sync B", "Sync C"):
+            response = requests.post(f"{BASE_URL}/clients", json={"nom": "Delta", "prenom": prenom}, headers=headers, timeout=10)
+            client_ids.append(response.json().get("id"))
+        deleted_id = client_ids.pop()
+        response = requests.delete(f"{BASE_URL}/clients/{deleted_id}", headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200,
+            "Delete before the sync succeeds",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        # Changes are only served once older than the settle window (2s by default)
+        time.sleep(3)
+        
+        response = requests.get(f"{BASE_URL}/clients/changes", params={"since": token}, headers=headers, timeout=10)
+        changes = response.json() if response.status_code == 200 else {}
+        upserted = [client["id"] for client in changes.get("upserts", [])]
+        results.assert_test(
+            set(client_ids) <= set(upserted) and deleted_id not in upserted,
+            "Delta sync returns the created clients only",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        results.assert_test(
+            deleted_id in changes.get("deleted", []),
+            "Delta sync returns the deleted client's tombstone",
+            f"Deleted ids: {changes.get('deleted')}"
+        )
+        results.assert_test(
+            all("_id" not in client for client in changes.get("upserts", [])),
+            "Delta sync upserts have no MongoDB _id",
+            "Found _id field in the upserts"
+        )
+        
+        # The same changes one at a time
+        paged_upserts, paged_deleted, first_page, pages = [], [], None, 0
+        page_token = token
+        while pages < 20:
+            response = requests.get(f"{BASE_URL}/clients/changes", params={"since": page_token, "limit": 1}, headers=headers, timeout=10)
+            if response.status_code != 200:
+                break
+            page = response.json()
+            pages += 1
+            first_page = first_page or page
+            paged_upserts += [client["id"] for client in page["upserts"]]
+            paged_deleted += page["deleted"]
+            results.assert_test(
+                len(page["upserts"]) <= 1 and len(page["deleted"]) <= 1,
+                f"Sync page {pages} holds at most one change per stream",
+                f"Got {page}"
+            )
+            page_token = page["next"]
+            if not page["has_more"]:
+                break
+        results.assert_test(
+            first_page is not None and first_page["has_more"] and first_page["next"] != token,
+            "First page of one reports more changes and advances the token",
+            f"Got {first_page}"
+        )
+        results.assert_test(
+            set(client_ids) <= set(paged_upserts) and deleted_id in paged_deleted
+            and len(paged_upserts) == len(set(paged_upserts)),
+            "Paging with has_more returns every change exactly once",
+            f"Upserts: {paged_upserts}, deleted: {paged_deleted}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/changes", params={"since": page_token}, headers=headers, timeout=10)
+        caught_up = response.json() if response.status_code == 200 else {}
+        results.assert_test(
+            response.status_code == 200 and not caught_up.get("upserts") and not caught_up.get("deleted"),
+            "Sync from the last token returns no changes",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/changes", params={"since": "not-a-token"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 400,
+            "Invalid sync token returns 400",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        # A client deleted then re-created by a bulk import: its upsert comes on
+        # the first page, its tombstone only after two others
+        recreated = {"nom": "Delta", "prenom": "Recree"}
+        doomed = []
+        for prenom in ("Sync D", "Sync E", None):
+            response = requests.post(f"{BASE_URL}/clients", json={"nom": "Delta", "prenom": prenom or recreated["prenom"]}, headers=headers, timeout=10)
+            doomed.append(response.json().get("id"))
+        for client_id in doomed:
+            requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+        recreated["id"] = doomed[-1]
+        response = requests.post(f"{BASE_URL}/clients/bulk", json=[recreated], headers=headers, timeout=30)
+        client_ids.append(recreated["id"])
+        results.assert_test(
+            response.status_code == 200 and response.json().get("inserted", 0) + response.json().get("updated", 0) == 1,
+            "Bulk import re-creates a deleted client by id",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        time.sleep(3)
+        
+        paged_upserts, paged_deleted, pages = [], [], 0
+        while pages < 20:
+            response = requests.get(f"{BASE_URL}/clients/changes", params={"since": page_token, "limit": 1}, headers=headers, timeout=10)
+            if response.status_code != 200:
+                break
+            page = response.json()
+            pages += 1
+            paged_upserts += [client["id"] for client in page["upserts"]]
+            paged_deleted += page["deleted"]
+            page_token = page["next"]
+            if not page["has_more"]:
+                break
+        results.assert_test(
+            recreated["id"] in paged_upserts and recreated["id"] not in paged_deleted
+            and set(doomed[:2]) <= set(paged_deleted),
+            "Re-created client is synced as live even when its tombstone comes on a later page",
+            f"Upserts: {paged_upserts}, deleted: {paged_deleted}"
+        )
+    
+    except Exception as e:
+        results.assert_test(False, "Delta sync test", str(e))
+    
+    for client_id in client_ids:
+        if client_id:
+            requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_conditional_requests(admin_token):
+    """Test ETags: If-None-Match revalidation and If-Match preconditions"""
+    print(f"\n{'='*60}")
+    print("TESTING CONDITIONAL REQUESTS")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Conditional request tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client_id = None
+    
+    try:
+        response = requests.post(f"{BASE_URL}/clients", json={"nom": "Etag", "prenom": "Test"}, headers=headers, timeout=10)
+        client_id = response.json().get("id")
+        
+        response = requests.get(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+        etag = response.headers.get("ETag")
+        results.assert_test(
+            response.status_code == 200 and etag is not None,
+            "Client read returns an ETag",
+            f"Got status {response.status_code}, headers {dict(response.headers)}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/{client_id}", headers={**headers, "If-None-Match": etag}, timeout=10)
+        results.assert_test(
+            response.status_code == 304 and not response.content and response.headers.get("ETag") == etag,
+            "Client read with a matching If-None-Match returns 304",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients", params={"paginate": "true"}, headers=headers, timeout=10)
+        list_etag = response.headers.get("ETag")
+        response = requests.get(f"{BASE_URL}/clients", params={"paginate": "true"}, headers={**headers, "If-None-Match": list_etag}, timeout=10)
+        results.assert_test(
+            list_etag is not None and response.status_code == 304,
+            "Client list with a matching If-None-Match returns 304",
+            f"Got status {response.status_code}, ETag {list_etag}"
+        )
+        
+        response = requests.put(f"{BASE_URL}/clients/{client_id}", json={"notes": "Premier passage"}, headers={**headers, "If-Match": etag}, timeout=10)
+        new_etag = response.headers.get("ETag")
+        results.assert_test(
+            response.status_code == 200 and new_etag is not None and new_etag != etag,
+            "Update with the current ETag in If-Match succeeds and changes the ETag",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/{client_id}", headers={**headers, "If-None-Match": etag}, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.json().get("notes") == "Premier passage",
+            "Client read with a stale If-None-Match returns the new client",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients", params={"paginate": "true"}, headers={**headers, "If-None-Match": list_etag}, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.headers.get("ETag") != list_etag,
+            "Client list with a stale If-None-Match returns 200 and a new ETag",
+            f"Got status {response.status_code}"
+        )
+        
+        response = requests.put(f"{BASE_URL}/clients/{client_id}", json={"notes": "Second passage"}, headers={**headers, "If-Match": etag}, timeout=10)
+        results.assert_test(
+            response.status_code == 412,
+            "Update with a stale If-Match returns 412",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.delete(f"{BASE_URL}/clients/{client_id}", headers={**headers, "If-Match": etag}, timeout=10)
+        results.assert_test(
+            response.status_code == 412,
+            "Delete with a stale If-Match returns 412",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.delete(f"{BASE_URL}/clients/{client_id}", headers={**headers, "If-Match": '"another-client.1.0"'}, timeout=10)
+        results.assert_test(
+            response.status_code == 412,
+            "Delete with another client's ETag returns 412",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.delete(f"{BASE_URL}/clients/{client_id}", headers={**headers, "If-Match": new_etag}, timeout=10)
+        results.assert_test(
+            response.status_code == 200,
+            "Delete with the current ETag in If-Match succeeds",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        if response.status_code == 200:
+            client_id = None
+    
+    except Exception as e:
+        results.assert_test(False, "Conditional request test", str(e))
+    
+    if client_id:
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_client_export(admin_token):
+    """Test the streamed NDJSON and CSV client export and its filters"""
+    print(f"\n{'='*60}")
+    print("TESTING CLIENT EXPORT")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Client export tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    ville = f"Exportville {int(time.time())}"
+    client_ids = []
+    
+    try:
+        for prenom, chauffage in (("Export A", "Gaz"), ("Export B", "PAC air/eau")):
+            response = requests.post(f"{BASE_URL}/clients", json={
+                "nom": "Export", "prenom": prenom, "ville": ville, "type_chauffage": chauffage,
+            }, headers=headers, timeout=10)
+            client_ids.append(response.json().get("id"))
+        
+        response = requests.get(f"{BASE_URL}/clients/export", params={"format": "ndjson", "ville": ville}, headers=headers, timeout=30)
+        rows = [json.loads(line) for line in response.text.splitlines() if line] if response.status_code == 200 else []
+        results.assert_test(
+            response.headers.get("Content-Type", "").startswith("application/x-ndjson")
+            and sorted(row["id"] for row in rows) == sorted(client_ids),
+            "NDJSON export filtered by ville streams exactly the matching clients",
+            f"Got status {response.status_code}: {response.text[:500]}"
+        )
+        results.assert_test(
+            all("_id" not in row and row["ville"] == ville and row.get("created_at") for row in rows),
+            "NDJSON export rows carry the client fields without MongoDB _id",
+            f"Got rows: {rows}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/export", params={"format": "csv", "ville": ville, "type_chauffage": "Gaz"}, headers=headers, timeout=30)
+        table = list(csv.DictReader(io.StringIO(response.text))) if response.status_code == 200 else []
+        results.assert_test(
+            response.headers.get("Content-Type", "").startswith("text/csv")
+            and len(table) == 1 and table[0]["id"] == client_ids[0] and table[0]["prenom"] == "Export A",
+            "CSV export has a header row and applies the type_chauffage filter",
+            f"Got status {response.status_code}: {response.text[:500]}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/export", params={"ville": ville, "compress": "true"}, headers=headers, timeout=30)
+        unzipped = gzip.decompress(response.content).decode("utf-8") if response.status_code == 200 else ""
+        results.assert_test(
+            response.headers.get("Content-Type") == "application/gzip"
+            and sorted(json.loads(line)["id"] for line in unzipped.splitlines() if line) == sorted(client_ids),
+            "Compressed export is a gzip file of the same rows, NDJSON by default",
+            f"Got status {response.status_code}, headers {dict(response.headers)}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/export", params={"format": "xml"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 422,
+            "Export rejects unknown formats",
+            f"Got status {response.status_code}: {response.text}"
+        )
+    
+    except Exception as e:
+        results.assert_test(False, "Client export test", str(e))
+    
+    for client_id in client_ids:
+        if client_id:
+            requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_fast_reads(admin_token):
+    """Test that the orjson read path returns what the validated write path returned"""
+    print(f"\n{'='*60}")
+    print("TESTING FAST READS")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Fast read tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client_id = None
+    
+    def same_client(read, written):
+        # Mongo stores milliseconds, the create response still has microseconds
+        if set(read) != set(written):
+            return False
+        for field, value in written.items():
+            if field in ("created_at", "updated_at"):
+                delta = datetime.fromisoformat(read[field]) - datetime.fromisoformat(value)
+                if abs(delta.total_seconds()) >= 0.001:
+                    return False
+            elif read[field] != value:
+                return False
+        return True
+    
+    try:
+        prenom = f"Hélène {int(time.time())}"
+        response = requests.post(f"{BASE_URL}/clients", json={
+            "nom": "Lefèvre", "prenom": prenom, "ville": "Quimper", "code_postal": "29000",
+            "notes": "Chaudière fioul à remplacer",
+        }, headers=headers, timeout=10)
+        written = response.json()
+        client_id = written.get("id")
+        
+        response = requests.get(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+        read = response.json() if response.status_code == 200 else {}
+        results.assert_test(
+            response.headers.get("Content-Type", "").startswith("application/json") and same_client(read, written),
+            "Client read returns the same fields and values as the create response",
+            f"Read {read}, created {written}"
+        )
+        results.assert_test(
+            "_id" not in read and read.get("notes") == "Chaudière fioul à remplacer",
+            "Client read has no MongoDB _id and keeps accented text",
+            f"Got: {read}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients", headers=headers, timeout=30)
+        listed = [client for client in response.json() if client.get("id") == client_id] if response.status_code == 200 else []
+        results.assert_test(
+            len(listed) == 1 and same_client(listed[0], written),
+            "Unpaginated list returns the client as created",
+            f"Got status {response.status_code}, matches: {listed}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/clients/search", params={"q": prenom}, headers=headers, timeout=10)
+        found = [client for client in response.json() if client.get("id") == client_id] if response.status_code == 200 else []
+        results.assert_test(
+            len(found) == 1 and same_client(found[0], written),
+            "Search returns the client as created",
+            f"Got status {response.status_code}: {response.text[:500]}"
+        )
+    
+    except Exception as e:
+        results.assert_test(False, "Fast read test", str(e))
+    
+    if client_id:
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_calculs_pac_batch(admin_token):
+    """Test server-side PAC sizing against the app's formulas"""
+    print(f"\n{'='*60}")
+    print("TESTING PAC BATCH SIZING")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "PAC batch sizing tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    items = [
+        {"type_pac": "Air_Eau", "surface_totale": 120, "temperature_base": 20, "temperature_exterieure_min": -7,
+         "isolation_murs": "Isoles", "type_fenetres": "Double", "type_emission": "Plancher_chauffant"},
+        {"type_pac": "Air_Air", "volume_total": 30.5, "niveau_isolation_global": 5, "exposition_principale": "Est"},
+    ]
+    
+    try:
+        response = requests.post(f"{BASE_URL}/calculs_pac/batch", json={"items": items}, headers=headers, timeout=10)
+        sized = response.json().get("results", []) if response.status_code == 200 else []
+        results.assert_test(
+            len(sized) == 2
+            and sized[0]["puissance_necessaire"] == 7200
+            and sized[0]["consommation_annuelle_estimee"] == 3200000
+            and sized[1]["puissance_froid"] == 732
+            and sized[1]["puissance_chaud"] == 641,
+            "PAC batch matches the app's air/eau and air/air formulas",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.post(f"{BASE_URL}/calculs_pac/batch", json={"items": [{"type_pac": "Geothermie"}]}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 422,
+            "PAC batch rejects unknown PAC types",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        first = requests.post(f"{BASE_URL}/calculs_pac", json=items[0], headers=headers, timeout=10)
+        again = requests.post(f"{BASE_URL}/calculs_pac", json=items[0], headers=headers, timeout=10)
+        results.assert_test(
+            first.status_code == 200 and again.status_code == 200
+            and again.headers.get("X-Cache") in ("memory", "database")
+            and again.json().get("input_hash") == first.json().get("input_hash"),
+            "Repeated PAC calculation is served from the store",
+            f"Got status {again.status_code}, X-Cache {again.headers.get('X-Cache')}: {again.text}"
+        )
+        
+        stored = requests.get(f"{BASE_URL}/calculs_pac/{first.json().get('input_hash')}", headers=headers, timeout=10)
+        results.assert_test(
+            stored.status_code == 200 and stored.json().get("results") == first.json().get("results"),
+            "Stored PAC calculation can be read back by input hash",
+            f"Got status {stored.status_code}: {stored.text}"
+        )
+    except Exception as e:
+        results.assert_test(False, "PAC batch sizing test", str(e))
+
+def test_chat_history(admin_token):
+    """Test chat history pagination"""
+    print(f"\n{'='*60}")
+    print("TESTING CHAT HISTORY")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Chat history tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    
+    try:
+        response = requests.get(f"{BASE_URL}/chat/channels/general/messages", params={"limit": 5}, headers=headers, timeout=10)
+        page = response.json() if response.status_code == 200 else {}
+        results.assert_test(
+            isinstance(page.get("items"), list) and len(page["items"]) <= 5 and "next" in page,
+            "Chat history returns a page of messages",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/chat/channels/general/messages", params={"before": "not-a-cursor"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 400,
+            "Chat history rejects an invalid cursor",
+            f"Got status {response.status_code}: {response.text}"
+        )
+    except Exception as e:
+        results.assert_test(False, "Chat history test", str(e))
+
+def test_document_upload(admin_token):
+    """Test chunked document upload, deduplication and range downloads"""
+    print(f"\n{'='*60}")
+    print("TESTING DOCUMENT STORAGE")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Document storage tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    content = ("Devis H2EAUX " * 5000).encode("utf-8")
+    document_ids = []
+    
+    try:
+        response = requests.post(f"{BASE_URL}/documents/uploads", json={
+            "filename": "devis_test.txt", "size": len(content), "content_type": "text/plain", "category": "Devis"
+        }, headers=headers, timeout=10)
+        upload_id = response.json().get("id")
+        
+        half = len(content) // 2
+        requests.put(f"{BASE_URL}/documents/uploads/{upload_id}", params={"offset": 0}, data=content[:half], headers=headers, timeout=10)
+        response = requests.get(f"{BASE_URL}/documents/uploads/{upload_id}", headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.json().get("offset") == half,
+            "Interrupted upload reports where to resume",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.put(f"{BASE_URL}/documents/uploads/{upload_id}", params={"offset": half}, data=content[half:], headers=headers, timeout=10)
+        document = response.json().get("document") or {}
+        document_ids.append(document.get("id"))
+        results.assert_test(
+            response.status_code == 200 and document.get("sha256") == hashlib.sha256(content).hexdigest(),
+            "Completed upload creates a document with its SHA-256",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.post(f"{BASE_URL}/documents/uploads", json={
+            "filename": "copie.txt", "size": len(content), "sha256": document.get("sha256")
+        }, headers=headers, timeout=10)
+        copy = response.json().get("document") or {}
+        document_ids.append(copy.get("id"))
+        results.assert_test(
+            response.status_code == 200 and copy.get("sha256") == document.get("sha256"),
+            "Known content is deduplicated without re-upload",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/documents/{document.get('id')}/content", headers={**headers, "Range": "bytes=0-4"}, timeout=10)
+        results.assert_test(
+            response.status_code == 206 and response.content == content[:5],
+            "Range download returns 206 with the requested bytes",
+            f"Got status {response.status_code}"
+        )
+    except Exception as e:
+        results.assert_test(False, "Document storage test", str(e))
+    
+    for document_id in document_ids:
+        if document_id:
+            requests.delete(f"{BASE_URL}/documents/{document_id}", headers=headers, timeout=10)
+
+def test_job_runner(admin_token):
+    """Test background jobs: submission, polling and results"""
+    print(f"\n{'='*60}")
+    print("TESTING BACKGROUND JOBS")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Background job tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    items = [{
+        "type_pac": "Air_Air", "volume_total": 300.0,
+        "niveau_isolation_global": 3, "exposition_principale": "Sud",
+    }] * 100
+    
+    try:
+        response = requests.post(f"{BASE_URL}/jobs", json={"type": "calculs_pac_batch", "params": {"items": items}}, headers=headers, timeout=10)
+        job = response.json()
+        results.assert_test(
+            response.status_code == 202 and job.get("status") == "queued",
+            "Job submission returns 202 with a queued job",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        deadline = time.time() + 30
+        while job.get("status") in ("queued", "running") and time.time() < deadline:
+            time.sleep(0.5)
+            job = requests.get(f"{BASE_URL}/jobs/{job.get('id')}", headers=headers, timeout=10).json()
+        calculs = (job.get("result") or {}).get("results") or []
+        results.assert_test(
+            job.get("status") == "succeeded" and len(calculs) == len(items) and calculs[0].get("puissance_necessaire") == 14400,
+            "Batch job runs to completion with its results",
+            f"Job ended as {job.get('status')}: {job.get('error')}"
+        )
+        
+        response = requests.post(f"{BASE_URL}/jobs", json={"type": "unknown"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 400,
+            "Unknown job type is rejected",
+            f"Got status {response.status_code}"
+        )
+    except Exception as e:
+        results.assert_test(False, "Background job test", str(e))
+
+def test_chantiers(admin_token):
+    """Test chantier summaries, lazy sections and targeted item updates"""
+    print(f"\n{'='*60}")
+    print("TESTING CHANTIERS")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Chantier tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    chantier_id = None
+    
+    try:
+        response = requests.post(f"{BASE_URL}/chantiers", json={
+            "client_name": "Test Chantier", "type": "Plomberie", "sous_type": "SDB_Renovation",
+            "pieces": [{"nom": "Salle de bain", "type": "SDB"}],
+            "photos_techniques": [{"nom": "Plan", "base64_data": "A" * 50000, "type": "Plan"}],
+        }, headers=headers, timeout=10)
+        chantier_id = response.json().get("id")
+        results.assert_test(
+            response.status_code == 201 and response.json().get("counts", {}).get("photos_techniques") == 1,
+            "Chantier creation records section counts",
+            f"Got status {response.status_code}: {response.text[:200]}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/chantiers", headers=headers, timeout=10)
+        summary = next((item for item in response.json().get("items", []) if item.get("id") == chantier_id), {})
+        results.assert_test(
+            response.status_code == 200 and summary and "photos_techniques" not in summary and "pieces" not in summary,
+            "Chantier list returns summaries without sections",
+            f"Got status {response.status_code}"
+        )
+        
+        response = requests.get(f"{BASE_URL}/chantiers/{chantier_id}", params={"include": "pieces"}, headers=headers, timeout=10)
+        chantier = response.json()
+        results.assert_test(
+            response.status_code == 200 and len(chantier.get("pieces", [])) == 1 and "photos_techniques" not in chantier,
+            "Chantier detail loads only the included sections",
+            f"Got status {response.status_code}"
+        )
+        
+        response = requests.post(f"{BASE_URL}/chantiers/{chantier_id}/mesures_manuelles", json={"nom": "Largeur", "valeur": 180}, headers=headers, timeout=10)
+        mesure_id = response.json().get("id")
+        response = requests.patch(f"{BASE_URL}/chantiers/{chantier_id}/mesures_manuelles/{mesure_id}", json={"valeur": 185}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.json().get("valeur") == 185,
+            "Chantier item is updated in place",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.patch(f"{BASE_URL}/chantiers/{chantier_id}/mesures_manuelles/{mesure_id}", json={"nom": None}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 422,
+            "Chantier item patch rejects null for a required field",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.patch(f"{BASE_URL}/chantiers/{chantier_id}/mesures_manuelles/{mesure_id}", json={"notes": "A reprendre"}, headers=headers, timeout=10)
+        response = requests.patch(f"{BASE_URL}/chantiers/{chantier_id}/mesures_manuelles/{mesure_id}", json={"notes": None}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.json().get("notes") is None
+            and response.json().get("nom") == "Largeur" and response.json().get("valeur") == 185,
+            "Chantier item patch clears an optional field and keeps the others",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.put(f"{BASE_URL}/chantiers/{chantier_id}", json={"client_name": None}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 422,
+            "Chantier update rejects null for a required field",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        response = requests.put(f"{BASE_URL}/chantiers/{chantier_id}", json={"date_fin": None, "status": "En_cours"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.json().get("client_name") == "Test Chantier"
+            and response.json().get("status") == "En_cours",
+            "Chantier update accepts null for an optional field and keeps the others",
+            f"Got status {response.status_code}: {response.text}"
+        )
+    except Exception as e:
+        results.assert_test(False, "Chantier test", str(e))
+    
+    if chantier_id:
+        requests.delete(f"{BASE_URL}/chantiers/{chantier_id}", headers=headers, timeout=10)
+
+def test_rendez_vous(admin_token):
+    """Test rendez-vous overlap detection and the month view"""
+    print(f"\n{'='*60}")
+    print("TESTING RENDEZ-VOUS")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Rendez-vous tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    technician = f"test-tech-{os.getpid()}"
+    slot = {"client_name": "Test RDV", "date": "2030-06-12", "assigne_a": technician}
+    created = []
+    
+    try:
+        response = requests.post(f"{BASE_URL}/rendez_vous", json={**slot, "heure_debut": "09:00", "heure_fin": "10:00"}, headers=headers, timeout=10)
+        created.append(response.json().get("id"))
+        results.assert_test(response.status_code == 201, "Rendez-vous creation", f"Got status {response.status_code}: {response.text}")
+        
+        response = requests.post(f"{BASE_URL}/rendez_vous", json={**slot, "heure_debut": "09:30", "heure_fin": "11:00"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 409,
+            "Overlapping rendez-vous for the same technician is refused",
+            f"Got status {response.status_code}"
+        )
+        
+        response = requests.post(f"{BASE_URL}/rendez_vous", json={**slot, "heure_debut": "10:00", "heure_fin": "11:00"}, headers=headers, timeout=10)
+        created.append(response.json().get("id"))
+        results.assert_test(response.status_code == 201, "Back-to-back rendez-vous is accepted", f"Got status {response.status_code}")
+        
+        response = requests.get(f"{BASE_URL}/rendez_vous/month", params={"year": 2030, "month": 6, "assigne_a": technician}, headers=headers, timeout=10)
+        days = {day["date"]: day["rendez_vous"] for day in response.json().get("days", [])}
+        results.assert_test(
+            response.status_code == 200 and len(days) == 42 and len(days.get("2030-06-12", [])) == 2,
+            "Month view returns the day buckets in one request",
+            f"Got status {response.status_code}"
+        )
+        
+        for field in ("status", "assigne_a"):
+            response = requests.put(f"{BASE_URL}/rendez_vous/{created[0]}", json={field: None}, headers=headers, timeout=10)
+            results.assert_test(
+                response.status_code == 422,
+                f"Rendez-vous update rejects null {field}",
+                f"Got status {response.status_code}: {response.text}"
+            )
+        
+        response = requests.put(f"{BASE_URL}/rendez_vous/{created[0]}", json={"chantier_id": None, "status": "Confirme"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200 and response.json().get("status") == "Confirme"
+            and response.json().get("assigne_a") == technician,
+            "Rendez-vous update accepts null for an optional field and keeps the others",
+            f"Got status {response.status_code}: {response.text}"
+        )
+    except Exception as e:
+        results.assert_test(False, "Rendez-vous test", str(e))
+    
+    for rdv_id in created:
+        if rdv_id:
+            requests.delete(f"{BASE_URL}/rendez_vous/{rdv_id}", headers=headers, timeout=10)
+
+def test_dashboard_stats(admin_token):
+    """Test that dashboard statistics follow client writes"""
+    print(f"\n{'='*60}")
+    print("TESTING DASHBOARD STATISTICS")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Dashboard statistics tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    ville = f"Ville Test {os.getpid()}"
+    client_id = None
+    
+    try:
+        response = requests.get(f"{BASE_URL}/stats/dashboard", headers=headers, timeout=10)
+        total = response.json().get("clients", {}).get("total", 0)
+        results.assert_test(response.status_code == 200, "Dashboard statistics are served", f"Got status {response.status_code}")
+        
+        response = requests.post(f"{BASE_URL}/clients", json={"nom": "Stats", "prenom": "Test", "ville": ville}, headers=headers, timeout=10)
+        client_id = response.json().get("id")
+        stats = requests.get(f"{BASE_URL}/stats/dashboard", headers=headers, timeout=10).json().get("clients", {})
+        results.assert_test(
+            stats.get("total") == total + 1 and stats.get("by_ville", {}).get(ville) == 1,
+            "Client creation is counted in the dashboard",
+            f"Got {stats.get('total')} clients, {stats.get('by_ville', {}).get(ville)} in {ville}"
+        )
+        
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+        client_id = None
+        stats = requests.get(f"{BASE_URL}/stats/dashboard", headers=headers, timeout=10).json().get("clients", {})
+        results.assert_test(
+            stats.get("total") == total and ville not in stats.get("by_ville", {}),
+            "Client deletion is uncounted from the dashboard",
+            f"Got {stats.get('total')} clients"
+        )
+    except Exception as e:
+        results.assert_test(False, "Dashboard statistics test", str(e))
+    
+    if client_id:
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
+def test_metrics_endpoint(admin_token):
+    """Test the Prometheus metrics endpoint"""
+    print(f"\n{'='*60}")
+    print("TESTING METRICS")
+    print(f"{'='*60}")
+    
+    try:
+        if admin_token:
+            requests.get(f"{BASE_URL}/clients", headers={"Authorization": f"Bearer {admin_token}"}, timeout=10)
+        response = requests.get(f"{BASE_URL}/metrics", timeout=10)
+        if response.status_code == 401:
+            print("⚠️  Metrics require METRICS_TOKEN on this server, skipping")
+            return
+        body = response.text
+        results.assert_test(
+            response.status_code == 200 and 'route="/api/clients"' in body and "http_request_duration_seconds_bucket" in body,
+            "Metrics expose per-route counts and latency histograms",
+            f"Got status {response.status_code}"
+        )
+        results.assert_test(
+            'phase="auth"' in body,
+            "Metrics split authentication time from handler time",
+            "No auth phase in the exposition"
+        )
+    except Exception as e:
+        results.assert_test(False, "Metrics test", str(e))
+
+def test_request_profiling(admin_token):
+    """Test the admin profile listing and opt-in request profiling"""
+    print(f"\n{'='*60}")
+    print("TESTING REQUEST PROFILING")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Profiling tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    try:
+        response = requests.get(f"{BASE_URL}/admin/profiles", headers=headers, timeout=10)
+        results.assert_test(response.status_code == 200, "Admin can list profiles", f"Got status {response.status_code}")
+        if not response.json().get("enabled"):
+            print("⚠️  Profiling is disabled on this server (PROFILING_ENABLED), skipping capture")
+            return
+        
+        response = requests.get(f"{BASE_URL}/health", headers={**headers, "X-Profile": "1"}, timeout=10)
+        profile_id = response.headers.get("X-Profile-Id")
+        download = requests.get(f"{BASE_URL}/admin/profiles/{profile_id}", headers=headers, timeout=10)
+        results.assert_test(
+            profile_id is not None and download.status_code == 200 and len(download.content) > 0,
+            "Profiled request can be downloaded by id",
+            f"Got id {profile_id}, status {download.status_code}"
+        )
+    except Exception as e:
+        results.assert_test(False, "Profiling test", str(e))
+
+def test_health_stats(admin_token):
+    """Test the admin pool and event loop statistics"""
+    print(f"\n{'='*60}")
+    print("TESTING HEALTH STATISTICS")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Health stats tests", "No admin token available")
+        return
+    
+    try:
+        response = requests.get(f"{BASE_URL}/health/stats", headers={"Authorization": f"Bearer {admin_token}"}, timeout=10)
+        results.assert_test(response.status_code == 200, "Admin can read health stats", f"Got status {response.status_code}")
+        data = response.json()
+        results.assert_test(
+            all(key in data.get("pool", {}) for key in ("max_pool_size", "checked_out", "wait_queue"))
+            and "max_ms" in data.get("event_loop", {})
+            and "rejected" in data.get("admission", {})
+            and data.get("user_cache", {}).get("hits", 0) >= 1 and "misses" in data.get("user_cache", {}),
+            "Health stats report the pool, the event loop lag, admission control and the user cache",
+            f"Got {data}"
+        )
+    except Exception as e:
+        results.assert_test(False, "Health stats test", str(e))
+
 def test_input_validation(admin_token):
     """Test input validation for client creation"""
     print(f"\n{'='*60}")
@@ -535,6 +1566,65 @@ def test_database_persistence(admin_token):
     except Exception as e:
         results.assert_test(False, "Database persistence test", str(e))
 
+def test_client_pagination(admin_token):
+    """Test keyset pagination of the client list"""
+    print(f"\n{'='*60}")
+    print("TESTING CLIENT PAGINATION")
+    print(f"{'='*60}")
+    
+    if not admin_token:
+        results.assert_test(False, "Client pagination tests", "No admin token available")
+        return
+    
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    created_ids = []
+    
+    try:
+        for i in range(3):
+            response = requests.post(f"{BASE_URL}/clients", json={"nom": f"Page{i}", "prenom": "Test"}, headers=headers, timeout=10)
+            if response.status_code == 200:
+                created_ids.append(response.json()["id"])
+        
+        response = requests.get(f"{BASE_URL}/clients", params={"paginate": "true", "limit": 2}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 200,
+            "Paginated client list successful",
+            f"Got status {response.status_code}: {response.text}"
+        )
+        
+        if response.status_code == 200:
+            page = response.json()
+            results.assert_test(
+                len(page.get("items", [])) == 2 and page.get("next") is not None,
+                "First page honours limit and returns next cursor",
+                f"Got {len(page.get('items', []))} items, next={page.get('next')}"
+            )
+            
+            seen = [c["id"] for c in page["items"]]
+            while page.get("next"):
+                response = requests.get(f"{BASE_URL}/clients", params={"after": page["next"], "limit": 2}, headers=headers, timeout=10)
+                page = response.json()
+                seen.extend(c["id"] for c in page.get("items", []))
+            
+            results.assert_test(
+                len(seen) == len(set(seen)) and all(cid in seen for cid in created_ids),
+                "Walking the cursors returns every client exactly once",
+                f"Saw {len(seen)} ids ({len(set(seen))} unique)"
+            )
+        
+        response = requests.get(f"{BASE_URL}/clients", params={"after": "not-a-cursor"}, headers=headers, timeout=10)
+        results.assert_test(
+            response.status_code == 400,
+            "Invalid cursor returns 400",
+            f"Got status {response.status_code}"
+        )
+        
+    except Exception as e:
+        results.assert_test(False, "Client pagination test", str(e))
+    
+    for client_id in created_ids:
+        requests.delete(f"{BASE_URL}/clients/{client_id}", headers=headers, timeout=10)
+
 def main():
     """Run all tests"""
     print("H2EAUX Gestion Backend API Test Suite")
@@ -552,6 +1642,30 @@ def main():
     # Test client management (CRUD operations)
     test_client_management(admin_token)
     
+    # Test client pagination
+    test_client_pagination(admin_token)
+    
+    # Test client search
+    test_client_search(admin_token)
+    
+    # Test optimistic concurrency
+    test_optimistic_concurrency(admin_token)
+    test_delta_sync(admin_token)
+    test_conditional_requests(admin_token)
+    test_client_export(admin_token)
+    test_fast_reads(admin_token)
+    test_bulk_import(admin_token)
+    test_calculs_pac_batch(admin_token)
+    test_chat_history(admin_token)
+    test_document_upload(admin_token)
+    test_job_runner(admin_token)
+    test_chantiers(admin_token)
+    test_rendez_vous(admin_token)
+    test_dashboard_stats(admin_token)
+    test_metrics_endpoint(admin_token)
+    test_request_profiling(admin_token)
+    test_health_stats(admin_token)
+    
     # Test input validation
     test_input_validation(admin_token)
     
@@ -0,0 +1,81 @@
+"""Baseline comparison of the benchmark suite (backend/benchmarks/suite.py)."""
+import copy
+import json
+import os
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+
+from benchmarks.suite import compare  # noqa: E402
+
+
+def workloads(throughput=100.0, p95_ms=20.0, count=50):
+    return {"workloads": {"mixed": {
+        "throughput_rps": throughput,
+        "endpoints": {
+            "GET /api/clients": {"count": count, "p95_ms": p95_ms},
+            "POST /api/clients": {"count": count, "p95_ms": 0.4},
+        },
+    }}}
+
+
+def regressed(comparison):
+    return {(row["name"], row["metric"]) for row in comparison["checks"] if row["regression"]}
+
+
+def test_identical_results_have_no_regression():
+    comparison = compare(workloads(), workloads(), tolerance=0.25, min_delta_ms=1.0)
+    assert comparison["regressions"] == 0
+    assert len(comparison["checks"]) == 3
+
+
+def test_slower_p95_is_a_regression():
+    comparison = compare(workloads(p95_ms=30.0), workloads(p95_ms=20.0), tolerance=0.25, min_delta_ms=1.0)
+    assert regressed(comparison) == {("mixed GET /api/clients", "p95_ms")}
+    row = next(row for row in comparison["checks"] if row["regression"])
+    assert row["baseline"] == 20.0 and row["current"] == 30.0 and round(row["change_percent"]) == 50
+
+
+def test_slowdown_within_tolerance_is_not_a_regression():
+    comparison = compare(workloads(p95_ms=24.0), workloads(p95_ms=20.0), tolerance=0.25, min_delta_ms=1.0)
+    assert comparison["regressions"] == 0
+
+
+def test_sub_millisecond_p95_needs_the_minimum_delta():
+    current = workloads()
+    current["workloads"]["mixed"]["endpoints"]["POST /api/clients"]["p95_ms"] = 0.9
+    # +125%, but only 0.5ms slower
+    assert compare(current, workloads(), tolerance=0.25, min_delta_ms=1.0)["regressions"] == 0
+    assert regressed(compare(current, workloads(), tolerance=0.25, min_delta_ms=0.1)) == {
+        ("mixed POST /api/clients", "p95_ms")
+    }
+
+
+def test_lower_throughput_is_a_regression_and_higher_is_not():
+    comparison = compare(workloads(throughput=70.0), workloads(), tolerance=0.25, min_delta_ms=1.0)
+    assert regressed(comparison) == {("mixed", "throughput_rps")}
+    assert compare(workloads(throughput=500.0), workloads(), tolerance=0.25, min_delta_ms=1.0)["regressions"] == 0
+
+
+def test_workloads_and_endpoints_missing_from_the_baseline_are_skipped():
+    baseline = workloads()
+    del baseline["workloads"]["mixed"]["endpoints"]["GET /api/clients"]
+    current = workloads(p95_ms=500.0)
+    current["workloads"]["login_storm"] = {"throughput_rps": 1.0, "endpoints": {}}
+    comparison = compare(current, baseline, tolerance=0.25, min_delta_ms=1.0)
+    assert comparison["regressions"] == 0
+    assert {row["name"] for row in comparison["checks"]} == {"mixed", "mixed POST /api/clients"}
+
+
+def test_endpoints_without_samples_are_skipped():
+    comparison = compare(workloads(p95_ms=500.0, count=0), workloads(), tolerance=0.25, min_delta_ms=1.0)
+    assert {row["name"] for row in comparison["checks"]} == {"mixed"}
+
+
+def test_stored_baseline_compares_with_itself():
+    with open(os.path.join(BACKEND, "benchmarks", "baselines", "memory.json")) as baseline_file:
+        baseline = json.load(baseline_file)
+    comparison = compare(copy.deepcopy(baseline), baseline, tolerance=0.25, min_delta_ms=1.0)
+    assert comparison["regressions"] == 0
+    assert {row["name"] for row in comparison["checks"]} >= {"login_storm", "mixed"}
@@ -0,0 +1,106 @@
+"""``MessageWriter`` (backend/chat.py): no batch is lost to a failed or cancelled write."""
+import asyncio
+import os
+import sys
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+
+from chat import MessageWriter  # noqa: E402
+
+
+class FlakyCollection:
+    """Stores inserted messages by _id; fails or blocks the inserts it is told to."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.stored = {}
+        self.calls = 0
+        self.block = None
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        for number, document in enumerate(documents):
+            document.setdefault("_id", (self.calls, number))
+        if self.block is not None:
+            await self.block.wait()
+        if self.failures:
+            raise self.failures.pop(0)
+        duplicates = [document for document in documents if document["_id"] in self.stored]
+        for document in documents:
+            self.stored.setdefault(document["_id"], document)
+        if duplicates:
+            raise BulkWriteError({
+                "nInserted": len(documents) - len(duplicates),
+                "writeErrors": [{"code": 11000, "errmsg": "duplicate key"} for _ in duplicates],
+            })
+
+
+def messages(count):
+    return [{"id": str(number), "message": f"message {number}"} for number in range(count)]
+
+
+async def until(condition, timeout=2.0):
+    await asyncio.wait_for(_poll(condition), timeout)
+
+
+async def _poll(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+def stored_ids(collection):
+    return sorted(document["id"] for document in collection.stored.values())
+
+
+def test_a_failed_write_keeps_the_batch_for_the_next_flush():
+    async def scenario():
+        collection = FlakyCollection([AutoReconnect("primary stepped down")])
+        writer = MessageWriter(collection, batch_size=2)
+        for message in messages(3):
+            writer.add(message)
+        await writer.flush()
+        assert writer.stats()["pending"] == 3 and writer.counters["retries"] == 1
+        await writer.flush()
+        return collection, writer
+
+    collection, writer = asyncio.run(scenario())
+    assert stored_ids(collection) == ["0", "1", "2"]
+    assert writer.stats()["pending"] == 0 and writer.counters["written"] == 3
+
+
+def test_stop_during_an_insert_writes_the_batch_once():
+    async def scenario():
+        collection = FlakyCollection()
+        collection.block = asyncio.Event()
+        writer = MessageWriter(collection, batch_size=2, flush_interval=0.01)
+        writer.start()
+        for message in messages(3):
+            writer.add(message)
+        await until(lambda: collection.calls > 0)
+        collection.block.set()
+        # Cancel the insert in flight: stop() must write it again
+        await writer.stop()
+        return collection, writer
+
+    collection, writer = asyncio.run(scenario())
+    assert stored_ids(collection) == ["0", "1", "2"]
+    assert writer.stats()["pending"] == 0 and writer.counters.get("failed", 0) == 0
+
+
+def test_an_unexpected_error_does_not_stop_the_writer():
+    async def scenario():
+        collection = FlakyCollection([RuntimeError("boom")])
+        writer = MessageWriter(collection, batch_size=2, flush_interval=0.01)
+        writer.start()
+        for message in messages(2):
+            writer.add(message)
+        await until(lambda: collection.stored)
+        await writer.stop()
+        return collection, writer
+
+    collection, writer = asyncio.run(scenario())
+    assert stored_ids(collection) == ["0", "1"]
+    assert writer.counters["errors"] == 1
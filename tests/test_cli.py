@@ -0,0 +1,122 @@
+"""``cli.py serve``: the bootstrap runs once, in a child process, never in the workers."""
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from typer.testing import CliRunner
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+
+import cli  # noqa: E402
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    """Record the bootstrap child processes and the uvicorn runs instead of starting them."""
+    calls = {"bootstrap": [], "uvicorn": [], "returncode": 0, "serve": None}
+
+    def fake_subprocess_run(args, **kwargs):
+        calls["bootstrap"].append(args)
+        return subprocess.CompletedProcess(args, calls["returncode"])
+
+    def fake_uvicorn_run(app, **kwargs):
+        calls["uvicorn"].append({
+            "app": app,
+            "workers": kwargs["workers"],
+            "server_imported": "server" in sys.modules,
+            "bootstrap_on_startup": os.environ.get("BOOTSTRAP_ON_STARTUP"),
+            "warmup_connections": os.environ.get("WARMUP_CONNECTIONS"),
+        })
+        if calls["serve"] is not None:
+            calls["serve"]()
+
+    monkeypatch.setattr(cli.subprocess, "run", fake_subprocess_run)
+    monkeypatch.setattr(cli.uvicorn, "run", fake_uvicorn_run)
+    # Restored after each test: serve sets them for the workers it starts
+    monkeypatch.setenv("BOOTSTRAP_ON_STARTUP", "true")
+    monkeypatch.setenv("WARMUP_CONNECTIONS", "4")
+    monkeypatch.delitem(sys.modules, "server", raising=False)
+    return calls
+
+
+def test_serve_bootstraps_in_a_child_process(launches):
+    result = runner.invoke(cli.cli, ["serve", "--workers", "1", "--warmup-connections", "2"])
+    assert result.exit_code == 0, result.output
+    assert launches["bootstrap"] == [[sys.executable, os.path.abspath(cli.__file__), "bootstrap"]]
+    assert launches["uvicorn"] == [{
+        "app": "server:app",
+        "workers": 1,
+        "server_imported": False,
+        "bootstrap_on_startup": "false",
+        "warmup_connections": "2",
+    }]
+
+
+def test_serve_stops_when_the_bootstrap_fails(launches):
+    launches["returncode"] = 3
+    result = runner.invoke(cli.cli, ["serve", "--workers", "1"])
+    assert result.exit_code == 3
+    assert launches["uvicorn"] == []
+
+
+def test_skip_bootstrap_starts_the_workers_directly(launches):
+    result = runner.invoke(cli.cli, ["serve", "--workers", "2", "--skip-bootstrap"])
+    assert result.exit_code == 0, result.output
+    assert launches["bootstrap"] == []
+    assert launches["uvicorn"][0]["bootstrap_on_startup"] == "false"
+
+
+def test_one_worker_serves_logins_without_bootstrapping_again(launches, monkeypatch, tmp_path):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    httpx = pytest.importorskip("httpx")
+    import motor.motor_asyncio
+
+    monkeypatch.setattr(motor.motor_asyncio, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    monkeypatch.setenv("MONGO_URL", "mongodb://memory")
+    monkeypatch.setenv("DB_NAME", "h2eaux_cli_test")
+    monkeypatch.setenv("DOCUMENTS_DIR", str(tmp_path / "documents"))
+    monkeypatch.setenv("PROFILES_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("SEARCH_INDEX_REFRESH_SECONDS", "0")
+    monkeypatch.setenv("DASHBOARD_STATS_REBUILD_SECONDS", "0")
+    outcome = {}
+
+    async def worker(server):
+        # What the bootstrap child left in the database
+        hashed = await server.hash_password_async("admin123")
+        await server.db.users.insert_one(server.User(username="admin", hashed_password=hashed).dict())
+
+        await server.startup_event()
+        try:
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://worker") as client:
+                response = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+                outcome["login"] = response.status_code
+        finally:
+            await server.shutdown_db_client()
+
+    def serve():
+        # What uvicorn does with one worker: import the app in this process
+        import server
+
+        bootstraps = []
+
+        async def bootstrap():
+            bootstraps.append(True)
+
+        monkeypatch.setattr(server, "bootstrap", bootstrap)
+        try:
+            asyncio.run(worker(server))
+        finally:
+            sys.modules.pop("server", None)
+        outcome["bootstraps"] = len(bootstraps)
+
+    launches["serve"] = serve
+    result = runner.invoke(cli.cli, ["serve", "--workers", "1"])
+    assert result.exit_code == 0, result.output
+    assert len(launches["bootstrap"]) == 1
+    assert outcome == {"login": 200, "bootstraps": 0}
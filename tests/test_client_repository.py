@@ -0,0 +1,113 @@
+"""Round trips of ``ClientRepository`` (backend/repositories.py), against a recording collection."""
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from pymongo import ReturnDocument
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+
+from repositories import ClientRepository, VersionConflict  # noqa: E402
+
+
+class RecordingCollection:
+    """The few Motor collection methods the repository uses, over a dict by id."""
+
+    def __init__(self, calls, documents=()):
+        self.calls = calls
+        self.documents = {document["id"]: dict(document) for document in documents}
+
+    def _matches(self, document, query):
+        return all(document.get(field) == value for field, value in query.items())
+
+    def _find(self, query):
+        return next((d for d in self.documents.values() if self._matches(d, query)), None)
+
+    async def insert_one(self, document):
+        self.calls.append("insert_one")
+        self.documents[document["id"]] = dict(document)
+
+    async def find_one(self, query, projection=None):
+        self.calls.append("find_one")
+        document = self._find(query)
+        return dict(document) if document else None
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=ReturnDocument.BEFORE):
+        self.calls.append("find_one_and_update")
+        document = self._find(query)
+        if document is None:
+            return None
+        before = dict(document)
+        document.update(update["$set"])
+        for field, step in update["$inc"].items():
+            document[field] = document.get(field, 0) + step
+        return dict(document) if return_document == ReturnDocument.AFTER else before
+
+    async def find_one_and_delete(self, query, projection=None):
+        self.calls.append("find_one_and_delete")
+        document = self._find(query)
+        if document is None:
+            return None
+        return self.documents.pop(document["id"])
+
+
+def repository(*documents):
+    calls = []
+    clients = RecordingCollection(calls, documents)
+    return ClientRepository(clients, RecordingCollection(calls)), calls
+
+
+def client(version=1):
+    now = datetime(2026, 1, 5, 9, 30)
+    return {"id": "c1", "nom": "Lefèvre", "ville": "Brest", "version": version, "created_at": now, "updated_at": now}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_create_is_one_command():
+    repo, calls = repository()
+    run(repo.create(client()))
+    assert calls == ["insert_one"]
+
+
+def test_update_is_one_command_returning_the_stored_document():
+    repo, calls = repository(client())
+    updated = run(repo.update("c1", {"ville": "Quimper"}, expected_version=1))
+    assert calls == ["find_one_and_update"]
+    assert updated["ville"] == "Quimper" and updated["version"] == 2 and updated["nom"] == "Lefèvre"
+    assert repo.stats() == {"update": 1}
+
+
+def test_update_with_previous_is_one_command_too():
+    repo, calls = repository(client())
+    previous, updated = run(repo.update("c1", {"ville": "Quimper"}, with_previous=True))
+    assert calls == ["find_one_and_update"]
+    assert previous["ville"] == "Brest" and previous["version"] == 1
+    assert updated["ville"] == "Quimper" and updated["version"] == 2
+
+
+def test_stale_update_raises_a_conflict_after_one_lookup():
+    repo, calls = repository(client(version=3))
+    with pytest.raises(VersionConflict) as conflict:
+        run(repo.update("c1", {"ville": "Quimper"}, expected_version=2))
+    assert conflict.value.current_version == 3
+    assert calls == ["find_one_and_update", "find_one"]
+
+
+def test_update_of_a_missing_client_returns_none():
+    repo, calls = repository()
+    assert run(repo.update("c1", {"ville": "Quimper"})) is None
+    assert calls == ["find_one_and_update"]
+
+
+def test_delete_is_the_delete_and_its_tombstone():
+    repo, calls = repository(client())
+    deleted = run(repo.delete("c1", expected_version=1))
+    assert deleted["id"] == "c1"
+    assert calls == ["find_one_and_delete", "insert_one"]
+    assert list(repo.tombstones.documents) == ["c1"]
@@ -0,0 +1,49 @@
+"""``ensure_indexes`` (backend/indexes.py) over duplicated values of a unique index."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+
+from indexes import IndexBuildError, ensure_indexes  # noqa: E402
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def database():
+    return mongomock_motor.AsyncMongoMockClient()["h2eaux_indexes_test"]
+
+
+def test_duplicate_usernames_are_named_and_no_index_is_built(caplog):
+    async def scenario():
+        db = database()
+        await db.users.insert_many([
+            {"id": "u1", "username": "admin"},
+            {"id": "u2", "username": "admin"},
+            {"id": "u3", "username": "employe1"},
+        ])
+        with pytest.raises(IndexBuildError) as error:
+            await ensure_indexes(db)
+        return error.value, await db.users.index_information()
+
+    error, indexes = asyncio.run(scenario())
+    assert "users.username_unique" in str(error) and "username='admin' (2 documents)" in str(error)
+    assert "employe1" not in str(error)
+    assert "username_unique" not in indexes
+    assert "username='admin'" in caplog.text
+
+
+def test_indexes_are_built_without_duplicates():
+    async def scenario():
+        db = database()
+        await db.users.insert_many([{"id": "u1", "username": "admin"}, {"id": "u2", "username": "employe1"}])
+        await ensure_indexes(db)
+        # Second run: nothing to create or check again
+        await ensure_indexes(db)
+        return await db.users.index_information()
+
+    indexes = asyncio.run(scenario())
+    assert indexes["username_unique"]["unique"] is True
@@ -0,0 +1,57 @@
+"""Rebuilding the client search index aside (backend/search.py)."""
+import os
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+
+from search import ClientSearchIndex  # noqa: E402
+
+
+def client(client_id, nom, ville="Brest"):
+    return {"id": client_id, "nom": nom, "prenom": "", "ville": ville}
+
+
+def ids(index, query):
+    return {client_id for client_id, _ in index.search(query)}
+
+
+def test_build_leaves_the_current_index_untouched():
+    index = ClientSearchIndex()
+    index.add(client("a", "Lefèvre"))
+    fresh = ClientSearchIndex.build([client("b", "Dubois")])
+    assert ids(index, "lefevre") == {"a"} and ids(index, "dubois") == set()
+    assert ids(fresh, "dubois") == {"b"} and len(fresh) == 1
+
+
+def test_replace_replays_the_writes_made_during_the_build():
+    index = ClientSearchIndex()
+    index.add(client("a", "Lefèvre"))
+    index.add(client("b", "Dubois"))
+
+    index.track_changes()
+    # Read from Mongo before the writes below
+    snapshot = [client("a", "Lefèvre"), client("b", "Dubois")]
+    index.add(client("c", "Martin"))
+    index.remove("b")
+    index.add(client("a", "Lefèvre", ville="Quimper"))
+    fresh = ClientSearchIndex.build(snapshot)
+    index.replace(fresh)
+
+    assert len(index) == 2
+    assert ids(index, "martin") == {"c"}
+    assert ids(index, "dubois") == set()
+    assert ids(index, "quimper") == {"a"} and ids(index, "brest") == {"c"}
+
+
+def test_changes_are_no_longer_recorded_after_replace_or_stop():
+    index = ClientSearchIndex()
+    index.track_changes()
+    index.replace(ClientSearchIndex.build([]))
+    index.add(client("a", "Lefèvre"))
+    assert index._changes is None
+
+    index.track_changes()
+    index.stop_tracking()
+    index.remove("a")
+    assert index._changes is None and len(index) == 0